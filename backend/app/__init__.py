@@ -21,8 +21,14 @@ def create_app(config_name='default'):
     # This is crucial for migrations
     with app.app_context():
         from . import models
+    # JSON encoder and response compression
+    from .utils.json_provider import init_json_provider
+    from .utils.compression import init_compression
+    init_json_provider(app)
+    init_compression(app)
+    
     # Allow CORS from any origin (Authentication is via Token, no cookies/credentials)
-    CORS(app, origins='*')
+    CORS(app, origins='*', expose_headers=['ETag'])  # ETag lets the frontend send If-None-Match
     
     # Register blueprints
     from .routes.auth import auth_bp
@@ -61,6 +67,10 @@ def create_app(config_name='default'):
             app._scheduler_initialized = True
             from .services.scheduler import init_scheduler
             init_scheduler(app)
+            from .services.job_queue import start_worker
+            start_worker(app)
+            from .utils.session_cache import start_invalidation_listener
+            start_invalidation_listener(app)
     
     from app.routes.divisions import divisions_bp
     app.register_blueprint(divisions_bp, url_prefix='/api/divisions')
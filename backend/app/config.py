@@ -14,7 +14,54 @@ class Config:
     # Session settings
     SESSION_INACTIVE_TIMEOUT = int(os.environ.get('SESSION_INACTIVE_TIMEOUT', 1800))  # 30 min
     SESSION_MAX_AGE = int(os.environ.get('SESSION_MAX_AGE', 86400))  # 1 day
-    
+    SESSION_CACHE_TTL = int(os.environ.get('SESSION_CACHE_TTL', 30))  # Seconds a validated session is cached per process (0 disables)
+    SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', 10000))  # Max cached sessions per process
+    SESSION_ACTIVITY_WRITE_SECONDS = int(os.environ.get('SESSION_ACTIVITY_WRITE_SECONDS', 60))  # Min seconds between last_activity writes
+
+    # Audit log: 'async' queues entries for a background batch writer, 'sync' writes each one immediately
+    AUDIT_LOG_MODE = os.environ.get('AUDIT_LOG_MODE', 'async')
+    AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))  # Entries queued before writes fall back to synchronous
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 200))  # Entries per insert
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 1.0))  # Max seconds an entry waits in the queue
+
+    # List endpoints: seconds a per-process count is reused for cursor pages with include_total=true (0 disables)
+    PAGINATION_COUNT_CACHE_TTL = int(os.environ.get('PAGINATION_COUNT_CACHE_TTL', 60))
+
+    # Inventory export: VMs fetched per server-side cursor round trip and written per response chunk
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))
+    EXPORT_ROW_GROUP_SIZE = int(os.environ.get('EXPORT_ROW_GROUP_SIZE', 50000))  # Rows per Parquet row group (0 writes one per chunk)
+
+    # Responses: JSON encoder ('orjson', or 'stdlib'; orjson falls back to stdlib when not installed)
+    JSON_ENCODER = os.environ.get('JSON_ENCODER', 'orjson')
+    RESPONSE_COMPRESSION = os.environ.get('RESPONSE_COMPRESSION', 'true').lower() == 'true'  # gzip/brotli by Accept-Encoding (disable if a proxy compresses)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # Smaller bodies are sent uncompressed
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))  # 0-11; higher costs much more CPU
+
+    # Sync settings
+    SYNC_BATCH_MODE = os.environ.get('SYNC_BATCH_MODE', 'true').lower() == 'true'
+    SYNC_BATCH_SIZE = int(os.environ.get('SYNC_BATCH_SIZE', 500))  # VMs per prefetch/write chunk
+    SYNC_STREAM_CHUNK_SIZE = int(os.environ.get('SYNC_STREAM_CHUNK_SIZE', 65536))  # Bytes per read of API bodies
+    # Parallel API downloads per resource type, with per-type overrides like "vmware_vm=8,nutanix_vm=2"
+    SYNC_FETCH_CONCURRENCY = int(os.environ.get('SYNC_FETCH_CONCURRENCY', 4))
+    SYNC_FETCH_CONCURRENCY_OVERRIDES = {
+        key.strip(): int(value)
+        for key, value in (item.split('=', 1) for item in os.environ.get('SYNC_FETCH_CONCURRENCY_OVERRIDES', '').split(',') if '=' in item)
+    }
+    SYNC_FETCH_SPOOL_BYTES = int(os.environ.get('SYNC_FETCH_SPOOL_BYTES', 8 * 1024 * 1024))  # Buffer in memory before spilling to disk
+
+    # Sync jobs: 'external' leaves jobs to sync_worker.py, 'thread' runs a worker thread in each web process (development only)
+    SYNC_JOB_WORKER = os.environ.get('SYNC_JOB_WORKER', 'external')
+    SYNC_JOB_POLL_INTERVAL = int(os.environ.get('SYNC_JOB_POLL_INTERVAL', 5))  # Seconds between queue polls
+    SYNC_JOB_STALE_SECONDS = int(os.environ.get('SYNC_JOB_STALE_SECONDS', 1800))  # Fail RUNNING jobs without a heartbeat this long
+    SYNC_PROGRESS_INTERVAL = float(os.environ.get('SYNC_PROGRESS_INTERVAL', 2.0))  # Min seconds between progress writes
+    CHANGE_BUFFER_SIZE = int(os.environ.get('CHANGE_BUFFER_SIZE', 5000))  # Change history rows buffered before a write
+    CHANGE_PARTITIONS_AHEAD = int(os.environ.get('CHANGE_PARTITIONS_AHEAD', 3))  # Monthly change history partitions created in advance
+    CHANGE_HISTORY_RETENTION_MONTHS = int(os.environ.get('CHANGE_HISTORY_RETENTION_MONTHS', 0))  # Drop older change history partitions (0 = keep all)
+    SYNC_PIPELINE_CONCURRENCY = int(os.environ.get('SYNC_PIPELINE_CONCURRENCY', 5))  # Sync pipeline stages run at once
+    SYNC_RUN_STALE_SECONDS = int(os.environ.get('SYNC_RUN_STALE_SECONDS', 1800))  # RUNNING sync runs without progress this long are abandoned
+    SCHEDULER_LEADER_CHECK_SECONDS = int(os.environ.get('SCHEDULER_LEADER_CHECK_SECONDS', 30))  # Leader lock check / takeover retry
+
 
 
 class DevelopmentConfig(Config):
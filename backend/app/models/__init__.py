@@ -1,10 +1,10 @@
 from .user import User, UserSession
 from .owner import Owner
-from .vm import VM, VMFact, VMNicFact, VMNicIpFact, VMDiskFact, VMManual, VMTag, VMIpManual, VMCustomField
-from .sync import VMSyncRun, VMChangeHistory
+from .vm import VM, VMFact, VMNicFact, VMNicIpFact, VMDiskFact, VMManual, VMTag, VMIpManual, VMCustomField, VMEffective
+from .sync import VMSyncRun, VMChangeHistory, VMChangeRollup, SyncJob
 from .network import VMwareNetwork, Network
 from .host import Host
-from .settings import SiteSettings
+from .settings import SiteSettings, DataVersionCounter
 from .system_api import SystemApi
 from .audit import AuditLog
 from .public_network import VMPublicNetwork
@@ -4,6 +4,9 @@ from app import db
 class AuditLog(db.Model):
     """Audit log for user activities"""
     __tablename__ = 'audit_logs'
+    __table_args__ = (
+        db.Index('ix_audit_logs_created_at_id', 'created_at', 'id'),  # Cursor pagination order
+    )
     
     id = db.Column(db.BigInteger, primary_key=True)
     user_id = db.Column(db.BigInteger, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
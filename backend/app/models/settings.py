@@ -64,3 +64,11 @@ class SiteSettings(db.Model):
             if not cls.query.filter_by(key=key).first():
                 db.session.add(cls(key=key, value=value, description=description))
         db.session.commit()
+
+
+class DataVersionCounter(db.Model):
+    """Change counters behind DataVersion sources, one row per source"""
+    __tablename__ = 'data_version'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
@@ -5,6 +5,10 @@ from app import db
 class VMSyncRun(db.Model):
     """Sync run audit table"""
     __tablename__ = 'vm_sync_run'
+    __table_args__ = (
+        db.Index('ix_vm_sync_run_started_at_id', 'started_at', 'id'),  # Cursor pagination order
+        db.Index('ix_vm_sync_run_finished_at', 'finished_at'),  # Latest finished run (summary cache key)
+    )
     
     id = db.Column(db.BigInteger, primary_key=True)
     platform = db.Column(db.String(20), nullable=False)
@@ -13,6 +17,11 @@ class VMSyncRun(db.Model):
     status = db.Column(db.String(20), nullable=False, default='RUNNING')
     vm_count_seen = db.Column(db.Integer, default=0)
     details = db.Column(db.JSON)
+    job_id = db.Column(db.BigInteger, db.ForeignKey('sync_job.id', ondelete='SET NULL'))
+    progress = db.Column(db.JSON)  # {phase, processed, expected, percent, updated_at}
+    
+    # Relationships
+    job = db.relationship('SyncJob', backref='runs')
     
     def to_dict(self):
         """Convert to dictionary"""
@@ -23,22 +32,109 @@ class VMSyncRun(db.Model):
             'finished_at': self.finished_at.isoformat() if self.finished_at else None,
             'status': self.status,
             'vm_count_seen': self.vm_count_seen,
-            'details': self.details
+            'details': self.details,
+            'job_id': self.job_id,
+            'progress': self.progress
+        }
+
+
+class SyncJob(db.Model):
+    """Queued sync request, executed by a background worker"""
+    __tablename__ = 'sync_job'
+    
+    # Job types
+    TYPE_VMWARE = 'vmware'
+    TYPE_NUTANIX = 'nutanix'
+    TYPE_ALL = 'all'
+    TYPE_HOSTS = 'hosts'
+    
+    TYPES = [TYPE_VMWARE, TYPE_NUTANIX, TYPE_ALL, TYPE_HOSTS]
+    
+    # Statuses
+    STATUS_QUEUED = 'QUEUED'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_SUCCESS = 'SUCCESS'
+    STATUS_PARTIAL = 'PARTIAL'
+    STATUS_FAILED = 'FAILED'
+    
+    ACTIVE_STATUSES = [STATUS_QUEUED, STATUS_RUNNING]
+    
+    id = db.Column(db.BigInteger, primary_key=True)
+    job_type = db.Column(db.String(20), nullable=False)
+    params = db.Column(db.JSON)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_QUEUED, index=True)
+    phase = db.Column(db.String(50))  # Current step, e.g. 'vmware' or 'hosts'
+    requested_by = db.Column(db.BigInteger, db.ForeignKey('users.id', ondelete='SET NULL'))
+    worker = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime(timezone=True))
+    finished_at = db.Column(db.DateTime(timezone=True))
+    heartbeat_at = db.Column(db.DateTime(timezone=True))
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        runs = sorted(self.runs, key=lambda run: run.id)
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'params': self.params,
+            'status': self.status,
+            'phase': self.phase,
+            'percent': self.percent(runs),
+            'requested_by': self.requested_by,
+            'worker': self.worker,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'result': self.result,
+            'error': self.error,
+            'runs': [run.to_dict() for run in runs]
         }
+    
+    def percent(self, runs=None):
+        """Overall completion across the sync runs the job is expected to create"""
+        if self.status not in self.ACTIVE_STATUSES:
+            return 100
+        if self.status == self.STATUS_QUEUED:
+            return 0
+        
+        runs = self.runs if runs is None else runs
+        total = 0
+        for run in runs:
+            if run.status == 'RUNNING':
+                total += (run.progress or {}).get('percent') or 0
+            else:
+                total += 100
+        
+        # 'all' covers both VM platforms, hosts and networks (one run each)
+        expected_runs = 5 if self.job_type == self.TYPE_ALL else 1
+        return min(99, int(total / max(expected_runs, len(runs))))
 
 
 class VMChangeHistory(db.Model):
     """Track VM changes between syncs"""
     __tablename__ = 'vm_change_history'
+    # Range-partitioned by month on changed_at; partitions are managed by
+    # app.services.change_partitions. The partition key has to be part of
+    # the primary key.
+    __table_args__ = (
+        # id completes the (changed_at, id) order used for cursor pagination
+        db.Index('ix_vm_change_history_changed_at_id', 'changed_at', 'id'),
+        db.Index('ix_vm_change_history_vm_id_changed_at_id', 'vm_id', 'changed_at', 'id'),
+        {'postgresql_partition_by': 'RANGE (changed_at)'},
+    )
     
-    id = db.Column(db.BigInteger, primary_key=True)
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
     vm_id = db.Column(db.BigInteger, db.ForeignKey('vm.id', ondelete='CASCADE'), nullable=False)
     sync_run_id = db.Column(db.BigInteger, db.ForeignKey('vm_sync_run.id'))
     change_type = db.Column(db.String(50), nullable=False)
     field_name = db.Column(db.String(100), nullable=False)
     old_value = db.Column(db.Text)
     new_value = db.Column(db.Text)
-    changed_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    changed_at = db.Column(db.DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(timezone.utc))
     
     # Relationships
     vm = db.relationship('VM', backref='changes')
@@ -57,3 +153,22 @@ class VMChangeHistory(db.Model):
             'new_value': self.new_value,
             'changed_at': self.changed_at.isoformat() if self.changed_at else None
         }
+
+
+class VMChangeRollup(db.Model):
+    """Hourly change counts per change type and platform, kept in step with vm_change_history"""
+    __tablename__ = 'vm_change_rollup'
+    
+    bucket = db.Column(db.DateTime(timezone=True), primary_key=True)  # Start of the hour (UTC)
+    change_type = db.Column(db.String(50), primary_key=True)
+    platform = db.Column(db.String(20), primary_key=True)
+    change_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'bucket': self.bucket.isoformat() if self.bucket else None,
+            'change_type': self.change_type,
+            'platform': self.platform,
+            'change_count': self.change_count
+        }
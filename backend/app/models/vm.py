@@ -1,6 +1,10 @@
 from datetime import datetime, timezone
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.dialects.postgresql import ARRAY, INET
 from app import db
 from app.models.division import Division
+from app.utils.ip_address import is_apipa
 
 
 class VM(db.Model):
@@ -66,9 +70,85 @@ class VM(db.Model):
     
     def to_effective_dict(self):
         """Convert to effective dictionary with manual overrides applied"""
-        fact = self.fact
-        manual = self.manual
+        nic_ips = [
+            ip.ip_address
+            for nic in self.nics.order_by(VMNicFact.id)
+            for ip in nic.ip_addresses.order_by(VMNicIpFact.ip_address)
+        ]
+        return self._build_effective_dict(
+            fact=self.fact,
+            manual=self.manual,
+            tags=self.tags.order_by(VMTag.id).all(),
+            manual_ips=self.manual_ips.order_by(VMIpManual.id).all(),
+            nic_ips=nic_ips,
+            public_network=self.public_network,
+            dns_records=sorted(self.dns_records, key=lambda r: r.id)
+        )
+    
+    @staticmethod
+    def load_effective_dicts(vms):
+        """
+        Effective dictionaries for a page of VMs, in the same order.
         
+        Same output as calling to_effective_dict() on each VM, but every
+        related table is read with one batched query for the whole page
+        instead of lazy loads per VM.
+        """
+        from app.models.public_network import VMPublicNetwork
+        from app.models.dns_record import VMDNSRecord
+        
+        vm_ids = [vm.id for vm in vms]
+        if not vm_ids:
+            return []
+        
+        def rows_by_vm(query):
+            grouped = {}
+            for row in query:
+                grouped.setdefault(row.vm_id, []).append(row)
+            return grouped
+        
+        facts = {f.vm_id: f for f in VMFact.query.filter(VMFact.vm_id.in_(vm_ids))}
+        manuals = {
+            m.vm_id: m for m in VMManual.query.options(
+                joinedload(VMManual.division),
+                joinedload(VMManual.business_owner),
+                joinedload(VMManual.technical_owner)
+            ).filter(VMManual.vm_id.in_(vm_ids))
+        }
+        public_networks = {
+            p.vm_id: p for p in VMPublicNetwork.query.filter(VMPublicNetwork.vm_id.in_(vm_ids))
+        }
+        tags = rows_by_vm(VMTag.query.filter(VMTag.vm_id.in_(vm_ids)).order_by(VMTag.id))
+        manual_ips = rows_by_vm(VMIpManual.query.filter(VMIpManual.vm_id.in_(vm_ids)).order_by(VMIpManual.id))
+        dns_records = rows_by_vm(VMDNSRecord.query.filter(VMDNSRecord.vm_id.in_(vm_ids)).order_by(VMDNSRecord.id))
+        nic_ips = rows_by_vm(
+            db.session.query(VMNicFact.vm_id, VMNicIpFact.ip_address)
+            .join(VMNicIpFact, VMNicIpFact.nic_id == VMNicFact.id)
+            .filter(VMNicFact.vm_id.in_(vm_ids))
+            .order_by(VMNicFact.id, VMNicIpFact.ip_address)  # Same order as the vm_effective IP pick
+        )
+        
+        results = []
+        for vm in vms:
+            # Populate the relationships so later access doesn't lazy load
+            set_committed_value(vm, 'fact', facts.get(vm.id))
+            set_committed_value(vm, 'manual', manuals.get(vm.id))
+            set_committed_value(vm, 'public_network', public_networks.get(vm.id))
+            set_committed_value(vm, 'dns_records', dns_records.get(vm.id, []))
+            
+            results.append(vm._build_effective_dict(
+                fact=vm.fact,
+                manual=vm.manual,
+                tags=tags.get(vm.id, []),
+                manual_ips=manual_ips.get(vm.id, []),
+                nic_ips=[row.ip_address for row in nic_ips.get(vm.id, [])],
+                public_network=vm.public_network,
+                dns_records=vm.dns_records
+            ))
+        return results
+    
+    def _build_effective_dict(self, fact, manual, tags, manual_ips, nic_ips, public_network, dns_records):
+        """Effective dictionary from already loaded related rows"""
         data = {
             'id': self.id,
             'vm_name': self.vm_name,
@@ -84,8 +164,8 @@ class VM(db.Model):
             'cluster_name': None,
             'host': None,
             'tags': [],
-            'has_public_ip': True if self.public_network and self.public_network.is_active else False,
-            'has_dns_record': True if self.dns_records and any(r.is_active for r in self.dns_records) else False,
+            'has_public_ip': True if public_network and public_network.is_active else False,
+            'has_dns_record': True if dns_records and any(r.is_active for r in dns_records) else False,
             'vm_uuid': self.vm_uuid,
             'inventory_key': self.inventory_key,
             'bios_uuid': self.bios_uuid,
@@ -158,35 +238,31 @@ class VM(db.Model):
                 data['technical_owner_email'] = manual.technical_owner.email
         
         # Include Tags
-        data['tags'] = [tag.to_dict() for tag in self.tags]
+        data['tags'] = [tag.to_dict() for tag in tags]
 
         # Determine First Available IP
         first_ip = None
         
         # 1. Priority: Manual IPs
         # First check for primary manual IP
-        for manual_ip in self.manual_ips:
+        for manual_ip in manual_ips:
             if manual_ip.is_primary and manual_ip.ip_address:
                 first_ip = manual_ip.ip_address
                 break
         
         # If no primary, check any manual IP
         if not first_ip:
-            for manual_ip in self.manual_ips:
+            for manual_ip in manual_ips:
                 if manual_ip.ip_address:
                     first_ip = manual_ip.ip_address
                     break
         
         # 2. Priority: NIC IPs (if no manual IP found)
         if not first_ip:
-            nic_ips = []
-            for nic in self.nics:
-                for ip in nic.ip_addresses:
-                    if ip.ip_address:
-                        nic_ips.append(ip.ip_address)
+            nic_ips = [ip for ip in nic_ips if ip]
             
             # Filter for non-APIPA first
-            valid_ips = [ip for ip in nic_ips if not ip.startswith('169.254')]
+            valid_ips = [ip for ip in nic_ips if not is_apipa(ip)]
             
             if valid_ips:
                 first_ip = valid_ips[0]
@@ -197,14 +273,14 @@ class VM(db.Model):
         data['ip_address'] = first_ip
 
         # Public Network & DNS flags
-        data['has_public_ip'] = bool(self.public_network and self.public_network.is_active)
+        data['has_public_ip'] = bool(public_network and public_network.is_active)
         
         # DNS records - handled as collection
-        active_dns = [r for r in self.dns_records if r.is_active]
+        active_dns = [r for r in dns_records if r.is_active]
         data['has_dns_record'] = len(active_dns) > 0
         
-        if self.public_network and self.public_network.is_active:
-             data['public_network'] = self.public_network.to_dict()
+        if public_network and public_network.is_active:
+             data['public_network'] = public_network.to_dict()
 
         if active_dns:
              data['dns_record'] = active_dns[0].to_dict()  # Return first active for compatibility if needed
@@ -248,6 +324,7 @@ class VMFact(db.Model):
     last_update_date = db.Column(db.DateTime(timezone=True))
     
     raw = db.Column(db.JSON)
+    payload_hash = db.Column(db.String(64))  # Fingerprint of raw, used to skip unchanged VMs on sync
     fact_updated_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     
     def to_dict(self):
@@ -313,16 +390,20 @@ class VMNicFact(db.Model):
             'vlan_mode': self.vlan_mode,
             'is_connected': self.is_connected,
             'state': self.state,
-            'ip_addresses': [ip.to_dict() for ip in self.ip_addresses]
+            'ip_addresses': [ip.to_dict() for ip in self.ip_addresses.order_by(VMNicIpFact.ip_address)]
         }
 
 
 class VMNicIpFact(db.Model):
     """VM NIC IP addresses"""
     __tablename__ = 'vm_nic_ip_fact'
+    __table_args__ = (
+        # Exact and subnet (<<=) lookups
+        db.Index('ix_vm_nic_ip_fact_ip_address', 'ip_address', postgresql_using='gist', postgresql_ops={'ip_address': 'inet_ops'}),
+    )
     
     nic_id = db.Column(db.BigInteger, db.ForeignKey('vm_nic_fact.id', ondelete='CASCADE'), primary_key=True)
-    ip_address = db.Column(db.String(50), primary_key=True)  # Using string for INET compatibility
+    ip_address = db.Column(INET, primary_key=True)
     ip_type = db.Column(db.String(50))
     
     def to_dict(self):
@@ -468,14 +549,17 @@ class VMIpManual(db.Model):
     
     id = db.Column(db.BigInteger, primary_key=True)
     vm_id = db.Column(db.BigInteger, db.ForeignKey('vm.id', ondelete='CASCADE'), nullable=False)
-    ip_address = db.Column(db.String(50), nullable=False)
+    ip_address = db.Column(INET, nullable=False)
     label = db.Column(db.String(255))
     is_primary = db.Column(db.Boolean, nullable=False, default=False)
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     created_by = db.Column(db.Text)
     
-    __table_args__ = (db.UniqueConstraint('vm_id', 'ip_address'),)
+    __table_args__ = (
+        db.UniqueConstraint('vm_id', 'ip_address'),
+        db.Index('ix_vm_ip_manual_ip_address', 'ip_address', postgresql_using='gist', postgresql_ops={'ip_address': 'inet_ops'}),
+    )
     
     def to_dict(self):
         """Convert to dictionary"""
@@ -510,3 +594,51 @@ class VMCustomField(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'updated_by': self.updated_by
         }
+
+
+class VMEffective(db.Model):
+    """
+    Flat read model of a VM's effective values (manual overrides applied,
+    first IP selected, owner and division names resolved).
+
+    Maintained by app.services.vm_effective; inventory filtering, sorting
+    and summaries read from here.
+    """
+    __tablename__ = 'vm_effective'
+    
+    vm_id = db.Column(db.BigInteger, db.ForeignKey('vm.id', ondelete='CASCADE'), primary_key=True)
+    platform = db.Column(db.String(20), nullable=False, index=True)
+    vm_uuid = db.Column(db.String(64), nullable=False)
+    vm_name = db.Column(db.String(255), nullable=False, index=True)
+    is_deleted = db.Column(db.Boolean, nullable=False, default=False, index=True)
+    
+    power_state = db.Column(db.String(20), index=True)
+    cluster_name = db.Column(db.String(255), index=True)
+    hostname = db.Column(db.String(255))
+    os_type = db.Column(db.String(255))  # Substring filter; trigram index created by init_db
+    os_family = db.Column(db.String(50))
+    host_identifier = db.Column(db.String(255), index=True)
+    total_vcpus = db.Column(db.Integer, index=True)
+    memory_mb = db.Column(db.Integer, index=True)
+    total_disk_gb = db.Column(db.Numeric(12, 2), index=True)
+    ip_address = db.Column(INET)
+    
+    environment = db.Column(db.String(50), index=True)
+    division_id = db.Column(db.BigInteger, index=True)
+    division_name = db.Column(db.String(255))
+    business_owner_id = db.Column(db.BigInteger, index=True)
+    business_owner_name = db.Column(db.String(255))
+    technical_owner_id = db.Column(db.BigInteger, index=True)
+    technical_owner_name = db.Column(db.String(255))
+    
+    tag_values = db.Column(ARRAY(db.String(255)), nullable=False, default=list)  # Lower-cased
+    has_public_ip = db.Column(db.Boolean, nullable=False, default=False)
+    has_dns_record = db.Column(db.Boolean, nullable=False, default=False)
+    search_text = db.Column(db.Text)  # Lower-cased search document; trigram index created by init_db
+    
+    refreshed_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    
+    __table_args__ = (
+        db.Index('ix_vm_effective_os_family_lower', db.func.lower(os_family)),
+        db.Index('ix_vm_effective_tag_values', tag_values, postgresql_using='gin'),
+    )
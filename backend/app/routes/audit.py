@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from app.models.audit import AuditLog
 from app.utils.decorators import login_required, admin_required, password_reset_not_required
+from app.utils.pagination import paginate, CursorError
 
 audit_bp = Blueprint('audit', __name__)
 
@@ -8,10 +9,7 @@ audit_bp = Blueprint('audit', __name__)
 @login_required
 @password_reset_not_required
 def list_logs():
-    """List audit logs with filtering"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
-    
+    """List audit logs with filtering (offset or cursor pages)"""
     action = request.args.get('action', '').strip()
     resource_type = request.args.get('resource_type', '').strip()
     username = request.args.get('username', '').strip()
@@ -25,18 +23,16 @@ def list_logs():
     if username:
         query = query.filter(AuditLog.username.ilike(f'%{username}%'))
         
-    # Default sort by newest
-    query = query.order_by(AuditLog.created_at.desc())
-    
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    # Newest first; created_at is always set on insert
+    try:
+        logs, page_meta = paginate(
+            query, AuditLog.created_at, AuditLog.id,
+            sort='created_at:desc', descending=True, nullable=False
+        )
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify({
-        'logs': [log.to_dict() for log in pagination.items],
-        'total': pagination.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': pagination.pages
-    })
+    return jsonify({'logs': [log.to_dict() for log in logs], **page_meta})
 
 @audit_bp.route('/types', methods=['GET'])
 @login_required
@@ -1,25 +1,69 @@
 from flask import Blueprint, request, jsonify, g
 from datetime import datetime, timezone
-from app import db
 from app.models.vm import VM
 from app.models.sync import VMChangeHistory
+from app.services.change_rollup import ChangeRollup
 from app.utils.decorators import login_required, password_reset_not_required
+from app.utils.pagination import paginate, CursorError
 
 changes_bp = Blueprint('changes', __name__)
 
 
+def _parse_time_range():
+    """
+    Read the optional since/until (ISO 8601) query arguments.
+    
+    Bounding changed_at lets Postgres skip change history partitions
+    outside the range.
+    
+    Returns:
+        (since, until, error_response)
+    """
+    bounds = []
+    for name in ('since', 'until'):
+        value = request.args.get(name, '').strip()
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None, None, (jsonify({'error': f'Invalid {name} timestamp'}), 400)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        bounds.append(parsed)
+    return bounds[0], bounds[1], None
+
+
+def _filter_time_range(query, since, until):
+    if since:
+        query = query.filter(VMChangeHistory.changed_at >= since)
+    if until:
+        query = query.filter(VMChangeHistory.changed_at < until)
+    return query
+
+
+def _paginate_changes(query):
+    """Newest changes first; the cursor keeps page N as cheap as page 1"""
+    return paginate(
+        query, VMChangeHistory.changed_at, VMChangeHistory.id,
+        sort='changed_at:desc', descending=True
+    )
+
+
 @changes_bp.route('', methods=['GET'])
 @login_required
 @password_reset_not_required
 def list_changes():
-    """List all recent VM changes"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
+    """List all recent VM changes (offset or cursor pages)"""
     change_type = request.args.get('change_type', '').strip()
     platform = request.args.get('platform', '').strip()
     vm_id = request.args.get('vm_id', type=int)
+    since, until, error = _parse_time_range()
+    if error:
+        return error
     
-    query = VMChangeHistory.query.join(VM)
+    query = _filter_time_range(VMChangeHistory.query.join(VM), since, until)
     
     if change_type:
         query = query.filter(VMChangeHistory.change_type == change_type)
@@ -30,17 +74,12 @@ def list_changes():
     if vm_id:
         query = query.filter(VMChangeHistory.vm_id == vm_id)
     
-    query = query.order_by(VMChangeHistory.changed_at.desc())
+    try:
+        changes, page_meta = _paginate_changes(query)
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
     
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    
-    return jsonify({
-        'changes': [c.to_dict() for c in pagination.items],
-        'total': pagination.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': pagination.pages
-    })
+    return jsonify({'changes': [c.to_dict() for c in changes], **page_meta})
 
 
 @changes_bp.route('/summary', methods=['GET'])
@@ -48,30 +87,8 @@ def list_changes():
 @password_reset_not_required
 def get_changes_summary():
     """Get summary of recent changes"""
-    # Last 24 hours
-    from datetime import timedelta
-    since = datetime.now(timezone.utc) - timedelta(hours=24)
-    
-    # Count by type
-    by_type = db.session.query(
-        VMChangeHistory.change_type,
-        db.func.count(VMChangeHistory.id)
-    ).filter(
-        VMChangeHistory.changed_at >= since
-    ).group_by(VMChangeHistory.change_type).all()
-    
-    # Count by platform
-    by_platform = db.session.query(
-        VM.platform,
-        db.func.count(VMChangeHistory.id)
-    ).join(VM).filter(
-        VMChangeHistory.changed_at >= since
-    ).group_by(VM.platform).all()
-    
-    # Total in last 24h
-    total_24h = VMChangeHistory.query.filter(
-        VMChangeHistory.changed_at >= since
-    ).count()
+    # Last 24 hours, from the hourly rollup
+    summary = ChangeRollup.summary(hours=24)
     
     # Recent notable changes
     recent = VMChangeHistory.query.order_by(
@@ -79,13 +96,41 @@ def get_changes_summary():
     ).limit(10).all()
     
     return jsonify({
-        'total_24h': total_24h,
-        'by_type': {t[0]: t[1] for t in by_type if t[0]},
-        'by_platform': {p[0]: p[1] for p in by_platform if p[0]},
+        'total_24h': summary['total'],
+        'by_type': summary['by_type'],
+        'by_platform': summary['by_platform'],
         'recent_changes': [c.to_dict() for c in recent]
     })
 
 
+@changes_bp.route('/trend', methods=['GET'])
+@login_required
+@password_reset_not_required
+def get_changes_trend():
+    """Change counts over time (range=24h|7d|30d|90d|1y, optional interval)"""
+    range_name = request.args.get('range', '7d').strip()
+    if range_name not in ChangeRollup.RANGES:
+        return jsonify({'error': f"range must be one of: {', '.join(ChangeRollup.RANGES)}"}), 400
+    
+    window, interval = ChangeRollup.RANGES[range_name]
+    interval = request.args.get('interval', interval).strip()
+    if interval not in ChangeRollup.INTERVALS:
+        return jsonify({'error': f"interval must be one of: {', '.join(ChangeRollup.INTERVALS)}"}), 400
+    
+    trend = ChangeRollup.trend(
+        window,
+        interval,
+        platform=request.args.get('platform', '').strip() or None,
+        change_type=request.args.get('change_type', '').strip() or None
+    )
+    
+    return jsonify({
+        'range': range_name,
+        'interval': interval,
+        **trend
+    })
+
+
 @changes_bp.route('/vm/<int:vm_id>', methods=['GET'])
 @login_required
 @password_reset_not_required
@@ -93,14 +138,16 @@ def get_vm_changes(vm_id):
     """Get change history for a specific VM"""
     vm = VM.query.get_or_404(vm_id)
     
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
+    since, until, error = _parse_time_range()
+    if error:
+        return error
     
-    query = VMChangeHistory.query.filter_by(
-        vm_id=vm_id
-    ).order_by(VMChangeHistory.changed_at.desc())
+    query = _filter_time_range(VMChangeHistory.query.filter_by(vm_id=vm_id), since, until)
     
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    try:
+        changes, page_meta = _paginate_changes(query)
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
         'vm': {
@@ -108,11 +155,8 @@ def get_vm_changes(vm_id):
             'vm_name': vm.vm_name,
             'platform': vm.platform
         },
-        'changes': [c.to_dict() for c in pagination.items],
-        'total': pagination.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': pagination.pages
+        'changes': [c.to_dict() for c in changes],
+        **page_meta
     })
 
 
@@ -3,6 +3,7 @@ from app import db
 from app.models.division import Division
 from app.utils.decorators import login_required, admin_required, password_reset_not_required
 from app.utils.audit import log_action
+from app.services.vm_effective import EffectiveInventory
 
 divisions_bp = Blueprint('divisions', __name__)
 
@@ -65,7 +66,9 @@ def update_division(id):
         division.name = data['name']
     if 'department' in data:
         division.department = data['department']
-        
+    
+    if 'name' in data:
+        EffectiveInventory.refresh_division(division.id)
     db.session.commit()
     
     log_action('UPDATE', 'DIVISION', str(id), data)
@@ -3,7 +3,7 @@ from datetime import datetime, timezone
 from app import db
 from app.models.host import Host
 from app.models.vm import VM, VMFact
-from app.utils.decorators import login_required, admin_required, password_reset_not_required
+from app.utils.decorators import login_required, admin_required, password_reset_not_required, conditional_get
 import requests
 from flask import current_app
 
@@ -13,6 +13,7 @@ hosts_bp = Blueprint('hosts', __name__)
 @hosts_bp.route('', methods=['GET'])
 @login_required
 @password_reset_not_required
+@conditional_get('inventory', 'hosts')
 def list_hosts():
     """List all hypervisor hosts with optional filtering"""
     platform = request.args.get('platform', '').strip()
@@ -72,6 +73,7 @@ def list_hosts():
 @hosts_bp.route('/summary', methods=['GET'])
 @login_required
 @password_reset_not_required
+@conditional_get('hosts')
 def get_host_summary():
     """Get hypervisor summary statistics"""
     vmware_count = Host.query.filter_by(platform='vmware').count()
@@ -105,16 +107,11 @@ def get_host_summary():
 @hosts_bp.route('/sync', methods=['POST'])
 @admin_required
 def sync_hosts():
-    """Sync hosts from both platforms or specific one"""
+    """Queue host sync for both platforms or specific one"""
     platform = request.args.get('platform')
-    from app.services.sync_service import SyncService
-    service = SyncService()
-    results = service.sync_hosts(platform)
-    
-    return jsonify({
-        'message': f"Host sync completed for {platform or 'all platforms'}",
-        'results': results
-    })
+    from app.routes.sync import enqueue_sync_job
+    from app.models.sync import SyncJob
+    return enqueue_sync_job(SyncJob.TYPE_HOSTS, {'platform': platform} if platform else None)
 
 
 
@@ -3,7 +3,7 @@ from datetime import datetime, timezone
 from app import db
 from app.models.network import Network, VMwareNetwork
 from app.models.vm import VMNicFact
-from app.utils.decorators import login_required, admin_required, password_reset_not_required
+from app.utils.decorators import login_required, admin_required, password_reset_not_required, conditional_get
 import requests
 from flask import current_app
 
@@ -13,6 +13,7 @@ networks_bp = Blueprint('networks', __name__)
 @networks_bp.route('/summary', methods=['GET'])
 @login_required
 @password_reset_not_required
+@conditional_get('inventory', 'networks')
 def get_network_summary():
     """Get network statistics"""
     total = Network.query.count()
@@ -59,6 +60,7 @@ def get_network_summary():
 @networks_bp.route('', methods=['GET'])
 @login_required
 @password_reset_not_required
+@conditional_get('inventory', 'networks')
 def list_networks():
     """List all networks with optional filtering and pagination"""
     page = request.args.get('page', 1, type=int)
@@ -136,6 +138,7 @@ def list_networks():
 @networks_bp.route('/<int:network_id>', methods=['GET'])
 @login_required
 @password_reset_not_required
+@conditional_get('networks')
 def get_network(network_id):
     """Get a specific network"""
     network = Network.query.get_or_404(network_id)
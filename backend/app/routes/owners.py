@@ -6,6 +6,7 @@ from app.models.user import User
 from app.models.vm import VMManual
 from app.utils.decorators import login_required, admin_required, password_reset_not_required
 from app.utils.audit import log_action
+from app.services.vm_effective import EffectiveInventory
 
 owners_bp = Blueprint('owners', __name__)
 
@@ -181,6 +182,8 @@ def update_owner(owner_id):
         owner.user_id = data['user_id']
     
     owner.updated_at = datetime.now(timezone.utc)
+    if 'full_name' in data:
+        EffectiveInventory.refresh_owner(owner.id)
     db.session.commit()
     
     log_action('UPDATE', 'OWNER', str(owner.id), {'changes': list(data.keys())})
@@ -194,8 +197,13 @@ def update_owner(owner_id):
 def delete_owner(owner_id):
     """Delete an owner"""
     owner = Owner.query.get_or_404(owner_id)
+    vm_ids = [row.vm_id for row in VMManual.query.with_entities(VMManual.vm_id).filter(
+        db.or_(VMManual.business_owner_id == owner_id, VMManual.technical_owner_id == owner_id)
+    )]
     
     db.session.delete(owner)
+    db.session.flush()
+    EffectiveInventory.refresh(vm_ids)  # Owner references were set to NULL
     db.session.commit()
     
     log_action('DELETE', 'OWNER', str(owner_id), {'name': owner.full_name})
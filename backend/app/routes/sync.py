@@ -1,98 +1,91 @@
-from flask import Blueprint, request, jsonify
-from datetime import datetime, timezone
+from flask import Blueprint, request, jsonify, g, url_for
+from datetime import datetime, timezone, timedelta
 from app import db
-from app.models.sync import VMSyncRun
+from app.models.sync import VMSyncRun, SyncJob
 from app.models.network import VMwareNetwork
 from app.services.sync_service import SyncService
+from app.services.job_queue import SyncJobQueue
 from app.utils.decorators import login_required, admin_required, password_reset_not_required
 import requests
 from flask import current_app
 from app.utils.audit import log_action
+from app.utils.pagination import paginate, CursorError
 
 sync_bp = Blueprint('sync', __name__)
 
 
+def enqueue_sync_job(job_type, params=None):
+    """Queue a sync job and return a 202 response pointing at it"""
+    job, created = SyncJobQueue.enqueue(job_type, params, requested_by=g.current_user.id)
+    
+    if created:
+        log_action('SYNC_QUEUED', 'JOB', job.id, {'job_type': job_type, 'params': job.params})
+    
+    response = jsonify({
+        'status': 'queued',
+        'job_id': job.id,
+        'job': job.to_dict()
+    })
+    response.status_code = 202
+    response.headers['Location'] = url_for('sync.get_sync_job', job_id=job.id)
+    return response
+
+
 @sync_bp.route('/nutanix', methods=['POST'])
 @admin_required
 @password_reset_not_required
 def sync_nutanix():
-    """Trigger sync for Nutanix platform"""
-    service = SyncService()
-    result = service.sync_platform('nutanix')
-    
-    if result['status'] == 'error':
-        log_action('SYNC_ERROR', 'PLATFORM', 'nutanix', {'error': result.get('error')})
-        return jsonify(result), 500
-    
-    log_action('SYNC_TRIGGER', 'PLATFORM', 'nutanix', {'status': 'success'})
-    return jsonify(result)
+    """Queue sync for Nutanix platform"""
+    return enqueue_sync_job(SyncJob.TYPE_NUTANIX)
 
 
 @sync_bp.route('/vmware', methods=['POST'])
 @admin_required
 @password_reset_not_required
 def sync_vmware():
-    """Trigger sync for VMware platform"""
-    service = SyncService()
-    result = service.sync_platform('vmware')
-    
-    if result['status'] == 'error':
-        log_action('SYNC_ERROR', 'PLATFORM', 'vmware', {'error': result.get('error')})
-        return jsonify(result), 500
-    
-    log_action('SYNC_TRIGGER', 'PLATFORM', 'vmware', {'status': 'success'})
-    return jsonify(result)
+    """Queue sync for VMware platform"""
+    return enqueue_sync_job(SyncJob.TYPE_VMWARE)
 
 
 @sync_bp.route('/all', methods=['POST'])
 @admin_required
 @password_reset_not_required
 def sync_all():
-    """Trigger sync for all platforms"""
-    service = SyncService()
-    
-    results = {
-        'nutanix': service.sync_platform('nutanix'),
-        'vmware': service.sync_platform('vmware'),
-        'hosts': service.sync_hosts(),
+    """Queue sync for all platforms, hosts and networks"""
+    return enqueue_sync_job(SyncJob.TYPE_ALL)
 
-        'networks': {
-            'vmware': service.sync_networks('vmware'),
-            'nutanix': service.sync_networks('nutanix')
-        }
-    }
+
+@sync_bp.route('/jobs', methods=['GET'])
+@admin_required
+@password_reset_not_required
+def list_sync_jobs():
+    """List sync jobs, newest first"""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    status = request.args.get('status', '').strip()
     
-    # Check if any failed
-    has_error = False
+    query = SyncJob.query
+    if status:
+        query = query.filter(SyncJob.status == status)
+    
+    pagination = query.order_by(SyncJob.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
     
-    # Check VM syncs
-    if results['nutanix']['status'] == 'error' or results['vmware']['status'] == 'error':
-        has_error = True
-        
-    # Check host errors
-    if results['hosts']['vmware']['errors'] or results['hosts']['nutanix']['errors']:
-        # This is a soft error (partial success maybe), but let's flag it
-        has_error = True
-        
-    # Check network errors
-    if results['networks']['vmware']['errors'] or results['networks']['nutanix']['errors']:
-        has_error = True
-
-    if has_error:
-        log_action('SYNC_Trigger', 'ALL', 'all', {'status': 'partial', 'results': results})
-        return jsonify({
-            'status': 'partial',
-            'results': results
-        }), 207  # Multi-Status
-    
-    log_action('SYNC_TRIGGER', 'ALL', 'all', {'status': 'success'})
     return jsonify({
-        'status': 'success',
-        'results': results
+        'jobs': [j.to_dict() for j in pagination.items],
+        'total': pagination.total,
+        'page': page,
+        'per_page': per_page,
+        'pages': pagination.pages
     })
 
 
-
+@sync_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@admin_required
+@password_reset_not_required
+def get_sync_job(job_id):
+    """Get a sync job with its progress and result"""
+    job = SyncJob.query.get_or_404(job_id)
+    return jsonify({'job': job.to_dict()})
 
 
 @sync_bp.route('/networks', methods=['POST'])
@@ -142,9 +135,7 @@ def list_networks():
 @admin_required
 @password_reset_not_required
 def list_sync_runs():
-    """List sync runs"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    """List sync runs (offset or cursor pages)"""
     platform = request.args.get('platform', '').strip()
     status = request.args.get('status', '').strip()
     
@@ -155,16 +146,83 @@ def list_sync_runs():
     if status:
         query = query.filter(VMSyncRun.status == status)
     
-    query = query.order_by(VMSyncRun.started_at.desc())
+    # Newest first; started_at is always set on insert
+    try:
+        runs, page_meta = paginate(
+            query, VMSyncRun.started_at, VMSyncRun.id,
+            sort='started_at:desc', descending=True, nullable=False, default_per_page=20
+        )
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
     
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    return jsonify({'runs': [r.to_dict() for r in runs], **page_meta})
+
+
+@sync_bp.route('/runs/trends', methods=['GET'])
+@admin_required
+@password_reset_not_required
+def get_sync_run_trends():
+    """Per-phase timing trend over recent VM sync runs"""
+    platform = request.args.get('platform', '').strip()
+    days = request.args.get('days', 30, type=int)
+    limit = min(request.args.get('limit', 100, type=int), 500)
+    
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    query = VMSyncRun.query.filter(
+        VMSyncRun.started_at >= since,
+        VMSyncRun.status == 'SUCCESS'
+    )
+    if platform:
+        query = query.filter(VMSyncRun.platform == platform)
+    else:
+        query = query.filter(VMSyncRun.platform.in_(['vmware', 'nutanix']))
+    
+    runs = query.order_by(VMSyncRun.started_at.desc()).limit(limit).all()
+    
+    points = []
+    phase_totals = {}
+    for run in reversed(runs):
+        details = run.details or {}
+        timings = details.get('timings')
+        if not timings:
+            continue
+        
+        fetches = details.get('api_fetches') or []
+        points.append({
+            'id': run.id,
+            'platform': run.platform,
+            'started_at': run.started_at.isoformat() if run.started_at else None,
+            'vms_processed': details.get('vms_processed'),
+            'vms_unchanged': details.get('vms_unchanged'),
+            'bytes_downloaded': sum(f.get('bytes') or 0 for f in fetches),
+            'total_wall_seconds': timings.get('total_wall_seconds'),
+            'phases': {
+                name: phase.get('wall_seconds')
+                for name, phase in (timings.get('phases') or {}).items()
+            }
+        })
+        
+        for name, phase in (timings.get('phases') or {}).items():
+            totals = phase_totals.setdefault(name, {'wall': [], 'cpu': []})
+            totals['wall'].append(phase.get('wall_seconds') or 0)
+            totals['cpu'].append(phase.get('cpu_seconds') or 0)
+    
+    phases = {
+        name: {
+            'avg_wall_seconds': round(sum(totals['wall']) / len(totals['wall']), 3),
+            'max_wall_seconds': max(totals['wall']),
+            'avg_cpu_seconds': round(sum(totals['cpu']) / len(totals['cpu']), 3),
+            'latest_wall_seconds': totals['wall'][-1],
+            'samples': len(totals['wall'])
+        }
+        for name, totals in phase_totals.items()
+    }
     
     return jsonify({
-        'runs': [r.to_dict() for r in pagination.items],
-        'total': pagination.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': pagination.pages
+        'platform': platform or None,
+        'days': days,
+        'runs': points,
+        'phases': phases
     })
 
 
@@ -197,6 +255,7 @@ def get_sync_status():
     
     # Check for running syncs
     running = VMSyncRun.query.filter_by(status='RUNNING').count()
+    queued = SyncJob.query.filter_by(status=SyncJob.STATUS_QUEUED).count()
     
     # Get network count
     network_count = VMwareNetwork.query.count()
@@ -205,5 +264,6 @@ def get_sync_status():
         'nutanix': latest_nutanix.to_dict() if latest_nutanix else None,
         'vmware': latest_vmware.to_dict() if latest_vmware else None,
         'syncs_running': running,
+        'jobs_queued': queued,
         'vmware_networks_count': network_count
     })
@@ -1,25 +1,40 @@
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, request, jsonify, g, Response, stream_with_context
 from datetime import datetime, timezone
 from app import db
-from app.models.vm import VM, VMFact, VMNicFact, VMNicIpFact, VMDiskFact, VMManual, VMTag, VMIpManual, VMCustomField
+from app.models.vm import VM, VMNicFact, VMNicIpFact, VMDiskFact, VMManual, VMTag, VMIpManual, VMCustomField, VMEffective
 from app.models.public_network import VMPublicNetwork
 from app.models.dns_record import VMDNSRecord
 from app.models.owner import Owner
 from app.models.network import VMwareNetwork
 from app.models.host import Host
-from app.utils.decorators import login_required, admin_required, password_reset_not_required
+from app.utils.decorators import login_required, admin_required, password_reset_not_required, conditional_get
 from app.utils.audit import log_action
+from app.utils.pagination import paginate, CursorError
+from app.utils.ip_address import normalize_ip, parse_network
+from app.services.vm_effective import EffectiveInventory
+from app.services.inventory_export import InventoryExport
+from app.services.inventory_summary import InventorySummary
 
 vms_bp = Blueprint('vms', __name__)
 
 
-@vms_bp.route('', methods=['GET'])
-@login_required
-@password_reset_not_required
-def list_vms():
-    """List all VMs with effective values"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
+def _vm_ids_with_ip(condition):
+    """Select of VM ids with a NIC or manual IP matching condition(ip_column)"""
+    nic_vm_ids = db.select(VMNicFact.vm_id).join(
+        VMNicIpFact, VMNicIpFact.nic_id == VMNicFact.id
+    ).where(condition(VMNicIpFact.ip_address))
+    manual_vm_ids = db.select(VMIpManual.vm_id).where(condition(VMIpManual.ip_address))
+    return nic_vm_ids.union(manual_vm_ids)
+
+
+def _apply_vm_filters(query):
+    """
+    Apply the inventory filters in request.args to a query that selects
+    from vm_effective (shared by the list and the export).
+    
+    Raises:
+        ValueError: for an invalid filter value (message is client-facing)
+    """
     search = request.args.get('search', '').strip()
     platform = request.args.get('platform', '').strip()
     power_state = request.args.get('power_state', '').strip()
@@ -33,168 +48,127 @@ def list_vms():
     tag = request.args.get('tag', '').strip()
     division_id = request.args.get('division_id', type=int)
     include_deleted = request.args.get('include_deleted', 'false').lower() == 'true'
-    
-    query = VM.query
+    ip = request.args.get('ip', '').strip()
+    ip_in = request.args.get('ip_in', '').strip()
     
     # Filter deleted
     if not include_deleted:
-        query = query.filter(VM.is_deleted == False)
+        query = query.filter(VMEffective.is_deleted == False)
     
-    # Search (name, UUID, or IP address)
+    # Search (name, UUID, hostname, IPs, tags or owner names), served by
+    # the trigram index on vm_effective.search_text
     if search:
-        search_filter = f'%{search}%'
-        # Get VM IDs that match by IP address (cast INET to text for ILIKE)
-        ip_vm_ids_nic = db.session.query(VMNicIpFact.nic_id).join(
-            VMNicFact, VMNicIpFact.nic_id == VMNicFact.id
-        ).filter(db.cast(VMNicIpFact.ip_address, db.String).ilike(search_filter)).subquery()
-        
-        vm_ids_from_nic = db.session.query(VMNicFact.vm_id).filter(
-            VMNicFact.id.in_(db.select(ip_vm_ids_nic))
-        ).subquery()
-        
-        ip_vm_ids_manual = db.session.query(VMIpManual.vm_id).filter(
-            db.cast(VMIpManual.ip_address, db.String).ilike(search_filter)
-        ).subquery()
-        
-        query = query.filter(
-            db.or_(
-                VM.vm_name.ilike(search_filter),
-                VM.vm_uuid.ilike(search_filter),
-                VM.id.in_(db.select(vm_ids_from_nic)),
-                VM.id.in_(db.select(ip_vm_ids_manual))
-            )
-        )
+        query = query.filter(VMEffective.search_text.contains(search.lower(), autoescape=True))
+    
+    # IP filters: exact address (ip) or subnet membership (ip_in, e.g.
+    # 10.20.0.0/16), over NIC and manual IPs via their GiST indexes
+    if ip:
+        address = normalize_ip(ip)
+        if not address:
+            raise ValueError('Invalid ip')
+        query = query.filter(VMEffective.vm_id.in_(_vm_ids_with_ip(lambda column: column == address)))
+    if ip_in:
+        try:
+            subnet = str(parse_network(ip_in))
+        except ValueError:
+            raise ValueError('Invalid ip_in subnet')
+        query = query.filter(VMEffective.vm_id.in_(_vm_ids_with_ip(lambda column: column.op('<<=')(subnet))))
     
     # Platform filter
     if platform:
-        query = query.filter(VM.platform == platform)
+        query = query.filter(VMEffective.platform == platform)
     
     # Power state filter
     if power_state:
-        query = query.join(VMFact).filter(VMFact.power_state == power_state)
+        query = query.filter(VMEffective.power_state == power_state)
     
     # Environment filter
     if environment:
-        query = query.join(VMManual).filter(VMManual.environment == environment)
+        query = query.filter(VMEffective.environment == environment)
     
     # Cluster filter
     if cluster:
-        query = query.join(VMFact).filter(VMFact.cluster_name == cluster)
+        query = query.filter(VMEffective.cluster_name == cluster)
     
     # Owner filter (business or technical owner)
     if owner_id:
-        query = query.join(VMManual).filter(
+        query = query.filter(
             db.or_(
-                VMManual.business_owner_id == owner_id,
-                VMManual.technical_owner_id == owner_id
+                VMEffective.business_owner_id == owner_id,
+                VMEffective.technical_owner_id == owner_id
             )
         )
     
     # Network filter (network name or network ID)
     if network:
-        query = query.join(VMNicFact).filter(
+        network_vm_ids = db.select(VMNicFact.vm_id).where(
             db.or_(
                 VMNicFact.network_name.ilike(f'%{network}%'),
                 VMNicFact.network_name == network
             )
-        ).distinct()
+        )
+        query = query.filter(VMEffective.vm_id.in_(network_vm_ids))
     
     # Host identifier filter
     if host_identifier:
-        if not hasattr(query, '_vmfact_joined'):
-            query = query.join(VMFact)
-            query._vmfact_joined = True
-        query = query.filter(VMFact.host_identifier == host_identifier)
+        query = query.filter(VMEffective.host_identifier == host_identifier)
     
     # OS Type filter
     if os_type:
-        if not hasattr(query, '_vmfact_joined'):
-            query = query.join(VMFact)
-            query._vmfact_joined = True
-        query = query.filter(VMFact.os_type.ilike(f'%{os_type}%'))
+        query = query.filter(VMEffective.os_type.ilike(f'%{os_type}%'))
     
-    # OS Family filter
     # OS Family filter
     if os_family:
-        if not hasattr(query, '_vmfact_joined'):
-            query = query.join(VMFact)
-            query._vmfact_joined = True
-        
-        if not hasattr(query, '_manual_joined'):
-            query = query.outerjoin(VMManual)
-            query._manual_joined = True
-
-        query = query.filter(
-            db.or_(
-                # Method 1: Manual Override is True and Matches
-                db.and_(
-                    VMManual.override_os_family == True, 
-                    VMManual.manual_os_family.ilike(os_family)
-                ),
-                # Method 2: Manual Override is False/Null and Fact Matches
-                db.and_(
-                    db.or_(VMManual.override_os_family == None, VMManual.override_os_family == False),
-                    VMFact.os_family.ilike(os_family)
-                )
-            )
-        )
+        query = query.filter(db.func.lower(VMEffective.os_family) == os_family.lower())
     
-    # Tag filter
+    # Tag filter (tag_values is lower-cased)
     if tag:
-        query = query.join(VMTag).filter(VMTag.tag_value.ilike(tag))
+        query = query.filter(VMEffective.tag_values.contains([tag.lower()]))
     
     # Division filter
     if division_id:
-        if not hasattr(query, '_manual_joined'):
-            query = query.outerjoin(VMManual)
-            query._manual_joined = True
-        query = query.filter(VMManual.division_id == division_id)
+        query = query.filter(VMEffective.division_id == division_id)
+    
+    return query
+
+
+@vms_bp.route('', methods=['GET'])
+@login_required
+@password_reset_not_required
+@conditional_get('inventory', 'hosts')
+def list_vms():
+    """List all VMs with effective values (offset or cursor pages, see app.utils.pagination)"""
+    # Filters and sorting run against the vm_effective read model
+    try:
+        query = _apply_vm_filters(VM.query.join(VMEffective, VMEffective.vm_id == VM.id))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     # Sorting
     sort_by = request.args.get('sort_by', 'vm_name')
     sort_order = request.args.get('order', 'asc')
     
-    sort_column = VM.vm_name
-    query_joined = False
-    
-    if sort_by == 'vm_name':
-        sort_column = VM.vm_name
-    elif sort_by == 'platform':
-        sort_column = VM.platform
-    elif sort_by == 'power_state':
-        if not query_joined:
-            query = query.join(VMFact)
-            query_joined = True
-        sort_column = VMFact.power_state
-    elif sort_by == 'cluster_name':
-        if not query_joined:
-            query = query.join(VMFact)
-            query_joined = True
-        sort_column = VMFact.cluster_name
-    elif sort_by == 'memory_gb':
-        if not query_joined:
-            query = query.join(VMFact)
-            query_joined = True
-        sort_column = VMFact.memory_mb
-    elif sort_by == 'total_vcpus':
-        if not query_joined:
-            query = query.join(VMFact)
-            query_joined = True
-        sort_column = VMFact.total_vcpus
-    elif sort_by == 'environment':
-        query = query.join(VMManual)
-        sort_column = VMManual.environment
-    elif sort_by == 'total_disk_gb':
-        # Sorting by aggregated disk size is complex in ORM, skipping for now or defaults to name
-        # A proper implementation would require a subquery or aggregation
-        sort_column = VM.vm_name
-
-    if sort_order == 'desc':
-        query = query.order_by(sort_column.desc())
-    else:
-        query = query.order_by(sort_column.asc())
-    
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    sort_columns = {
+        'vm_name': VMEffective.vm_name,
+        'platform': VMEffective.platform,
+        'power_state': VMEffective.power_state,
+        'cluster_name': VMEffective.cluster_name,
+        'memory_gb': VMEffective.memory_mb,
+        'total_vcpus': VMEffective.total_vcpus,
+        'environment': VMEffective.environment,
+        'total_disk_gb': VMEffective.total_disk_gb,
+    }
+    if sort_by not in sort_columns:
+        sort_by = 'vm_name'
+    sort_order = 'desc' if sort_order == 'desc' else 'asc'
+    
+    try:
+        vms, page_meta = paginate(
+            query, sort_columns[sort_by], VMEffective.vm_id,
+            sort=f'{sort_by}:{sort_order}', descending=sort_order == 'desc'
+        )
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
     
     # Build host IP -> hostname mapping
     hosts = Host.query.all()
@@ -202,218 +176,51 @@ def list_vms():
     
     # Enrich VMs with host_hostname
     vms_data = []
-    for vm in pagination.items:
-        vm_dict = vm.to_effective_dict()
+    for vm_dict in VM.load_effective_dicts(vms):
         host_ip = vm_dict.get('host_identifier')
         vm_dict['host_hostname'] = host_map.get(host_ip) if host_ip else None
         vms_data.append(vm_dict)
     
-    return jsonify({
-        'vms': vms_data,
-        'total': pagination.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': pagination.pages
-    })
+    return jsonify({'vms': vms_data, **page_meta})
 
 
 @vms_bp.route('/summary', methods=['GET'])
 @login_required
 @password_reset_not_required
+@conditional_get('inventory')
 def get_summary():
-    """Get VM summary statistics"""
-    # Total counts
-    total_vms = VM.query.filter(VM.is_deleted == False).count()
-    deleted_vms = VM.query.filter(VM.is_deleted == True).count()
-    
-    # By platform
-    by_platform = db.session.query(
-        VM.platform,
-        db.func.count(VM.id)
-    ).filter(VM.is_deleted == False).group_by(VM.platform).all()
-    
-    # By power state
-    by_power_state = db.session.query(
-        VMFact.power_state,
-        db.func.count(VMFact.vm_id)
-    ).join(VM).filter(VM.is_deleted == False).group_by(VMFact.power_state).all()
-    
-    # By cluster
-    by_cluster = db.session.query(
-        VMFact.cluster_name,
-        db.func.count(VMFact.vm_id)
-    ).join(VM).filter(VM.is_deleted == False).group_by(VMFact.cluster_name).all()
-    
-    # By environment
-    by_environment = db.session.query(
-        VMManual.environment,
-        db.func.count(VMManual.vm_id)
-    ).join(VM).filter(VM.is_deleted == False).group_by(VMManual.environment).all()
-    
-    # By OS Family (with manual override support)
-    effective_os_family = db.case(
-        (VMManual.override_os_family == True, VMManual.manual_os_family),
-        else_=VMFact.os_family
-    ).label('effective_os_family')
-    
-    by_os_family_query = db.session.query(
-        effective_os_family,
-        db.func.count(VM.id)
-    ).select_from(VM).outerjoin(VMManual).join(VMFact).filter(VM.is_deleted == False).group_by(effective_os_family).all()
-    
-    # Process OS Family data
-    os_family_stats = {}
-    for family, count in by_os_family_query:
-        if not family:
-            key = 'Unknown/Unspecified'
-        else:
-            key = family.title() # Normalize to Title Case (Linux, Windows)
-            
-        os_family_stats[key] = os_family_stats.get(key, 0) + count
-    
-    # Distinct tags
-    all_tags = db.session.query(
-        VMTag.tag_value
-    ).distinct().order_by(VMTag.tag_value).all()
-    tags_list = [t[0] for t in all_tags if t[0]]
-    
-    return jsonify({
-        'total_vms': total_vms,
-        'deleted_vms': deleted_vms,
-        'by_platform': {p[0]: p[1] for p in by_platform if p[0]},
-        'by_power_state': {p[0]: p[1] for p in by_power_state if p[0]},
-        'by_cluster': {c[0]: c[1] for c in by_cluster if c[0]},
-        'by_environment': {e[0]: e[1] for e in by_environment if e[0]},
-        'by_os_family': os_family_stats,
-        'tags': tags_list
-    })
+    """Get VM summary statistics (cached until the next sync or edit)"""
+    return jsonify(InventorySummary.get())
 
 
 @vms_bp.route('/export', methods=['GET'])
 @login_required
 @password_reset_not_required
 def export_vms():
-    """Export VM inventory as CSV"""
-    import csv
-    import io
-    from flask import make_response
-
-    platform = request.args.get('platform', '').strip()
-    power_state = request.args.get('power_state', '').strip()
-    os_family = request.args.get('os_family', '').strip()
-    
-    query = VM.query.filter(VM.is_deleted == False)
-    
-    if platform:
-        query = query.filter(VM.platform == platform)
-    
-    if power_state:
-        query = query.join(VMFact).filter(VMFact.power_state == power_state)
-    
-    if os_family:
-        query = query.join(VMFact).outerjoin(VMManual).filter(
-            db.or_(
-                db.and_(VMManual.override_os_family == True, VMManual.manual_os_family.ilike(os_family)),
-                db.and_(
-                    db.or_(VMManual.override_os_family == None, VMManual.override_os_family == False),
-                    VMFact.os_family.ilike(os_family)
-                )
-            )
-        )
-    
-    query = query.order_by(VM.vm_name)
-    vms = query.all()
-    
-    # Build lookups
-    hosts = Host.query.all()
-    host_map = {h.hypervisor_ip: h.hostname for h in hosts if h.hypervisor_ip}
-    
-    owners = Owner.query.all()
-    owner_map = {o.id: o.full_name for o in owners}
-    
-    # Build CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    headers = [
-        'VM Name', 'Platform', 'UUID', 'Power State', 'OS Type', 'OS Family',
-        'Cluster', 'Host IP', 'Host Name', 'vCPUs', 'Memory (MB)',
-        'Total Disk (GB)', 'Total NICs', 'IP Addresses', 'Networks',
-        'Business Owner', 'Technical Owner', 'Environment', 'Tags',
-        'Created', 'Last Updated'
-    ]
-    writer.writerow(headers)
-    
-    for vm in vms:
-        vm_dict = vm.to_effective_dict()
-        
-        # Collect IPs
-        ips = []
-        for nic in vm.nics:
-            for ip in nic.ip_addresses:
-                if ip.ip_address:
-                    ips.append(ip.ip_address)
-        for ip in vm.manual_ips:
-            if ip.ip_address:
-                ips.append(ip.ip_address)
-        
-        # Collect networks
-        networks = set()
-        for nic in vm.nics:
-            if nic.network_name:
-                networks.add(nic.network_name)
-        
-        # Get owner names
-        business_owner = ''
-        technical_owner = ''
-        if vm.manual:
-            if vm.manual.business_owner_id:
-                business_owner = owner_map.get(vm.manual.business_owner_id, '')
-            if vm.manual.technical_owner_id:
-                technical_owner = owner_map.get(vm.manual.technical_owner_id, '')
-        
-        # Get tags
-        tags = ', '.join([t.tag_value for t in vm.tags])
-        
-        # Get environment
-        environment = vm.manual.environment if vm.manual else ''
-        
-        host_ip = vm_dict.get('host_identifier', '')
-        host_name = host_map.get(host_ip, '') if host_ip else ''
-        
-        writer.writerow([
-            vm.vm_name,
-            vm.platform,
-            vm.vm_uuid,
-            vm_dict.get('power_state', ''),
-            vm_dict.get('os_type', ''),
-            vm_dict.get('os_family', ''),
-            vm_dict.get('cluster_name', ''),
-            host_ip,
-            host_name,
-            vm_dict.get('total_vcpus', ''),
-            vm_dict.get('memory_mb', ''),
-            vm_dict.get('total_disk_gb', ''),
-            vm_dict.get('total_nics', ''),
-            '; '.join(ips),
-            '; '.join(networks),
-            business_owner,
-            technical_owner,
-            environment or '',
-            tags,
-            vm_dict.get('creation_date', ''),
-            vm_dict.get('last_update_date', '')
-        ])
-    
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = 'attachment; filename=vm_inventory_export.csv'
-    return response
+    """
+    Export the filtered VM inventory, streamed chunk by chunk.
+    
+    format: csv (default), ndjson (gzip), parquet or arrow
+    """
+    export_format = request.args.get('format', 'csv').strip().lower()
+    try:
+        query = _apply_vm_filters(InventoryExport.select())
+        stream = InventoryExport.stream(query, export_format)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    mimetype, extension = InventoryExport.FORMATS[export_format]
+    return Response(
+        stream_with_context(stream),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=vm_inventory_export.{extension}'}
+    )
 
 
 @vms_bp.route('/<int:vm_id>', methods=['GET'])
 @login_required
 @password_reset_not_required
+@conditional_get('vm', 'vmware_networks', 'vm_custom_fields')
 def get_vm(vm_id):
     """Get a specific VM with all details"""
     vm = VM.query.get_or_404(vm_id)
@@ -429,7 +236,7 @@ def get_vm(vm_id):
     
     # NICs with resolved network names
     nics_data = []
-    for nic in vm.nics:
+    for nic in vm.nics.order_by(VMNicFact.id):
         nic_dict = nic.to_dict()
         # Add friendly network name
         network_id = nic.network_name  # This might be like "network-18894" or "dvportgroup-10279"
@@ -462,9 +269,9 @@ def get_vm(vm_id):
             'source': 'MANUAL',
             'rank': 1
         })
-    for nic in vm.nics:
+    for nic in vm.nics.order_by(VMNicFact.id):
         network_name = network_mapping.get(nic.network_name, nic.network_name)
-        for ip in nic.ip_addresses:
+        for ip in nic.ip_addresses.order_by(VMNicIpFact.ip_address):
             effective_ips.append({
                 'ip_address': ip.ip_address,
                 'label': network_name,
@@ -561,6 +368,7 @@ def update_manual(vm_id):
     manual.updated_by = g.current_user.username
     manual.updated_at = datetime.now(timezone.utc)
     
+    EffectiveInventory.refresh([vm_id])
     db.session.commit()
     
     # Audit log
@@ -601,6 +409,7 @@ def add_tag(vm_id):
             created_by=g.current_user.username
         )
         db.session.add(tag)
+        EffectiveInventory.refresh([vm_id])
         db.session.commit()
     
     return jsonify({
@@ -616,6 +425,7 @@ def remove_tag(vm_id, tag_id):
     """Remove a tag from a VM by ID"""
     tag = VMTag.query.filter_by(vm_id=vm_id, id=tag_id).first_or_404()
     db.session.delete(tag)
+    EffectiveInventory.refresh([vm_id])
     db.session.commit()
     
     return jsonify({'message': 'Tag removed successfully'})
@@ -641,8 +451,12 @@ def add_manual_ip(vm_id):
     if not data or not data.get('ip_address'):
         return jsonify({'error': 'ip_address is required'}), 400
     
+    ip_address = normalize_ip(data['ip_address'])
+    if not ip_address:
+        return jsonify({'error': 'ip_address is not a valid IP address'}), 400
+    
     # Check if IP exists for this VM
-    existing = VMIpManual.query.filter_by(vm_id=vm_id, ip_address=data['ip_address']).first()
+    existing = VMIpManual.query.filter_by(vm_id=vm_id, ip_address=ip_address).first()
     if existing:
         existing.label = data.get('label', existing.label)
         existing.is_primary = data.get('is_primary', existing.is_primary)
@@ -650,7 +464,7 @@ def add_manual_ip(vm_id):
     else:
         ip = VMIpManual(
             vm_id=vm_id,
-            ip_address=data['ip_address'],
+            ip_address=ip_address,
             label=data.get('label'),
             is_primary=data.get('is_primary', False),
             notes=data.get('notes'),
@@ -658,6 +472,7 @@ def add_manual_ip(vm_id):
         )
         db.session.add(ip)
     
+    EffectiveInventory.refresh([vm_id])
     db.session.commit()
     
     return jsonify({
@@ -673,6 +488,7 @@ def remove_manual_ip(vm_id, ip_id):
     """Remove a manual IP from a VM"""
     ip = VMIpManual.query.filter_by(id=ip_id, vm_id=vm_id).first_or_404()
     db.session.delete(ip)
+    EffectiveInventory.refresh([vm_id])
     db.session.commit()
     
     return jsonify({'message': 'Manual IP removed successfully'})
@@ -756,6 +572,7 @@ def update_public_network(vm_id):
     pn.updated_by = g.current_user.username
     pn.updated_at = datetime.now(timezone.utc)
     
+    EffectiveInventory.refresh([vm_id])
     db.session.commit()
     
     log_action('UPDATE', 'VM_PUBLIC_NETWORK', str(vm_id), {'changes': list(data.keys())})
@@ -791,6 +608,7 @@ def update_dns_records(vm_id):
         db.session.add(dns)
         new_records.append(dns)
     
+    EffectiveInventory.refresh([vm_id])
     db.session.commit()
     
     log_action('UPDATE', 'VM_DNS_RECORDS', str(vm_id), {'count': len(new_records)})
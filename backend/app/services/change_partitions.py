@@ -0,0 +1,185 @@
+"""
+Change History Partitions
+
+vm_change_history is range-partitioned by month on changed_at. This module
+creates partitions ahead of time, drops whole partitions that fall outside
+the retention window, and converts a pre-existing unpartitioned table.
+
+Partitions are named vm_change_history_pYYYYMM and cover
+[first of month, first of next month) in UTC.
+"""
+import re
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import text
+from app import db
+from app.models.sync import VMChangeHistory
+
+PARENT_TABLE = 'vm_change_history'
+PARTITION_PATTERN = re.compile(r'^vm_change_history_p(\d{4})(\d{2})$')
+
+
+def _month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def _partition_name(month):
+    return f"{PARENT_TABLE}_p{month.year:04d}{month.month:02d}"
+
+
+class ChangeHistoryPartitions:
+    """Maintain the monthly partitions of vm_change_history"""
+
+    # Serialises partition DDL between processes (init_db, scheduler leader)
+    LOCK_KEY = 0x564D495F4348  # "VMI_CH"
+
+    @staticmethod
+    def is_partitioned(conn):
+        return conn.execute(
+            text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:name)"),
+            {'name': PARENT_TABLE}
+        ).scalar()
+
+    @staticmethod
+    def existing_partitions(conn):
+        """Month starts of attached partitions, oldest first"""
+        names = conn.execute(text("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(:name)
+        """), {'name': PARENT_TABLE}).scalars()
+
+        months = []
+        for name in names:
+            match = PARTITION_PATTERN.match(name)
+            if match:
+                months.append(datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc))
+        return sorted(months)
+
+    @staticmethod
+    def _create_partition(conn, month):
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {_partition_name(month)} "
+            f"PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        ))
+
+    @staticmethod
+    def ensure_partitions(conn, start=None, months_ahead=None):
+        """
+        Create any missing partitions from start's month (default: this
+        month) through months_ahead months from now.
+
+        Returns:
+            Names of the partitions created
+        """
+        if months_ahead is None:
+            months_ahead = current_app.config.get('CHANGE_PARTITIONS_AHEAD', 3)
+
+        current = _month_start(datetime.now(timezone.utc))
+        month = _month_start(start) if start else current
+        last = _add_months(current, months_ahead)
+
+        existing = set(ChangeHistoryPartitions.existing_partitions(conn))
+        created = []
+        while month <= last:
+            if month not in existing:
+                ChangeHistoryPartitions._create_partition(conn, month)
+                created.append(_partition_name(month))
+            month = _add_months(month, 1)
+        return created
+
+    @staticmethod
+    def apply_retention(conn, retention_months=None):
+        """
+        Detach and drop partitions that end before the retention window.
+
+        The window is whole months: with 12 months of retention, the current
+        month and the 12 before it are kept.
+
+        Returns:
+            Names of the partitions dropped
+        """
+        if retention_months is None:
+            retention_months = current_app.config.get('CHANGE_HISTORY_RETENTION_MONTHS', 0)
+        if not retention_months:
+            return []
+
+        cutoff = _add_months(_month_start(datetime.now(timezone.utc)), -retention_months)
+        dropped = []
+        for month in ChangeHistoryPartitions.existing_partitions(conn):
+            if month >= cutoff:
+                break
+            name = _partition_name(month)
+            conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+        return dropped
+
+    @staticmethod
+    def convert_table(conn):
+        """
+        Turn an unpartitioned vm_change_history into the partitioned layout.
+
+        The old table is renamed aside, the partitioned table and partitions
+        for its whole date range are created, rows are copied over and the
+        old table is dropped, all in the caller's transaction.
+
+        Returns:
+            Number of rows moved, or None if there was nothing to convert
+        """
+        if ChangeHistoryPartitions.is_partitioned(conn) is not False:
+            return None
+
+        legacy = f"{PARENT_TABLE}_unpartitioned"
+        conn.execute(text(f"ALTER TABLE {PARENT_TABLE} RENAME TO {legacy}"))
+        conn.execute(text(f"ALTER TABLE {legacy} RENAME CONSTRAINT {PARENT_TABLE}_pkey TO {legacy}_pkey"))
+        conn.execute(text(f"ALTER SEQUENCE IF EXISTS {PARENT_TABLE}_id_seq RENAME TO {legacy}_id_seq"))
+        conn.execute(text(f"UPDATE {legacy} SET changed_at = now() WHERE changed_at IS NULL"))
+
+        VMChangeHistory.__table__.create(conn)
+
+        oldest = conn.execute(text(f"SELECT min(changed_at) FROM {legacy}")).scalar()
+        ChangeHistoryPartitions.ensure_partitions(conn, start=oldest)
+
+        moved = conn.execute(text(f"""
+            INSERT INTO {PARENT_TABLE}
+                (id, vm_id, sync_run_id, change_type, field_name, old_value, new_value, changed_at)
+            SELECT id, vm_id, sync_run_id, change_type, field_name, old_value, new_value, changed_at
+            FROM {legacy}
+        """)).rowcount
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{PARENT_TABLE}', 'id'), "
+            f"COALESCE((SELECT max(id) FROM {PARENT_TABLE}), 0) + 1, false)"
+        ))
+        conn.execute(text(f"DROP TABLE {legacy}"))
+        return moved
+
+    @staticmethod
+    def maintain():
+        """
+        Convert if needed, create upcoming partitions and apply retention.
+
+        Runs at startup (init_db) and daily from the scheduler leader.
+        """
+        with db.engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': ChangeHistoryPartitions.LOCK_KEY})
+
+            moved = ChangeHistoryPartitions.convert_table(conn)
+            if moved is not None:
+                print(f"[Partitions] Converted {PARENT_TABLE} to monthly partitions ({moved} rows)")
+
+            created = ChangeHistoryPartitions.ensure_partitions(conn)
+            dropped = ChangeHistoryPartitions.apply_retention(conn)
+
+        for name in created:
+            print(f"[Partitions] Created {name}")
+        for name in dropped:
+            print(f"[Partitions] Dropped {name}")
+        return {'created': created, 'dropped': dropped}
@@ -0,0 +1,195 @@
+"""
+Change Rollup Service
+
+Maintains vm_change_rollup, hourly change counts per change type and
+platform, so dashboards and trends never have to aggregate raw
+vm_change_history rows. ChangeTracker adds to the rollup in the same
+transaction as the changes themselves; rebuild() recomputes it from the
+raw history (backfill_change_rollup.py).
+
+Counts are not reduced when change history is removed (VM deletes, dropped
+partitions), so long-range trends outlive the raw history's retention.
+"""
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app import db
+from app.models.vm import VM
+from app.models.sync import VMChangeHistory, VMChangeRollup
+
+
+def _hour(value):
+    return value.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+class ChangeRollup:
+    """Read and maintain hourly change counts"""
+
+    # range argument -> (window, bucket size)
+    RANGES = {
+        '24h': (timedelta(hours=24), 'hour'),
+        '7d': (timedelta(days=7), 'hour'),
+        '30d': (timedelta(days=30), 'day'),
+        '90d': (timedelta(days=90), 'day'),
+        '1y': (timedelta(days=365), 'week'),
+    }
+    INTERVALS = ('hour', 'day', 'week', 'month')
+
+    @staticmethod
+    def record(changes, platform=None):
+        """
+        Add change dicts (as buffered by ChangeTracker) to the rollup.
+
+        Args:
+            changes: Dicts with vm_id, change_type and changed_at
+            platform: Platform of all the changes; looked up per VM if None
+        """
+        if not changes:
+            return
+
+        platforms = {}
+        if platform is None:
+            vm_ids = {change['vm_id'] for change in changes}
+            platforms = dict(db.session.execute(
+                db.select(VM.id, VM.platform).where(VM.id.in_(vm_ids))
+            ).all())
+
+        counts = Counter(
+            (_hour(change['changed_at']), change['change_type'], platform or platforms.get(change['vm_id']))
+            for change in changes
+        )
+        # Sorted so concurrent writers lock rollup rows in the same order
+        rows = [
+            {'bucket': bucket, 'change_type': change_type, 'platform': vm_platform, 'change_count': count}
+            for (bucket, change_type, vm_platform), count in sorted(counts.items())
+            if vm_platform
+        ]
+        if not rows:
+            return
+
+        stmt = pg_insert(VMChangeRollup).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VMChangeRollup.bucket, VMChangeRollup.change_type, VMChangeRollup.platform],
+            set_={'change_count': VMChangeRollup.change_count + stmt.excluded.change_count}
+        )
+        db.session.execute(stmt)
+
+    @staticmethod
+    def rebuild(since=None):
+        """
+        Recompute the rollup from vm_change_history.
+
+        Args:
+            since: Only rebuild hours from this time on (default: everything)
+
+        Returns:
+            Number of rollup rows written
+        """
+        bucket_since = _hour(since) if since else None
+
+        # Wait for in-flight syncs to commit their changes, and hold new
+        # ones off, so no change is counted twice or missed
+        db.session.execute(text("LOCK TABLE vm_change_rollup IN EXCLUSIVE MODE"))
+
+        delete = db.delete(VMChangeRollup)
+        if bucket_since:
+            delete = delete.where(VMChangeRollup.bucket >= bucket_since)
+        db.session.execute(delete)
+
+        bucket = db.func.date_trunc('hour', VMChangeHistory.changed_at, 'UTC')
+        query = (
+            db.select(bucket, VMChangeHistory.change_type, VM.platform, db.func.count())
+            .join(VM, VM.id == VMChangeHistory.vm_id)
+            .group_by(bucket, VMChangeHistory.change_type, VM.platform)
+        )
+        if bucket_since:
+            query = query.where(VMChangeHistory.changed_at >= bucket_since)
+
+        written = db.session.execute(
+            db.insert(VMChangeRollup).from_select(
+                ['bucket', 'change_type', 'platform', 'change_count'], query
+            )
+        ).rowcount
+        db.session.commit()
+        return written
+
+    @staticmethod
+    def _base_query(since, platform=None, change_type=None):
+        query = db.select().where(VMChangeRollup.bucket >= since)
+        if platform:
+            query = query.where(VMChangeRollup.platform == platform)
+        if change_type:
+            query = query.where(VMChangeRollup.change_type == change_type)
+        return query
+
+    @staticmethod
+    def summary(hours=24):
+        """
+        Totals over the last `hours` hourly buckets (the current, partial
+        hour included).
+
+        Returns:
+            {total, by_type, by_platform}
+        """
+        since = _hour(datetime.now(timezone.utc)) - timedelta(hours=hours - 1)
+        rows = db.session.execute(
+            ChangeRollup._base_query(since).add_columns(
+                VMChangeRollup.change_type,
+                VMChangeRollup.platform,
+                db.func.sum(VMChangeRollup.change_count)
+            ).group_by(VMChangeRollup.change_type, VMChangeRollup.platform)
+        ).all()
+
+        by_type, by_platform = Counter(), Counter()
+        for change_type, platform, count in rows:
+            by_type[change_type] += count
+            by_platform[platform] += count
+
+        return {
+            'total': sum(by_type.values()),
+            'by_type': dict(by_type),
+            'by_platform': dict(by_platform)
+        }
+
+    @staticmethod
+    def trend(window, interval, platform=None, change_type=None):
+        """
+        Change counts per interval bucket over the last `window`.
+
+        Returns:
+            {since, points: [{bucket, total, by_type}], by_type, by_platform}
+        """
+        now = datetime.now(timezone.utc)
+        since = _hour(now - window)
+        bucket = db.func.date_trunc(interval, VMChangeRollup.bucket, 'UTC').label('bucket')
+
+        rows = db.session.execute(
+            ChangeRollup._base_query(since, platform, change_type).add_columns(
+                bucket,
+                VMChangeRollup.change_type,
+                VMChangeRollup.platform,
+                db.func.sum(VMChangeRollup.change_count)
+            ).group_by(bucket, VMChangeRollup.change_type, VMChangeRollup.platform)
+            .order_by(bucket)
+        ).all()
+
+        points = {}
+        by_type, by_platform = Counter(), Counter()
+        for point_bucket, row_type, row_platform, count in rows:
+            point = points.setdefault(point_bucket, {
+                'bucket': point_bucket.isoformat(),
+                'total': 0,
+                'by_type': Counter()
+            })
+            point['total'] += count
+            point['by_type'][row_type] += count
+            by_type[row_type] += count
+            by_platform[row_platform] += count
+
+        return {
+            'since': since.isoformat(),
+            'points': [dict(point, by_type=dict(point['by_type'])) for point in points.values()],
+            'by_type': dict(by_type),
+            'by_platform': dict(by_platform)
+        }
@@ -4,8 +4,10 @@ Change Tracker Service
 Detects changes between old and new VM data during sync operations.
 """
 from datetime import datetime, timezone
+from flask import current_app
 from app import db
 from app.models.sync import VMChangeHistory
+from app.services.change_rollup import ChangeRollup
 
 
 class ChangeTracker:
@@ -19,9 +21,25 @@ class ChangeTracker:
         'CLUSTER': ['cluster_name'],
     }
     
-    def __init__(self, sync_run_id=None):
+    # Rows per executemany batch (sent as multi-row INSERT ... VALUES)
+    INSERT_CHUNK_SIZE = 1000
+    
+    def __init__(self, sync_run_id=None, changed_at=None, buffer_size=None, platform=None):
+        """
+        Args:
+            sync_run_id: VMSyncRun the changes belong to
+            platform: Platform of the tracked VMs, for the change rollup
+                (looked up per VM when not given)
+            changed_at: Timestamp stamped on every change (one per sync run)
+            buffer_size: Pending changes held in memory before they are
+                written; defaults to CHANGE_BUFFER_SIZE
+        """
         self.sync_run_id = sync_run_id
+        self.platform = platform
+        self.changed_at = changed_at or datetime.now(timezone.utc)
+        self.buffer_size = buffer_size or current_app.config.get('CHANGE_BUFFER_SIZE', 5000)
         self.changes = []
+        self.saved_count = 0
     
     def compare_facts(self, vm_id, old_fact, new_fact_data):
         """
@@ -55,10 +73,10 @@ class ChangeTracker:
                         'field_name': field,
                         'old_value': old_str,
                         'new_value': new_str,
-                        'changed_at': datetime.now(timezone.utc)
+                        'changed_at': self.changed_at
                     })
         
-        self.changes.extend(changes)
+        self._record(changes)
         return changes
     
     def compare_disks(self, vm_id, old_disks, new_disks_data):
@@ -93,7 +111,7 @@ class ChangeTracker:
                     'field_name': 'disk_added',
                     'old_value': None,
                     'new_value': f"{disk.get('disk_label', 'Unknown')} ({disk.get('size_gb', 0)} GB)",
-                    'changed_at': datetime.now(timezone.utc)
+                    'changed_at': self.changed_at
                 })
         
         # Check for removed disks
@@ -106,7 +124,7 @@ class ChangeTracker:
                     'field_name': 'disk_removed',
                     'old_value': f"{disk.disk_label or 'Unknown'} ({disk.size_gb or 0} GB)",
                     'new_value': None,
-                    'changed_at': datetime.now(timezone.utc)
+                    'changed_at': self.changed_at
                 })
         
         # Check for size changes
@@ -125,10 +143,10 @@ class ChangeTracker:
                     'field_name': 'disk_size_changed',
                     'old_value': f"{old_disk.disk_label or 'Unknown'}: {old_size} GB",
                     'new_value': f"{new_disk.get('disk_label', 'Unknown')}: {new_size} GB",
-                    'changed_at': datetime.now(timezone.utc)
+                    'changed_at': self.changed_at
                 })
         
-        self.changes.extend(changes)
+        self._record(changes)
         return changes
     
     def compare_nics(self, vm_id, old_nics, new_nics_data):
@@ -156,7 +174,7 @@ class ChangeTracker:
                     'field_name': 'nic_added',
                     'old_value': None,
                     'new_value': f"{nic.get('network_name', 'Unknown')} ({mac})",
-                    'changed_at': datetime.now(timezone.utc)
+                    'changed_at': self.changed_at
                 })
         
         # Check for removed NICs
@@ -169,10 +187,10 @@ class ChangeTracker:
                     'field_name': 'nic_removed',
                     'old_value': f"{nic.network_name or 'Unknown'} ({mac})",
                     'new_value': None,
-                    'changed_at': datetime.now(timezone.utc)
+                    'changed_at': self.changed_at
                 })
         
-        self.changes.extend(changes)
+        self._record(changes)
         return changes
     
     def compare_ips(self, vm_id, old_nics, new_nics_data):
@@ -208,7 +226,7 @@ class ChangeTracker:
                     'field_name': 'ip_added',
                     'old_value': None,
                     'new_value': ip,
-                    'changed_at': datetime.now(timezone.utc)
+                    'changed_at': self.changed_at
                 })
         
         # Check for removed IPs
@@ -221,19 +239,37 @@ class ChangeTracker:
                     'field_name': 'ip_removed',
                     'old_value': ip,
                     'new_value': None,
-                    'changed_at': datetime.now(timezone.utc)
+                    'changed_at': self.changed_at
                 })
         
-        self.changes.extend(changes)
+        self._record(changes)
         return changes
     
+    def _record(self, changes):
+        """Buffer changes, writing them out once the buffer is full"""
+        self.changes.extend(changes)
+        if len(self.changes) >= self.buffer_size:
+            self.flush()
+    
+    def flush(self):
+        """Write buffered changes with multi-row INSERTs and update the hourly rollup"""
+        if not self.changes:
+            return
+        
+        rows, self.changes = self.changes, []
+        for start in range(0, len(rows), self.INSERT_CHUNK_SIZE):
+            db.session.execute(VMChangeHistory.__table__.insert(), rows[start:start + self.INSERT_CHUNK_SIZE])
+        ChangeRollup.record(rows, platform=self.platform)
+        self.saved_count += len(rows)
+    
     def save_changes(self):
-        """Save all tracked changes to database"""
-        for change_data in self.changes:
-            change = VMChangeHistory(**change_data)
-            db.session.add(change)
+        """
+        Save all tracked changes to database.
         
-        db.session.flush()
-        saved_count = len(self.changes)
-        self.changes = []
+        Returns:
+            Number of changes saved since the last call, including any
+            written early because the buffer filled up
+        """
+        self.flush()
+        saved_count, self.saved_count = self.saved_count, 0
         return saved_count
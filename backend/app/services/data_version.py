@@ -0,0 +1,95 @@
+"""
+Data Version Service
+
+Cheap fingerprints of the data behind read endpoints, used as ETag and
+cache keys. Each source is a scalar subquery; DataVersion.of() reads any
+set of them in a single round trip.
+
+- inventory: the latest finished sync run and the inventory counter in
+  data_version, bumped by every transaction that writes vm_effective (every
+  write path refreshes the rows it touches, so tags, manual data and
+  owner/division renames all move it)
+- vm: one VM (:vm_id), from its own rows: the VM (last seen, deleted), its
+  vm_effective refresh time, fact update time and manual update time.
+  Every write to a VM's tags, IPs, public network, DNS records or owners
+  refreshes its vm_effective row, so edits to other VMs leave it alone
+- hosts, networks, vmware_networks: row count and latest update time
+- vm_custom_fields: row count and latest update time for one VM (:vm_id)
+
+Counters are bumped when the writing transaction commits, after its final
+flush, so they only hold the counter row's lock for the commit itself. Each
+commit moves the counter, whatever order concurrent writers commit in.
+"""
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app import db
+
+_SOURCES = {
+    'inventory': """
+        (SELECT id FROM vm_sync_run
+         WHERE finished_at IS NOT NULL
+         ORDER BY finished_at DESC, id DESC
+         LIMIT 1) AS sync_run_id,
+        (SELECT version FROM data_version WHERE name = 'inventory') AS inventory_version
+    """,
+    'vm': """
+        (SELECT concat_ws('/', v.last_seen_at, v.is_deleted, e.refreshed_at, f.fact_updated_at, m.updated_at)
+         FROM vm v
+         LEFT JOIN vm_effective e ON e.vm_id = v.id
+         LEFT JOIN vm_fact f ON f.vm_id = v.id
+         LEFT JOIN vm_manual m ON m.vm_id = v.id
+         WHERE v.id = :vm_id) AS vm
+    """,
+    'hosts': "(SELECT count(*) || '/' || COALESCE(max(updated_at)::text, '') FROM hosts) AS hosts",
+    'networks': "(SELECT count(*) || '/' || COALESCE(max(updated_at)::text, '') FROM networks) AS networks",
+    'vmware_networks': """
+        (SELECT count(*) || '/' || COALESCE(max(last_sync_at)::text, '') FROM vmware_networks) AS vmware_networks
+    """,
+    'vm_custom_fields': """
+        (SELECT count(*) || '/' || COALESCE(max(updated_at)::text, '')
+         FROM vm_custom_field WHERE vm_id = :vm_id) AS vm_custom_fields
+    """,
+}
+
+
+class DataVersion:
+    """Read and bump data versions"""
+
+    @staticmethod
+    def touch(counter):
+        """Bump `counter` in data_version when the current transaction commits"""
+        db.session.info.setdefault('data_version_touched', set()).add(counter)
+
+    @staticmethod
+    def of(*sources, **params):
+        """
+        Args:
+            sources: Names from _SOURCES
+            params: Bind values some sources need (vm_id)
+
+        Returns:
+            Tuple of version values, in source order
+        """
+        sql = 'SELECT ' + ', '.join(_SOURCES[source] for source in sources)
+        return tuple(db.session.execute(text(sql), params).one())
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_touched(session):
+    if session.in_nested_transaction():
+        return  # Savepoint; the outer commit bumps
+    touched = session.info.pop('data_version_touched', None)
+    if not touched:
+        return
+
+    session.flush()  # Take the counter lock last, so it is held only while committing
+    for counter in sorted(touched):
+        session.execute(text("""
+            INSERT INTO data_version (name, version) VALUES (:name, 1)
+            ON CONFLICT (name) DO UPDATE SET version = data_version.version + 1
+        """), {'name': counter})
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_touched(session):
+    session.info.pop('data_version_touched', None)
@@ -0,0 +1,313 @@
+"""
+Inventory Export Service
+
+Streams the filtered inventory out of vm_effective without holding it in
+memory: VMs are read through a server-side cursor EXPORT_CHUNK_SIZE rows
+at a time, each chunk's IPs, networks and tags are loaded with one query
+per kind, and the chunk is formatted and handed to the response before
+the next one is read.
+
+Formats:
+- csv: one text row per VM, lists joined into strings
+- ndjson: gzip-compressed JSON lines, lists kept as arrays
+- parquet / arrow: typed columns with list<string> IPs, networks and tags,
+  zstd-compressed (need pyarrow)
+"""
+import csv
+import importlib.util
+import io
+import json
+import zlib
+from collections import defaultdict
+from flask import current_app
+from app import db
+from app.models.vm import VMEffective, VMFact, VMNicFact, VMNicIpFact, VMIpManual, VMTag
+from app.models.host import Host
+
+
+class InventoryExport:
+    """Build export rows from a filtered vm_effective select"""
+
+    # (row key, CSV header)
+    COLUMNS = [
+        ('vm_name', 'VM Name'),
+        ('platform', 'Platform'),
+        ('vm_uuid', 'UUID'),
+        ('power_state', 'Power State'),
+        ('os_type', 'OS Type'),
+        ('os_family', 'OS Family'),
+        ('cluster_name', 'Cluster'),
+        ('host_ip', 'Host IP'),
+        ('host_name', 'Host Name'),
+        ('total_vcpus', 'vCPUs'),
+        ('memory_mb', 'Memory (MB)'),
+        ('total_disk_gb', 'Total Disk (GB)'),
+        ('total_nics', 'Total NICs'),
+        ('ip_addresses', 'IP Addresses'),
+        ('networks', 'Networks'),
+        ('business_owner', 'Business Owner'),
+        ('technical_owner', 'Technical Owner'),
+        ('environment', 'Environment'),
+        ('tags', 'Tags'),
+        ('creation_date', 'Created'),
+        ('last_update_date', 'Last Updated'),
+    ]
+
+    # format: (mimetype, file extension)
+    FORMATS = {
+        'csv': ('text/csv', 'csv'),
+        'ndjson': ('application/gzip', 'ndjson.gz'),
+        'parquet': ('application/vnd.apache.parquet', 'parquet'),
+        'arrow': ('application/vnd.apache.arrow.file', 'arrow'),
+    }
+    COLUMNAR_FORMATS = ('parquet', 'arrow')
+
+    @staticmethod
+    def select():
+        """Unfiltered select of the per-VM export columns"""
+        return db.select(
+            VMEffective.vm_id, VMEffective.vm_name, VMEffective.platform, VMEffective.vm_uuid,
+            VMEffective.power_state, VMEffective.os_type, VMEffective.os_family,
+            VMEffective.cluster_name, VMEffective.host_identifier, VMEffective.total_vcpus,
+            VMEffective.memory_mb, VMEffective.total_disk_gb, VMFact.total_nics,
+            VMEffective.business_owner_name, VMEffective.technical_owner_name,
+            VMEffective.environment, VMFact.creation_date, VMFact.last_update_date
+        ).select_from(VMEffective).outerjoin(VMFact, VMFact.vm_id == VMEffective.vm_id)
+
+    @staticmethod
+    def _children(vm_ids):
+        """IPs (NIC IPs, then manual IPs), networks and tags of a chunk of VMs"""
+        ips, networks, tags = defaultdict(list), defaultdict(list), defaultdict(list)
+
+        for vm_id, ip_address in db.session.execute(
+            db.select(VMNicFact.vm_id, VMNicIpFact.ip_address)
+            .join(VMNicIpFact, VMNicIpFact.nic_id == VMNicFact.id)
+            .where(VMNicFact.vm_id.in_(vm_ids))
+            .order_by(VMNicFact.vm_id, VMNicFact.id, VMNicIpFact.ip_address)
+        ):
+            ips[vm_id].append(ip_address)
+        for vm_id, ip_address in db.session.execute(
+            db.select(VMIpManual.vm_id, VMIpManual.ip_address)
+            .where(VMIpManual.vm_id.in_(vm_ids))
+            .order_by(VMIpManual.vm_id, VMIpManual.id)
+        ):
+            ips[vm_id].append(ip_address)
+
+        for vm_id, network_name in db.session.execute(
+            db.select(VMNicFact.vm_id, VMNicFact.network_name).distinct()
+            .where(VMNicFact.vm_id.in_(vm_ids), VMNicFact.network_name.isnot(None))
+            .order_by(VMNicFact.vm_id, VMNicFact.network_name)
+        ):
+            networks[vm_id].append(network_name)
+
+        for vm_id, tag_value in db.session.execute(
+            db.select(VMTag.vm_id, VMTag.tag_value)
+            .where(VMTag.vm_id.in_(vm_ids))
+            .order_by(VMTag.vm_id, VMTag.id)
+        ):
+            tags[vm_id].append(tag_value)
+
+        return ips, networks, tags
+
+    @staticmethod
+    def iter_batches(query, chunk_size=None):
+        """
+        Yield lists of export rows (dicts keyed like COLUMNS, with Python
+        types and lists for IPs, networks and tags) in VM name order.
+
+        Args:
+            query: InventoryExport.select(), filtered
+            chunk_size: Rows per server-side cursor fetch (EXPORT_CHUNK_SIZE)
+        """
+        chunk_size = chunk_size or current_app.config.get('EXPORT_CHUNK_SIZE', 1000)
+        host_map = {
+            host.hypervisor_ip: host.hostname
+            for host in Host.query.with_entities(Host.hypervisor_ip, Host.hostname) if host.hypervisor_ip
+        }
+
+        result = db.session.execute(
+            query.order_by(VMEffective.vm_name, VMEffective.vm_id).execution_options(yield_per=chunk_size)
+        )
+        for chunk in result.partitions():
+            ips, networks, tags = InventoryExport._children([row.vm_id for row in chunk])
+            yield [
+                {
+                    'vm_name': row.vm_name,
+                    'platform': row.platform,
+                    'vm_uuid': row.vm_uuid,
+                    'power_state': row.power_state,
+                    'os_type': row.os_type,
+                    'os_family': row.os_family,
+                    'cluster_name': row.cluster_name,
+                    'host_ip': row.host_identifier,
+                    'host_name': host_map.get(row.host_identifier) if row.host_identifier else None,
+                    'total_vcpus': row.total_vcpus,
+                    'memory_mb': row.memory_mb,
+                    'total_disk_gb': float(row.total_disk_gb) if row.total_disk_gb is not None else None,
+                    'total_nics': row.total_nics,
+                    'ip_addresses': ips.get(row.vm_id, []),
+                    'networks': networks.get(row.vm_id, []),
+                    'business_owner': row.business_owner_name,
+                    'technical_owner': row.technical_owner_name,
+                    'environment': row.environment,
+                    'tags': tags.get(row.vm_id, []),
+                    'creation_date': row.creation_date,
+                    'last_update_date': row.last_update_date,
+                }
+                for row in chunk
+            ]
+
+    @staticmethod
+    def iter_csv(query):
+        """Yield the CSV export, header first, then one string per chunk"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def flush():
+            data = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return data
+
+        writer.writerow([header for _, header in InventoryExport.COLUMNS])
+        yield flush()  # The download starts before the first query runs
+
+        for batch in InventoryExport.iter_batches(query):
+            for row in batch:
+                writer.writerow([
+                    InventoryExport._csv_value(key, row[key]) for key, _ in InventoryExport.COLUMNS
+                ])
+            yield flush()
+
+    @staticmethod
+    def _csv_value(key, value):
+        if value is None:
+            return ''
+        if key == 'tags':
+            return ', '.join(value)
+        if isinstance(value, list):
+            return '; '.join(value)
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def iter_ndjson(query):
+        """Yield the gzip-compressed NDJSON export, one compressed block per chunk"""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        yield compressor.compress(b'')  # gzip header
+
+        for batch in InventoryExport.iter_batches(query):
+            lines = ''.join(json.dumps(row, default=InventoryExport._json_value) + '\n' for row in batch)
+            yield compressor.compress(lines.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+    @staticmethod
+    def _json_value(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+    @staticmethod
+    def arrow_schema():
+        """Arrow schema of the columnar exports (raises ImportError without pyarrow)"""
+        import pyarrow as pa
+
+        text, text_list = pa.string(), pa.list_(pa.string())
+        timestamp = pa.timestamp('us', tz='UTC')
+        types = {
+            'total_vcpus': pa.int32(),
+            'memory_mb': pa.int32(),
+            'total_disk_gb': pa.float64(),
+            'total_nics': pa.int32(),
+            'ip_addresses': text_list,
+            'networks': text_list,
+            'tags': text_list,
+            'creation_date': timestamp,
+            'last_update_date': timestamp,
+        }
+        return pa.schema([(key, types.get(key, text)) for key, _ in InventoryExport.COLUMNS])
+
+    @staticmethod
+    def iter_columnar(query, export_format):
+        """
+        Yield a Parquet or Arrow IPC file, built from one record batch per
+        cursor chunk. Parquet row groups collect chunks up to
+        EXPORT_ROW_GROUP_SIZE rows; Arrow writes each batch as it comes.
+        Needs pyarrow (stream() checks for it up front).
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = InventoryExport.arrow_schema()
+        sink = _ChunkSink()
+        if export_format == 'parquet':
+            writer = pq.ParquetWriter(sink, schema, compression='zstd')
+            row_group_size = current_app.config.get('EXPORT_ROW_GROUP_SIZE', 50000)
+        else:
+            writer = pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression='zstd'))
+            row_group_size = 0
+
+        pending, pending_rows = [], 0
+        yield sink.drain()  # File magic, so the download starts immediately
+        for batch in InventoryExport.iter_batches(query):
+            record_batch = pa.RecordBatch.from_pylist(batch, schema=schema)
+            if not row_group_size:
+                writer.write_batch(record_batch)
+            else:
+                pending.append(record_batch)
+                pending_rows += record_batch.num_rows
+                if pending_rows >= row_group_size:
+                    writer.write_table(pa.Table.from_batches(pending, schema=schema))
+                    pending, pending_rows = [], 0
+            data = sink.drain()
+            if data:
+                yield data
+
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending, schema=schema))
+        writer.close()
+        yield sink.drain()
+
+    @staticmethod
+    def stream(query, export_format):
+        """
+        Generator for an export format (see FORMATS).
+
+        Raises:
+            ValueError: for an unknown format, or a columnar one without pyarrow
+        """
+        if export_format == 'csv':
+            return InventoryExport.iter_csv(query)
+        if export_format == 'ndjson':
+            return InventoryExport.iter_ndjson(query)
+        if export_format in InventoryExport.COLUMNAR_FORMATS:
+            if importlib.util.find_spec('pyarrow') is None:
+                raise ValueError(f'{export_format} export requires pyarrow, which is not installed')
+            return InventoryExport.iter_columnar(query, export_format)
+        raise ValueError(f"Invalid format. Use one of: {', '.join(InventoryExport.FORMATS)}")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that collects pyarrow output until the next drain()"""
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
@@ -0,0 +1,99 @@
+"""
+Inventory Summary Service
+
+Dashboard counts come from one grouping-sets query over vm_effective (plus
+the distinct tag list, in the same statement), cached per process.
+
+The cache key is the 'inventory' DataVersion: the most recently finished
+sync run plus the inventory counter, which every transaction that writes
+vm_effective bumps as it commits. Any worker therefore recomputes the
+summary as soon as a sync or an edit commits, and serves it from memory
+otherwise.
+"""
+import threading
+from sqlalchemy import text
+from app import db
+from app.services.data_version import DataVersion
+
+# Columns counted by the summary, in GROUPING() argument order
+_DIMENSIONS = ('platform', 'power_state', 'cluster_name', 'environment', 'os_family')
+_ALL_GROUPED = (1 << len(_DIMENSIONS)) - 1  # GROUPING() of the () set
+_TAG_ROW = -1
+
+_SUMMARY_SQL = """
+    SELECT GROUPING({dimensions}) AS grouping_id,
+           COALESCE({dimensions}) AS value,
+           count(*) FILTER (WHERE NOT is_deleted) AS active,
+           count(*) FILTER (WHERE is_deleted) AS deleted
+    FROM vm_effective
+    GROUP BY GROUPING SETS ((), {sets})
+    UNION ALL
+    SELECT {tag_row}, tag_value, NULL, NULL
+    FROM (SELECT DISTINCT tag_value FROM vm_tag WHERE tag_value IS NOT NULL AND tag_value <> '') tags
+    ORDER BY grouping_id, value
+""".format(
+    dimensions=', '.join(_DIMENSIONS),
+    sets=', '.join(f'({column})' for column in _DIMENSIONS),
+    tag_row=_TAG_ROW,
+)
+
+class InventorySummary:
+    """Cached dashboard summary of vm_effective"""
+
+    _lock = threading.Lock()
+    _cached = None  # (key, summary)
+
+    @staticmethod
+    def version():
+        """Cache key: (latest finished sync run id, inventory counter)"""
+        return DataVersion.of('inventory')
+
+    @staticmethod
+    def get():
+        """Summary dict for GET /api/vms/summary, recomputed only when the version moves"""
+        key = InventorySummary.version()
+        cached = InventorySummary._cached
+        if cached and cached[0] == key:
+            return cached[1]
+
+        summary = InventorySummary.compute()
+        with InventorySummary._lock:
+            InventorySummary._cached = (key, summary)
+        return summary
+
+    @staticmethod
+    def compute():
+        """Run the summary query"""
+        summary = {
+            'total_vms': 0,
+            'deleted_vms': 0,
+            'by_platform': {},
+            'by_power_state': {},
+            'by_cluster': {},
+            'by_environment': {},
+            'by_os_family': {},
+            'tags': [],
+        }
+        sections = {
+            _ALL_GROUPED ^ (1 << (len(_DIMENSIONS) - 1 - index)): section
+            for index, section in enumerate(
+                ('by_platform', 'by_power_state', 'by_cluster', 'by_environment', 'by_os_family')
+            )
+        }
+
+        for row in db.session.execute(text(_SUMMARY_SQL)):
+            if row.grouping_id == _TAG_ROW:
+                summary['tags'].append(row.value)
+            elif row.grouping_id == _ALL_GROUPED:
+                summary['total_vms'] = row.active
+                summary['deleted_vms'] = row.deleted
+            elif row.active:
+                section = sections[row.grouping_id]
+                if section == 'by_os_family':
+                    # Normalise to Title Case (Linux, Windows)
+                    family = row.value.title() if row.value else 'Unknown/Unspecified'
+                    summary[section][family] = summary[section].get(family, 0) + row.active
+                elif row.value:
+                    summary[section][row.value] = row.active
+
+        return summary
@@ -0,0 +1,260 @@
+"""
+Sync Job Queue
+
+Runs sync requests in the background. API endpoints enqueue a SyncJob row
+and return immediately; a worker claims queued jobs with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers (threads in the
+web processes or the standalone sync_worker.py) can share one queue.
+"""
+import os
+import socket
+import threading
+from datetime import datetime, timezone, timedelta
+from flask import current_app
+from app import db
+from app.models.sync import SyncJob
+from app.models.user import User
+
+
+class SyncJobQueue:
+    """Enqueue, claim and execute sync jobs"""
+
+    @staticmethod
+    def enqueue(job_type, params=None, requested_by=None):
+        """
+        Queue a sync job.
+
+        An identical job that is still queued or running is returned instead
+        of queueing a duplicate, so repeated clicks share one result. The
+        check and insert run under a transaction-level advisory lock per job
+        type, so concurrent requests cannot both queue the same job.
+
+        Returns:
+            (SyncJob, created)
+        """
+        if job_type not in SyncJob.TYPES:
+            raise ValueError(f"Unknown sync job type: {job_type}")
+
+        db.session.execute(
+            db.text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+            {'key': f"sync_job:{job_type}"}
+        )
+
+        params = params or {}
+        active_jobs = SyncJob.query.filter(
+            SyncJob.job_type == job_type,
+            SyncJob.status.in_(SyncJob.ACTIVE_STATUSES)
+        ).all()
+        for job in active_jobs:
+            if (job.params or {}) == params:
+                db.session.commit()  # Release the lock
+                return job, False
+
+        job = SyncJob(
+            job_type=job_type,
+            params=params,
+            status=SyncJob.STATUS_QUEUED,
+            requested_by=requested_by
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        notify_worker()
+        return job, True
+
+    @staticmethod
+    def claim_next(worker_name):
+        """
+        Atomically move the oldest queued job to RUNNING.
+
+        Returns:
+            Job ID, or None if the queue is empty
+        """
+        SyncJobQueue.fail_stale_jobs()
+
+        next_job = (
+            db.select(SyncJob.id)
+            .where(SyncJob.status == SyncJob.STATUS_QUEUED)
+            .order_by(SyncJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        now = datetime.now(timezone.utc)
+        job_id = db.session.execute(
+            db.update(SyncJob)
+            .where(SyncJob.id == next_job)
+            .values(
+                status=SyncJob.STATUS_RUNNING,
+                worker=worker_name,
+                started_at=now,
+                heartbeat_at=now
+            )
+            .returning(SyncJob.id)
+        ).scalar()
+        db.session.commit()
+        return job_id
+
+    @staticmethod
+    def fail_stale_jobs():
+        """Fail RUNNING jobs whose worker stopped sending heartbeats"""
+        stale_seconds = current_app.config.get('SYNC_JOB_STALE_SECONDS', 1800)
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=stale_seconds)
+
+        db.session.execute(
+            db.update(SyncJob)
+            .where(
+                SyncJob.status == SyncJob.STATUS_RUNNING,
+                SyncJob.heartbeat_at < cutoff
+            )
+            .values(
+                status=SyncJob.STATUS_FAILED,
+                error='Worker stopped responding',
+                finished_at=datetime.now(timezone.utc)
+            )
+        )
+        db.session.commit()
+
+    @staticmethod
+    def run_job(job_id):
+        """Execute a claimed job and store its result"""
+        from app.services.sync_service import SyncService
+        from app.utils.audit import log_action
+
+        job = SyncJob.query.get(job_id)
+        if not job:
+            return
+
+        user = User.query.get(job.requested_by) if job.requested_by else None
+        service = SyncService(job_id=job.id)
+
+        try:
+            if job.job_type in (SyncJob.TYPE_VMWARE, SyncJob.TYPE_NUTANIX):
+                status, result = SyncJobQueue._run_platform(service, job, user)
+            elif job.job_type == SyncJob.TYPE_ALL:
+                status, result = SyncJobQueue._run_all(service, job, user)
+            else:
+                status, result = SyncJobQueue._run_hosts(service, job, user)
+
+            job = SyncJob.query.get(job_id)
+            job.status = status
+            job.result = result
+            if status == SyncJob.STATUS_FAILED:
+                job.error = result.get('error')
+        except Exception as e:
+            db.session.rollback()
+            job = SyncJob.query.get(job_id)
+            job.status = SyncJob.STATUS_FAILED
+            job.error = str(e)
+            log_action('SYNC_ERROR', 'JOB', job.id, {'error': str(e)}, user=user)
+
+        job.phase = None
+        job.finished_at = datetime.now(timezone.utc)
+        db.session.commit()
+
+    @staticmethod
+    def _set_phase(job, phase):
+        job.phase = phase
+        job.heartbeat_at = datetime.now(timezone.utc)
+        db.session.commit()
+
+    @staticmethod
+    def _run_platform(service, job, user):
+        from app.utils.audit import log_action
+
+        platform = job.job_type
+        SyncJobQueue._set_phase(job, platform)
+        result = service.sync_platform(platform)
+
+        if result['status'] == 'error':
+            log_action('SYNC_ERROR', 'PLATFORM', platform, {'error': result.get('error')}, user=user)
+            return SyncJob.STATUS_FAILED, result
+
+        log_action('SYNC_TRIGGER', 'PLATFORM', platform, {'status': 'success'}, user=user)
+        return SyncJob.STATUS_SUCCESS, result
+
+    @staticmethod
+    def _run_all(service, job, user):
+        from app.utils.audit import log_action
+        from app.services.sync_pipeline import run_full_sync
+
+        def on_change(running_stages):
+            if running_stages:
+                SyncJobQueue._set_phase(job, ', '.join(running_stages))
+
+        results, has_error = run_full_sync(job_id=job.id, on_change=on_change)
+
+        if has_error:
+            log_action('SYNC_Trigger', 'ALL', 'all', {'status': 'partial', 'results': results}, user=user)
+            return SyncJob.STATUS_PARTIAL, {'status': 'partial', 'results': results}
+
+        log_action('SYNC_TRIGGER', 'ALL', 'all', {'status': 'success'}, user=user)
+        return SyncJob.STATUS_SUCCESS, {'status': 'success', 'results': results}
+
+    @staticmethod
+    def _run_hosts(service, job, user):
+        platform = (job.params or {}).get('platform')
+        SyncJobQueue._set_phase(job, 'hosts')
+        results = service.sync_hosts(platform)
+
+        return SyncJob.STATUS_SUCCESS, {
+            'message': f"Host sync completed for {platform or 'all platforms'}",
+            'results': results
+        }
+
+
+# In-process worker, only started when SYNC_JOB_WORKER=thread (development)
+_worker = None
+_wake = threading.Event()
+
+
+def notify_worker():
+    """Wake this process's worker so a new job starts without waiting a poll"""
+    _wake.set()
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_worker(app, stop_event=None):
+    """
+    Claim and run jobs until stop_event is set.
+
+    Used by the in-process worker thread and by sync_worker.py.
+    """
+    stop_event = stop_event or threading.Event()
+    poll_interval = app.config.get('SYNC_JOB_POLL_INTERVAL', 5)
+    name = worker_name()
+
+    while not stop_event.is_set():
+        job_id = None
+        with app.app_context():
+            try:
+                job_id = SyncJobQueue.claim_next(name)
+                if job_id:
+                    print(f"[SyncWorker] Running job {job_id}")
+                    SyncJobQueue.run_job(job_id)
+            except Exception as e:
+                print(f"[SyncWorker] Error: {e}")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+        if not job_id:
+            _wake.wait(poll_interval)
+            _wake.clear()
+
+
+def start_worker(app):
+    """Start the background worker thread for this process"""
+    global _worker
+
+    if app.config.get('SYNC_JOB_WORKER', 'external') != 'thread':
+        return
+    if _worker and _worker.is_alive():
+        return
+
+    _worker = threading.Thread(target=run_worker, args=(app,), name='sync-job-worker', daemon=True)
+    _worker.start()
+    print("[SyncWorker] Started")
@@ -1,48 +1,177 @@
 """
 Scheduler Service for automated sync jobs
+
+Every web process calls init_scheduler, but only one process in the
+deployment runs the scheduled jobs: the one holding a Postgres advisory
+lock on a dedicated connection. The others keep retrying, so if the leader
+dies (and its connection with it) another process takes over.
 """
+import os
+import threading
+import time
 from datetime import datetime, timezone
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import text
 
 # Global scheduler instance
 scheduler = BackgroundScheduler()
 _app = None
 
+# Advisory lock key shared by all processes; its holder is the scheduler leader
+SCHEDULER_LOCK_KEY = 0x564D495F5343  # "VMI_SC"
+
+_leader_conn = None  # Connection holding the advisory lock while leader
+_elector = None
+_settings_signature = None  # (enabled, interval) the current schedule was built from
+
 
 def init_scheduler(app):
-    """Initialize the scheduler with the Flask app context"""
-    global _app
+    """Initialize defaults and start contending for scheduler leadership"""
+    global _app, _elector
     _app = app
     
     with app.app_context():
         from app.models.settings import SiteSettings
-        from app import db
         
         # Initialize default settings
         try:
             SiteSettings.init_defaults()
-            # Start the scheduler - ONLY if DB is ready
-            if not scheduler.running:
-                scheduler.start()
-                print("[Scheduler] Started")
+        except Exception as e:
+            print(f"[Scheduler] Failed to initialize defaults (likely DB not ready): {e}")
+    
+    if _elector is None or not _elector.is_alive():
+        _elector = threading.Thread(target=_leader_loop, name='scheduler-leader', daemon=True)
+        _elector.start()
+
+
+def is_leader():
+    """True if this process currently owns the scheduler"""
+    return _leader_conn is not None
+
+
+def _leader_loop():
+    """Acquire leadership, then keep checking the lock and settings"""
+    interval = _app.config.get('SCHEDULER_LEADER_CHECK_SECONDS', 30)
+    
+    while True:
+        try:
+            if is_leader():
+                _check_leadership()
+            else:
+                _try_become_leader()
             
-            # Schedule sync job based on settings
-            reschedule_sync()
+            if is_leader():
+                # Settings may have been changed through another process
+                _reschedule_if_settings_changed()
         except Exception as e:
-            print(f"[Scheduler] Failed to initialize defaults or start scheduler (likely DB not ready): {e}")
+            print(f"[Scheduler] Leader election error: {e}")
+            _step_down()
+        
+        time.sleep(interval)
+
+
+def _try_become_leader():
+    global _leader_conn
+    from app import db
+    
+    with _app.app_context():
+        conn = db.engine.connect()
+        try:
+            acquired = conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {'key': SCHEDULER_LOCK_KEY}
+            ).scalar()
+            conn.commit()
+        except Exception:
+            conn.invalidate()
+            conn.close()
+            raise
+        
+        if not acquired:
+            conn.close()
+            return
+        
+        _leader_conn = conn
+    
+    print(f"[Scheduler] Process {os.getpid()} is the scheduler leader")
+    if not scheduler.running:
+        scheduler.start()
+        print("[Scheduler] Started")
+    else:
+        scheduler.resume()
+    reschedule_sync()
+    
+    # Keep change history partitions created ahead and apply retention
+    scheduler.add_job(
+        func=run_partition_maintenance,
+        trigger=IntervalTrigger(hours=24),
+        id='change_partitions',
+        name='Change History Partition Maintenance',
+        next_run_time=datetime.now(timezone.utc),
+        replace_existing=True
+    )
+
+
+def _check_leadership():
+    """The lock lives as long as the connection; make sure it is still up"""
+    _leader_conn.execute(text("SELECT 1"))
+    _leader_conn.commit()
+
+
+def _step_down():
+    """Stop running jobs and release the lock"""
+    global _leader_conn, _settings_signature
+    
+    if scheduler.running:
+        scheduler.remove_all_jobs()
+        scheduler.pause()
+    
+    if _leader_conn is not None:
+        # Discard the DBAPI connection rather than returning it to the pool,
+        # so the session-level lock is released with it
+        try:
+            _leader_conn.invalidate()
+            _leader_conn.close()
+        except Exception:
+            pass
+        _leader_conn = None
+        print(f"[Scheduler] Process {os.getpid()} gave up scheduler leadership")
+    
+    _settings_signature = None
+
+
+def _read_sync_settings():
+    from app.models.settings import SiteSettings
+    
+    sync_enabled = SiteSettings.get(SiteSettings.SYNC_ENABLED, 'false') == 'true'
+    interval_minutes = int(SiteSettings.get(SiteSettings.SYNC_INTERVAL_MINUTES, '60') or '60')
+    return sync_enabled, interval_minutes
+
+
+def _reschedule_if_settings_changed():
+    from app import db
+    
+    with _app.app_context():
+        signature = _read_sync_settings()
+        db.session.remove()
+    
+    if signature != _settings_signature:
+        reschedule_sync()
 
 
 def reschedule_sync():
-    """Reschedule the sync job based on current settings"""
-    global _app
+    """
+    Reschedule the sync job based on current settings.
+    
+    Only acts in the leader process; other processes' changes are picked up
+    by the leader on its next check.
+    """
+    global _app, _settings_signature
     
-    if not _app:
+    if not _app or not is_leader():
         return
     
     with _app.app_context():
-        from app.models.settings import SiteSettings
-        
         # Remove existing sync job if any
         try:
             scheduler.remove_job('scheduled_sync')
@@ -50,11 +179,10 @@ def reschedule_sync():
         except:
             pass
         
-        sync_enabled = SiteSettings.get(SiteSettings.SYNC_ENABLED, 'false') == 'true'
+        sync_enabled, interval_minutes = _read_sync_settings()
+        _settings_signature = (sync_enabled, interval_minutes)
         
         if sync_enabled:
-            interval_minutes = int(SiteSettings.get(SiteSettings.SYNC_INTERVAL_MINUTES, '60') or '60')
-            
             scheduler.add_job(
                 func=run_scheduled_sync,
                 trigger=IntervalTrigger(minutes=interval_minutes),
@@ -68,107 +196,52 @@ def reschedule_sync():
 
 
 def run_scheduled_sync():
-    """Execute the scheduled sync"""
+    """Queue the scheduled sync for the sync worker"""
     global _app
     
-    if not _app:
+    if not _app or not is_leader():
         return
     
     with _app.app_context():
-        from app.services.sync_service import SyncService
+        from app.models.sync import SyncJob
         from app.models.settings import SiteSettings
-        from app import db
-        
-        print(f"[Scheduler] Running scheduled sync at {datetime.now(timezone.utc).isoformat()}")
+        from app.services.job_queue import SyncJobQueue
         
         try:
-            sync_service = SyncService()
-            
-            # Sync VMware VMs
-            try:
-                result = sync_service.sync_platform('vmware')
-                print(f"[Scheduler] VMware sync complete: {result.get('stats', {})}")
-            except Exception as e:
-                print(f"[Scheduler] VMware sync error: {e}")
-            
-            # Sync Nutanix VMs
-            try:
-                result = sync_service.sync_platform('nutanix')
-                print(f"[Scheduler] Nutanix sync complete: {result.get('stats', {})}")
-            except Exception as e:
-                print(f"[Scheduler] Nutanix sync error: {e}")
-            
-            # Sync Hosts (Hypervisors)
-            try:
-                from app.routes.hosts import _upsert_host
-                from flask import current_app
-                import requests
-                
-                from app.models.system_api import SystemApi
-                
-                # Sync VMware hosts
-                try:
-                    apis = SystemApi.query.filter_by(resource_type='vmware_host', is_active=True).all()
-                    for api in apis:
-                        try:
-                            response = requests.request(
-                                method=api.method,
-                                url=api.url,
-                                headers=api.headers,
-                                json=api.payload,
-                                timeout=60
-                            )
-                            
-                            if response.status_code == 200:
-                                hosts_data = response.json()
-                                for host_data in hosts_data:
-                                    _upsert_host('vmware', host_data)
-                                print(f"[Scheduler] VMware hosts synced via {api.name}: {len(hosts_data)}")
-                            else:
-                                print(f"[Scheduler] API {api.name} returned {response.status_code}")
-                        except Exception as e:
-                            print(f"[Scheduler] API {api.name} error: {e}")
-                except Exception as e:
-                    print(f"[Scheduler] VMware sync error: {e}")
-
-                # Sync Nutanix hosts
-                try:
-                    apis = SystemApi.query.filter_by(resource_type='nutanix_host', is_active=True).all()
-                    for api in apis:
-                        try:
-                            response = requests.request(
-                                method=api.method,
-                                url=api.url,
-                                headers=api.headers,
-                                json=api.payload,
-                                timeout=60
-                            )
-                            
-                            if response.status_code == 200:
-                                hosts_data = response.json()
-                                for host_data in hosts_data:
-                                    _upsert_host('nutanix', host_data)
-                                print(f"[Scheduler] Nutanix hosts synced via {api.name}: {len(hosts_data)}")
-                            else:
-                                print(f"[Scheduler] API {api.name} returned {response.status_code}")
-                        except Exception as e:
-                            print(f"[Scheduler] API {api.name} error: {e}")
-                except Exception as e:
-                    print(f"[Scheduler] Nutanix sync error: {e}")
-                
-                db.session.commit()
-            except Exception as e:
-                print(f"[Scheduler] Host sync error: {e}")
+            # Same path as a manual "sync all": the worker runs it, and a sync
+            # that is already queued or running is shared instead of repeated
+            job, created = SyncJobQueue.enqueue(SyncJob.TYPE_ALL)
+            if created:
+                print(f"[Scheduler] Queued scheduled sync as job {job.id}")
+            else:
+                print(f"[Scheduler] Sync job {job.id} is already {job.status.lower()}, not queueing another")
             
             # Update last run timestamp
             SiteSettings.set(SiteSettings.SYNC_LAST_RUN, datetime.now(timezone.utc).isoformat())
             
         except Exception as e:
-            print(f"[Scheduler] Sync failed: {e}")
+            print(f"[Scheduler] Failed to queue scheduled sync: {e}")
+
+
+def run_partition_maintenance():
+    """Create upcoming change history partitions and drop expired ones"""
+    global _app
+    
+    if not _app or not is_leader():
+        return
+    
+    with _app.app_context():
+        from app.services.change_partitions import ChangeHistoryPartitions
+        
+        try:
+            ChangeHistoryPartitions.maintain()
+        except Exception as e:
+            print(f"[Scheduler] Partition maintenance failed: {e}")
 
 
 def shutdown_scheduler():
     """Shutdown the scheduler gracefully"""
+    _step_down()
     if scheduler.running:
         scheduler.shutdown()
         print("[Scheduler] Shutdown complete")
@@ -0,0 +1,181 @@
+"""
+Sync Pipeline
+
+Declarative set of sync stages with dependencies. Stages whose
+dependencies have finished run concurrently on a thread pool, each in its
+own app context (and so its own database session). Both the scheduler and
+manual "sync all" requests run the same pipeline.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from flask import current_app
+
+
+class Stage:
+    """One unit of sync work"""
+
+    def __init__(self, name, func, depends_on=None):
+        """
+        Args:
+            name: Unique stage name
+            func: Callable taking a SyncService and returning a result
+            depends_on: Names of stages that must finish first. A dependent
+                waits for its inputs to finish, whether or not they succeeded.
+        """
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on or [])
+
+
+class SyncPipeline:
+    """Runs stages as a dependency graph with bounded concurrency"""
+
+    def __init__(self, stages, max_workers=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max_workers or len(self.stages)
+        self._validate()
+
+    def _validate(self):
+        """Reject unknown dependencies and cycles"""
+        for stage in self.stages.values():
+            for dependency in stage.depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'")
+
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage '{name}'")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def run(self, job_id=None, on_change=None):
+        """
+        Execute all stages.
+
+        Args:
+            job_id: SyncJob the work belongs to, passed to each SyncService
+            on_change: Optional callback(running_stage_names), called from
+                the calling thread whenever the set of running stages changes
+
+        Returns:
+            dict of stage name -> {status, result, error, seconds}
+        """
+        app = current_app._get_current_object()
+        outcomes = {}
+        pending = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='sync-stage') as pool:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if all(dependency in outcomes for dependency in stage.depends_on):
+                        del pending[name]
+                        running[pool.submit(self._run_stage, app, stage, job_id)] = name
+
+                if on_change:
+                    on_change(sorted(running.values()))
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    outcomes[running.pop(future)] = future.result()
+
+        if on_change:
+            on_change([])
+        return outcomes
+
+    @staticmethod
+    def _run_stage(app, stage, job_id):
+        from app import db
+        from app.services.sync_service import SyncService
+
+        started = time.perf_counter()
+        outcome = {'status': 'success', 'result': None, 'error': None}
+
+        with app.app_context():
+            try:
+                outcome['result'] = stage.func(SyncService(job_id=job_id))
+            except Exception as e:
+                print(f"[SyncPipeline] Stage {stage.name} failed: {e}")
+                db.session.rollback()
+                outcome['status'] = 'error'
+                outcome['error'] = str(e)
+            finally:
+                db.session.remove()
+
+        outcome['seconds'] = round(time.perf_counter() - started, 3)
+        return outcome
+
+
+def full_sync_stages():
+    """Stages for a complete sync of VMs, hosts and networks on both platforms"""
+    return [
+        Stage('networks_vmware', lambda service: service.sync_networks('vmware')),
+        Stage('networks_nutanix', lambda service: service.sync_networks('nutanix')),
+        Stage('hosts', lambda service: service.sync_hosts()),
+        # VM NICs store network IDs that are resolved against the network
+        # tables, so refresh a platform's networks before its VMs
+        Stage('vms_vmware', lambda service: service.sync_platform('vmware'), depends_on=['networks_vmware']),
+        Stage('vms_nutanix', lambda service: service.sync_platform('nutanix'), depends_on=['networks_nutanix'])
+    ]
+
+
+def run_full_sync(job_id=None, on_change=None):
+    """
+    Run the full sync pipeline.
+
+    Returns:
+        (results, has_error) where results has the /api/sync/all shape:
+        {nutanix, vmware, hosts, networks: {vmware, nutanix}, stages}
+    """
+    pipeline = SyncPipeline(
+        full_sync_stages(),
+        max_workers=current_app.config.get('SYNC_PIPELINE_CONCURRENCY', 5)
+    )
+    outcomes = pipeline.run(job_id=job_id, on_change=on_change)
+
+    def result(name, failed):
+        outcome = outcomes[name]
+        if outcome['status'] == 'error':
+            return failed(outcome['error'])
+        return outcome['result']
+
+    vm_failed = lambda error: {'status': 'error', 'error': error}
+    networks_failed = lambda error: {'synced': 0, 'errors': [error]}
+    hosts_failed = lambda error: {
+        'vmware': {'synced': 0, 'errors': [error]},
+        'nutanix': {'synced': 0, 'errors': [error]}
+    }
+
+    results = {
+        'nutanix': result('vms_nutanix', vm_failed),
+        'vmware': result('vms_vmware', vm_failed),
+        'hosts': result('hosts', hosts_failed),
+        'networks': {
+            'vmware': result('networks_vmware', networks_failed),
+            'nutanix': result('networks_nutanix', networks_failed)
+        },
+        'stages': {
+            name: {'status': outcome['status'], 'seconds': outcome['seconds']}
+            for name, outcome in outcomes.items()
+        }
+    }
+
+    has_error = bool(
+        results['nutanix']['status'] == 'error'
+        or results['vmware']['status'] == 'error'
+        or results['hosts']['vmware']['errors']
+        or results['hosts']['nutanix']['errors']
+        or results['networks']['vmware']['errors']
+        or results['networks']['nutanix']['errors']
+    )
+    return results, has_error
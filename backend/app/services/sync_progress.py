@@ -0,0 +1,94 @@
+"""
+Sync Progress Reporter
+
+Publishes the progress of a running VM sync onto its VMSyncRun so that
+clients polling a sync job can follow it.
+"""
+import time
+from datetime import datetime, timezone
+from flask import current_app
+from app import db
+from app.models.sync import VMSyncRun, SyncJob
+
+
+class SyncProgress:
+    """Throttled progress reporter for one VMSyncRun"""
+
+    def __init__(self, sync_run_id, expected=None, job_id=None):
+        """
+        Args:
+            sync_run_id: VMSyncRun being reported on
+            expected: Estimated number of VMs (e.g. from the previous run),
+                used to derive a percentage
+            job_id: SyncJob to heartbeat, if the sync runs as a job
+        """
+        self.sync_run_id = sync_run_id
+        self.expected = expected
+        self.job_id = job_id
+        self.phase = 'starting'
+        self.processed = 0
+        self.interval = current_app.config.get('SYNC_PROGRESS_INTERVAL', 2.0)
+        self._last_publish = 0.0
+
+    def set_phase(self, phase):
+        """Move to a new phase and publish immediately"""
+        self.phase = phase
+        self.publish(force=True)
+
+    def advance(self, count):
+        """Record processed VMs; publishes at most once per interval"""
+        self.processed += count
+        self.publish()
+
+    def to_dict(self):
+        """Progress snapshot stored in VMSyncRun.progress"""
+        if self.phase == 'done':
+            percent = 100
+        elif self.expected:
+            # Estimate only: never report completion before the run finishes
+            percent = min(99, int(self.processed * 100 / self.expected))
+        else:
+            percent = None
+
+        return {
+            'phase': self.phase,
+            'processed': self.processed,
+            'expected': self.expected,
+            'percent': percent,
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }
+
+    def finish(self, phase='done'):
+        """Final snapshot; the caller stores it with the run's own commit"""
+        self.phase = phase
+        return self.to_dict()
+
+    def publish(self, force=False):
+        """
+        Write the snapshot in a separate short transaction.
+
+        The sync itself keeps one transaction open until it finishes, so
+        progress written through the session would not be visible to
+        pollers until the very end.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_publish < self.interval:
+            return
+        self._last_publish = now
+
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(
+                    db.update(VMSyncRun)
+                    .where(VMSyncRun.id == self.sync_run_id)
+                    .values(progress=self.to_dict())
+                )
+                if self.job_id:
+                    conn.execute(
+                        db.update(SyncJob)
+                        .where(SyncJob.id == self.job_id)
+                        .values(heartbeat_at=datetime.now(timezone.utc))
+                    )
+        except Exception as e:
+            # Progress is best effort; never fail the sync over it
+            print(f"Failed to publish sync progress: {e}")
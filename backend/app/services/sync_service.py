@@ -3,13 +3,25 @@ VM Sync Service
 
 Handles syncing VM data from Nutanix and VMware platforms.
 """
-import requests
-from datetime import datetime, timezone
+import hashlib
+import json
+import time
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
 from flask import current_app
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app import db
 from app.models.vm import VM, VMFact, VMNicFact, VMNicIpFact, VMDiskFact
-from app.models.sync import VMSyncRun
+from app.models.sync import VMSyncRun, SyncJob
 from app.services.change_tracker import ChangeTracker
+from app.services.vm_effective import EffectiveInventory
+from app.services.api_fetcher import ApiFetcher
+from app.services.sync_progress import SyncProgress
+from app.utils.json_stream import BodyStream, iter_items
+from app.utils.phase_timer import PhaseTimer
+from app.utils.ip_address import normalize_ip, is_apipa
 
 
 class SyncService:
@@ -18,8 +30,18 @@ class SyncService:
     PLATFORM_NUTANIX = 'nutanix'
     PLATFORM_VMWARE = 'vmware'
     
-    def __init__(self):
-        pass
+    # Rows per multi-row INSERT ... ON CONFLICT statement
+    UPSERT_CHUNK_SIZE = 1000
+    
+    # Part of every payload hash; bump to force a full rewrite on next sync
+    FINGERPRINT_VERSION = 2  # 2: IP normalisation and address validation
+    
+    def __init__(self, job_id=None):
+        self.job_id = job_id
+        self.progress = None
+        self.unchanged_count = 0
+        self.timer = PhaseTimer()
+        self.rows_written = {}
     
     def sync_platform(self, platform):
         """
@@ -31,13 +53,21 @@ class SyncService:
         Returns:
             dict with sync results
         """
-        # Create sync run record
-        sync_run = VMSyncRun(
-            platform=platform,
-            status='RUNNING'
-        )
-        db.session.add(sync_run)
-        db.session.commit()
+        # Previous run size, used to estimate progress
+        expected = db.session.execute(
+            db.select(VMSyncRun.vm_count_seen)
+            .where(VMSyncRun.platform == platform, VMSyncRun.status == 'SUCCESS')
+            .order_by(VMSyncRun.started_at.desc())
+            .limit(1)
+        ).scalar()
+        
+        # Create sync run record, or attach to the run already in progress
+        sync_run, active_run_id = self._claim_run(platform)
+        if active_run_id:
+            print(f"[Sync] {platform} sync already running (run {active_run_id}); waiting for its result")
+            return self._await_run(active_run_id)
+        
+        self.progress = SyncProgress(sync_run.id, expected=expected, job_id=self.job_id)
         
         try:
             from app.models.system_api import SystemApi
@@ -56,42 +86,62 @@ class SyncService:
             processed_count = 0
             changes_total = 0
             seen_vm_ids = []
+            api_fetches = []
+            self.unchanged_count = 0
+            self.timer = PhaseTimer()
+            self.rows_written = {}
+            self.changed_vm_ids = set()
+            run_started_at = datetime.now(timezone.utc)  # changed_at for every change in this run
             
-            for api in apis:
+            # Download all APIs concurrently; process each body as it completes.
+            # 'fetch' wall time is time spent waiting on downloads.
+            fetcher = ApiFetcher(resource_type, timeout=120)
+            self.progress.set_phase('fetching')
+            for api, fetch in self.timer.iterate('fetch', fetcher.fetch_all(apis)):
+                api_fetch = ApiFetcher.timing(api, fetch)
+                api_fetches.append(api_fetch)
+                self.progress.set_phase('processing')
+                changed_before = set(self.changed_vm_ids)
+                rows_written_before = dict(self.rows_written)
                 try:
-                    # Merge headers if needed
-                    headers = api.headers or {}
-                    
-                    # Fetch data from API
-                    response = requests.request(
-                        method=api.method,
-                        url=api.url,
-                        headers=headers,
-                        json=api.payload,
-                        timeout=120
-                    )
-                    response.raise_for_status()
-                    data = response.json()
-                    
-                    # Parse response based on platform
-                    if platform == self.PLATFORM_NUTANIX:
-                        vms_data = self._parse_nutanix_response(data)
-                    else:
-                        vms_data = self._parse_vmware_response(data)
-                    
-                    # Initialize change tracker
-                    change_tracker = ChangeTracker(sync_run_id=sync_run.id)
+                    if fetch['error']:
+                        raise Exception(fetch['error'])
                     
-                    # Process VMs
-                    for vm_data in vms_data:
-                        vm_id = self._process_vm(platform, vm_data, sync_run.id, change_tracker)
-                        if vm_id:
-                            seen_vm_ids.append(vm_id)
+                    # VMs are written chunk by chunk while the body is parsed, so
+                    # each API runs in a savepoint: a body that fails partway
+                    # (truncated, malformed, DB error) leaves no half-applied
+                    # VMs or facts without their change history
+                    with db.session.begin_nested():
+                        with fetch['body'] as body:
+                            stream = BodyStream(body, self._stream_chunk_size())
+                            
+                            # Parse response based on platform
+                            if platform == self.PLATFORM_NUTANIX:
+                                vms_data = self._iter_nutanix_vms(stream)
+                            else:
+                                vms_data = self._iter_vmware_vms(stream)
+                            
+                            # Initialize change tracker
+                            change_tracker = ChangeTracker(
+                                sync_run_id=sync_run.id, changed_at=run_started_at, platform=platform
+                            )
+                            
+                            # Process VMs as they are parsed
+                            vm_ids = self._process_vms(
+                                platform, self.timer.iterate('parse', vms_data), sync_run.id, change_tracker
+                            )
+                        
+                        # Save change history for this batch
+                        with self.timer.phase('change_save'):
+                            api_changes = change_tracker.save_changes()
                     
-                    # Save change history for this batch
-                    changes_total += change_tracker.save_changes()
+                    seen_vm_ids.extend(vm_ids)
+                    api_fetch['rows'] = len(vm_ids)
+                    changes_total += api_changes
                     
                 except Exception as e:
+                    self.changed_vm_ids = changed_before
+                    self.rows_written = rows_written_before
                     print(f"Error syncing from API {api.name}: {e}")
                     # Continue to next API if one fails?
                     # For now, let's log and continue, but we track errors
@@ -103,60 +153,169 @@ class SyncService:
                  raise Exception(f"No active APIs found for {resource_type}")
 
             # Soft delete VMs not seen in ANY of the API calls (combined list)
-            deleted_count = self._soft_delete_missing(platform, sync_run.id, seen_vm_ids)
+            self.progress.set_phase('deleting')
+            with self.timer.phase('soft_delete'):
+                deleted_count = self._soft_delete_missing(platform, sync_run.id, seen_vm_ids)
+            
+            # Bring the read model up to date in the same transaction
+            with self.timer.phase('effective_refresh'):
+                EffectiveInventory.refresh(self.changed_vm_ids)
+                EffectiveInventory.refresh_deleted_flags(platform)
+            
+            # Download threads' CPU time, on top of the wait measured above
+            self.timer.add('fetch', cpu=sum(f.get('cpu_seconds') or 0 for f in api_fetches), calls=0)
             
             # Update sync run
             sync_run.finished_at = datetime.now(timezone.utc)
             sync_run.status = 'SUCCESS'
             sync_run.vm_count_seen = len(seen_vm_ids)
+            sync_run.progress = self.progress.finish()
             sync_run.details = {
                 'vms_processed': len(seen_vm_ids),
                 'vms_deleted': deleted_count,
-                'changes_detected': changes_total
+                'vms_unchanged': self.unchanged_count,
+                'changes_detected': changes_total,
+                'api_fetches': api_fetches,
+                'timings': self.timer.to_dict(),
+                'rows_written': self.rows_written
             }
             db.session.commit()
             
-            return {
-                'status': 'success',
-                'sync_run_id': sync_run.id,
-                'vms_processed': len(seen_vm_ids),
-                'vms_deleted': deleted_count,
-                'changes_detected': changes_total
-            }
+            return self._run_result(sync_run.id, sync_run.status, sync_run.details)
             
         except Exception as e:
             sync_run.finished_at = datetime.now(timezone.utc)
             sync_run.status = 'FAILED'
-            sync_run.details = {'error': str(e)}
+            sync_run.progress = self.progress.finish('failed')
+            sync_run.details = {'error': str(e), 'timings': self.timer.to_dict()}
             db.session.commit()
             
+            return self._run_result(sync_run.id, sync_run.status, sync_run.details)
+    
+    def _claim_run(self, platform):
+        """
+        Start a VMSyncRun for platform unless one is already running.
+        
+        The check and insert run under a transaction-level advisory lock per
+        platform, so two callers can never both start a run. RUNNING runs
+        without progress for SYNC_RUN_STALE_SECONDS (e.g. the process died)
+        are marked FAILED and no longer block new runs.
+        
+        Returns:
+            (new VMSyncRun, None) or (None, ID of the active run)
+        """
+        db.session.execute(
+            db.text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+            {'key': f"vm_sync_run:{platform}"}
+        )
+        
+        now = datetime.now(timezone.utc)
+        stale_cutoff = now - timedelta(seconds=current_app.config.get('SYNC_RUN_STALE_SECONDS', 1800))
+        active = db.session.execute(
+            db.select(VMSyncRun.id, VMSyncRun.started_at, VMSyncRun.progress)
+            .where(VMSyncRun.platform == platform, VMSyncRun.status == 'RUNNING')
+            .order_by(VMSyncRun.id.desc())
+        ).all()
+        
+        for run in active:
+            last_activity = run.started_at
+            updated_at = (run.progress or {}).get('updated_at')
+            if updated_at:
+                last_activity = max(last_activity, datetime.fromisoformat(updated_at))
+            
+            if last_activity >= stale_cutoff:
+                db.session.commit()
+                return None, run.id
+            
+            db.session.execute(
+                db.update(VMSyncRun)
+                .where(VMSyncRun.id == run.id)
+                .values(
+                    status='FAILED',
+                    finished_at=now,
+                    details={'error': 'Sync run abandoned (no progress before timeout)'}
+                )
+            )
+        
+        sync_run = VMSyncRun(
+            platform=platform,
+            status='RUNNING',
+            job_id=self.job_id
+        )
+        db.session.add(sync_run)
+        db.session.commit()
+        return sync_run, None
+    
+    def _await_run(self, sync_run_id):
+        """Wait for another caller's run to finish and return its result"""
+        timeout = current_app.config.get('SYNC_RUN_STALE_SECONDS', 1800)
+        deadline = time.monotonic() + timeout
+        
+        while True:
+            run = db.session.execute(
+                db.select(VMSyncRun.status, VMSyncRun.details).where(VMSyncRun.id == sync_run_id)
+            ).one()
+            if self.job_id:
+                # Keep the waiting job from being treated as abandoned
+                db.session.execute(
+                    db.update(SyncJob)
+                    .where(SyncJob.id == self.job_id)
+                    .values(heartbeat_at=datetime.now(timezone.utc))
+                )
+            db.session.commit()  # Don't sit in an open transaction while waiting
+            
+            if run.status != 'RUNNING':
+                result = self._run_result(sync_run_id, run.status, run.details)
+                result['attached'] = True
+                return result
+            
+            if time.monotonic() > deadline:
+                return {
+                    'status': 'error',
+                    'sync_run_id': sync_run_id,
+                    'attached': True,
+                    'error': 'Timed out waiting for the running sync to finish'
+                }
+            
+            time.sleep(1)
+    
+    def _run_result(self, sync_run_id, status, details):
+        """Result dict for a finished VM sync run"""
+        details = details or {}
+        if status != 'SUCCESS':
             return {
                 'status': 'error',
-                'sync_run_id': sync_run.id,
-                'error': str(e)
+                'sync_run_id': sync_run_id,
+                'error': details.get('error')
             }
+        
+        return {
+            'status': 'success',
+            'sync_run_id': sync_run_id,
+            'vms_processed': details.get('vms_processed'),
+            'vms_deleted': details.get('vms_deleted'),
+            'vms_unchanged': details.get('vms_unchanged'),
+            'changes_detected': details.get('changes_detected')
+        }
     
-    def _parse_nutanix_response(self, data):
-        """Parse Nutanix API response"""
-        vms = []
-        
-        # Handle array response
-        if isinstance(data, list):
-            for item in data:
-                if 'vms' in item:
-                    vms.extend(item['vms'])
-        elif isinstance(data, dict) and 'vms' in data:
-            vms = data['vms']
-        
-        return vms
+    def _stream_chunk_size(self):
+        return current_app.config.get('SYNC_STREAM_CHUNK_SIZE', 65536)
     
-    def _parse_vmware_response(self, data):
-        """Parse VMware API response"""
-        if isinstance(data, list):
-            return data
-        elif isinstance(data, dict) and 'vms' in data:
-            return data['vms']
-        return []
+    def _iter_nutanix_vms(self, stream):
+        """
+        Yield VMs from a Nutanix API response.
+        
+        Accepts {"vms": [...]} or a list of {"vms": [...]} objects.
+        """
+        return iter_items(stream, 'item.vms.item', 'vms.item')
+    
+    def _iter_vmware_vms(self, stream):
+        """
+        Yield VMs from a VMware API response.
+        
+        Accepts a plain list of VMs or {"vms": [...]}.
+        """
+        return iter_items(stream, 'item', 'vms.item')
     
     def _process_vm(self, platform, vm_data, sync_run_id, change_tracker):
         """
@@ -170,8 +329,25 @@ class SyncService:
             return None
         
         # Find or create VM
-        vm = VM.query.filter_by(platform=platform, vm_uuid=vm_uuid).first()
-        is_new_vm = vm is None
+        with self.timer.phase('prefetch'):
+            vm = VM.query.filter_by(platform=platform, vm_uuid=vm_uuid).first()
+            is_new_vm = vm is None
+            stored_hash = vm.fact.payload_hash if vm and vm.fact else None
+        
+        with self.timer.phase('diff'):
+            payload_hash = self._payload_hash(vm_data)
+        
+        if not is_new_vm and stored_hash == payload_hash:
+            # Unchanged since last sync: only record that it was seen
+            vm.is_deleted = False
+            vm.deleted_at = None
+            vm.deleted_by = None
+            vm.delete_reason = None
+            vm.last_seen_at = datetime.now(timezone.utc)
+            vm.last_sync_run_id = sync_run_id
+            self.unchanged_count += 1
+            self._count_rows('vm_seen', 1)
+            return vm.id
         
         if is_new_vm:
             vm = VM(
@@ -181,7 +357,8 @@ class SyncService:
                 bios_uuid=vm_data.get('bios_uuid')
             )
             db.session.add(vm)
-            db.session.flush()
+            with self.timer.phase('write'):
+                db.session.flush()
         else:
             # Update existing VM
             vm.vm_name = vm_data.get('name', vm.vm_name)
@@ -193,36 +370,311 @@ class SyncService:
         
         vm.last_seen_at = datetime.now(timezone.utc)
         vm.last_sync_run_id = sync_run_id
+        self._count_rows('vm_upsert', 1)
         
         # Prepare fact data
-        if platform == self.PLATFORM_NUTANIX:
-            fact_data = self._extract_nutanix_facts(vm_data)
-            nics_data = self._extract_nutanix_nics(vm_data)
-            disks_data = self._extract_nutanix_disks(vm_data)
-        else:
-            fact_data = self._extract_vmware_facts(vm_data)
-            nics_data = self._extract_vmware_nics(vm_data)
-            disks_data = self._extract_vmware_disks(vm_data)
+        with self.timer.phase('extract'):
+            fact_data, nics_data, disks_data = self._extract_vm(platform, vm_data)
         
-        # Track changes if not new VM
-        if not is_new_vm and vm.fact:
-            change_tracker.compare_facts(vm.id, vm.fact, fact_data)
-            change_tracker.compare_disks(vm.id, list(vm.disks), disks_data)
-            change_tracker.compare_nics(vm.id, list(vm.nics), nics_data)
-            change_tracker.compare_ips(vm.id, list(vm.nics), nics_data)
+        with self.timer.phase('prefetch'):
+            _, old_nics, old_disks = self._prefetch_vm_state([vm.id], facts=False)
+            old_nics = old_nics.get(vm.id, [])
+            old_disks = old_disks.get(vm.id, [])
+            fact = VMFact.query.get(vm.id)
         
-        # Update or create fact
-        self._update_fact(vm.id, fact_data, vm_data)
-        
-        # Update NICs and IPs
-        self._update_nics(vm.id, nics_data)
-        
-        # Update disks
-        self._update_disks(vm.id, disks_data)
+        with self.timer.phase('diff'):
+            # Track changes if not new VM
+            if not is_new_vm and fact:
+                change_tracker.compare_facts(vm.id, fact, fact_data)
+                change_tracker.compare_disks(vm.id, old_disks, disks_data)
+                change_tracker.compare_nics(vm.id, old_nics, nics_data)
+                change_tracker.compare_ips(vm.id, old_nics, nics_data)
+            
+            # Reconcile NICs, IPs and disks
+            plan = self._new_child_plan()
+            self._plan_nics(plan, vm.id, old_nics, nics_data)
+            self._plan_disks(plan, vm.id, old_disks, disks_data)
         
-        db.session.flush()
+        with self.timer.phase('write'):
+            # Update or create fact
+            self._update_fact(vm.id, fact_data, vm_data, payload_hash, fact)
+            self._apply_child_plan(plan)
+            db.session.flush()
+        self.changed_vm_ids.add(vm.id)
         return vm.id
-    
+
+    def _process_vms(self, platform, vms_data, sync_run_id, change_tracker):
+        """
+        Process all VMs from one API payload.
+
+        Uses the set-based batch path (SYNC_BATCH_MODE) in chunks of
+        SYNC_BATCH_SIZE, or falls back to _process_vm per entry.
+
+        Returns:
+            List of processed VM IDs
+        """
+        if not current_app.config.get('SYNC_BATCH_MODE', True):
+            vm_ids = []
+            for vm_data in vms_data:
+                vm_id = self._process_vm(platform, vm_data, sync_run_id, change_tracker)
+                if vm_id:
+                    vm_ids.append(vm_id)
+                    self._advance_progress(1)
+            return vm_ids
+
+        batch_size = current_app.config.get('SYNC_BATCH_SIZE', 500)
+        vm_ids = []
+        chunk = []
+        for vm_data in vms_data:
+            chunk.append(vm_data)
+            if len(chunk) >= batch_size:
+                batch_ids = self._process_vm_batch(platform, chunk, sync_run_id, change_tracker)
+                vm_ids.extend(batch_ids)
+                self._advance_progress(len(batch_ids))
+                chunk = []
+        if chunk:
+            batch_ids = self._process_vm_batch(platform, chunk, sync_run_id, change_tracker)
+            vm_ids.extend(batch_ids)
+            self._advance_progress(len(batch_ids))
+        return vm_ids
+
+    def _count_rows(self, key, count):
+        """Tally rows written, reported in VMSyncRun.details['rows_written']"""
+        if count:
+            self.rows_written[key] = self.rows_written.get(key, 0) + count
+
+    def _advance_progress(self, count):
+        if self.progress:
+            self.progress.advance(count)
+
+    def _process_vm_batch(self, platform, vms_data, sync_run_id, change_tracker):
+        """
+        Process a chunk of VMs with keyed prefetches and multi-row upserts.
+
+        Produces the same VM, fact, NIC/IP, disk and change history rows as
+        calling _process_vm for every entry. If a UUID appears more than once
+        in the chunk, the last occurrence wins.
+
+        Returns:
+            List of VM IDs, one per entry with a UUID
+        """
+        now = datetime.now(timezone.utc)
+
+        entries = {}
+        uuids_seen = []
+        for vm_data in vms_data:
+            vm_uuid = vm_data.get('uuid')
+            if not vm_uuid:
+                continue
+            entries[vm_uuid] = vm_data
+            uuids_seen.append(vm_uuid)
+
+        if not entries:
+            return []
+
+        # 1. Prefetch existing VMs with their payload fingerprints
+        with self.timer.phase('prefetch'):
+            existing_vms = {
+                row.vm_uuid: row for row in db.session.execute(
+                    db.select(VM.id, VM.vm_uuid, VM.vm_name, VM.bios_uuid, VMFact.payload_hash)
+                    .outerjoin(VMFact, VMFact.vm_id == VM.id)
+                    .where(
+                        VM.platform == platform,
+                        VM.vm_uuid.in_(list(entries))
+                    )
+                )
+            }
+
+        # 2. Fast path: VMs whose payload is unchanged only get marked as seen
+        with self.timer.phase('diff'):
+            payload_hashes = {vm_uuid: self._payload_hash(vm_data) for vm_uuid, vm_data in entries.items()}
+        vm_id_map = {}
+        for vm_uuid, row in existing_vms.items():
+            if row.payload_hash and row.payload_hash == payload_hashes[vm_uuid]:
+                vm_id_map[vm_uuid] = row.id
+
+        if vm_id_map:
+            with self.timer.phase('write'):
+                db.session.execute(
+                    db.update(VM)
+                    .where(VM.id.in_(list(vm_id_map.values())))
+                    .values(
+                        last_seen_at=now,
+                        last_sync_run_id=sync_run_id,
+                        is_deleted=False,
+                        deleted_at=None,
+                        deleted_by=None,
+                        delete_reason=None
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            self.unchanged_count += len(vm_id_map)
+            self._count_rows('vm_seen', len(vm_id_map))
+
+        changed = {vm_uuid: vm_data for vm_uuid, vm_data in entries.items() if vm_uuid not in vm_id_map}
+        if changed:
+            vm_id_map.update(self._write_vm_batch(
+                platform, changed, existing_vms, payload_hashes, sync_run_id, change_tracker, now
+            ))
+
+        return [vm_id_map[vm_uuid] for vm_uuid in uuids_seen]
+
+    def _write_vm_batch(self, platform, entries, existing_vms, payload_hashes, sync_run_id, change_tracker, now):
+        """
+        Diff and write a chunk of new or changed VMs.
+
+        Returns:
+            dict of vm_uuid -> VM ID
+        """
+        existing_ids = [existing_vms[vm_uuid].id for vm_uuid in entries if vm_uuid in existing_vms]
+        with self.timer.phase('prefetch'):
+            old_facts, old_nics, old_disks = self._prefetch_vm_state(existing_ids)
+
+        # Upsert VM master rows
+        vm_rows = []
+        for vm_uuid, vm_data in entries.items():
+            existing = existing_vms.get(vm_uuid)
+            if existing:
+                vm_name = vm_data.get('name', existing.vm_name)
+                bios_uuid = vm_data.get('bios_uuid', existing.bios_uuid)
+            else:
+                vm_name = vm_data.get('name', 'Unknown')
+                bios_uuid = vm_data.get('bios_uuid')
+
+            vm_rows.append({
+                'platform': platform,
+                'vm_uuid': vm_uuid,
+                'vm_name': vm_name,
+                'bios_uuid': bios_uuid,
+                'is_deleted': False,
+                'deleted_at': None,
+                'deleted_by': None,
+                'delete_reason': None,
+                'first_seen_at': now,
+                'last_seen_at': now,
+                'last_sync_run_id': sync_run_id
+            })
+
+        stmt = pg_insert(VM)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VM.platform, VM.vm_uuid],
+            set_={
+                column: stmt.excluded[column]
+                for column in ('vm_name', 'bios_uuid', 'is_deleted', 'deleted_at', 'deleted_by',
+                               'delete_reason', 'last_seen_at', 'last_sync_run_id')
+            }
+        ).returning(VM.id, VM.vm_uuid)
+
+        vm_id_map = {}
+        with self.timer.phase('write'):
+            for start in range(0, len(vm_rows), self.UPSERT_CHUNK_SIZE):
+                result = db.session.execute(stmt, vm_rows[start:start + self.UPSERT_CHUNK_SIZE])
+                vm_id_map.update({row.vm_uuid: row.id for row in result})
+        self._count_rows('vm_upsert', len(vm_rows))
+
+        # Diff against prefetched state
+        fact_rows = []
+        plan = self._new_child_plan()
+
+        for vm_uuid, vm_data in entries.items():
+            vm_id = vm_id_map[vm_uuid]
+            with self.timer.phase('extract'):
+                fact_data, nics_data, disks_data = self._extract_vm(platform, vm_data)
+            vm_nics = old_nics.get(vm_id, [])
+            vm_disks = old_disks.get(vm_id, [])
+
+            with self.timer.phase('diff'):
+                if vm_uuid in existing_vms and vm_id in old_facts:
+                    change_tracker.compare_facts(vm_id, old_facts[vm_id], fact_data)
+                    change_tracker.compare_disks(vm_id, vm_disks, disks_data)
+                    change_tracker.compare_nics(vm_id, vm_nics, nics_data)
+                    change_tracker.compare_ips(vm_id, vm_nics, nics_data)
+
+                self._plan_nics(plan, vm_id, vm_nics, nics_data)
+                self._plan_disks(plan, vm_id, vm_disks, disks_data)
+
+            fact_row = dict(fact_data)
+            fact_row.update({
+                'vm_id': vm_id,
+                'raw': vm_data,
+                'payload_hash': payload_hashes[vm_uuid],
+                'fact_updated_at': now
+            })
+            fact_rows.append(fact_row)
+
+        # Write facts and reconcile children
+        stmt = pg_insert(VMFact)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VMFact.vm_id],
+            set_={key: stmt.excluded[key] for key in fact_rows[0] if key != 'vm_id'}
+        )
+        with self.timer.phase('write'):
+            for start in range(0, len(fact_rows), self.UPSERT_CHUNK_SIZE):
+                db.session.execute(stmt, fact_rows[start:start + self.UPSERT_CHUNK_SIZE])
+            self._apply_child_plan(plan)
+        self._count_rows('fact_upsert', len(fact_rows))
+
+        self.changed_vm_ids.update(vm_id_map.values())
+        return vm_id_map
+
+    def _prefetch_vm_state(self, vm_ids, facts=True):
+        """
+        Load tracked facts, NICs (with IPs) and disks for many VMs.
+
+        Returns lightweight rows, keyed by VM ID, that ChangeTracker can
+        compare against and that child reconciliation can diff column by
+        column. Pass facts=False to skip the fact query.
+        """
+        fact_rows, nics, disks = {}, {}, {}
+        if not vm_ids:
+            return fact_rows, nics, disks
+
+        if facts:
+            tracked_fields = [field for fields in ChangeTracker.CHANGE_TYPES.values() for field in fields]
+            fact_query = db.select(
+                VMFact.vm_id, *[getattr(VMFact, field) for field in tracked_fields]
+            ).where(VMFact.vm_id.in_(vm_ids))
+            for row in db.session.execute(fact_query):
+                fact_rows[row.vm_id] = row
+
+        nic_by_id = {}
+        nic_query = db.select(*VMNicFact.__table__.c).where(
+            VMNicFact.vm_id.in_(vm_ids)
+        ).order_by(VMNicFact.id)
+        for row in db.session.execute(nic_query):
+            nic = SimpleNamespace(**row._mapping, ip_addresses=[])
+            nic_by_id[row.id] = nic
+            nics.setdefault(row.vm_id, []).append(nic)
+
+        if nic_by_id:
+            ip_query = db.select(
+                VMNicIpFact.nic_id, VMNicIpFact.ip_address, VMNicIpFact.ip_type
+            ).join(VMNicFact, VMNicIpFact.nic_id == VMNicFact.id).where(VMNicFact.vm_id.in_(vm_ids))
+            for row in db.session.execute(ip_query):
+                nic_by_id[row.nic_id].ip_addresses.append(row)
+
+        disk_query = db.select(*VMDiskFact.__table__.c).where(
+            VMDiskFact.vm_id.in_(vm_ids)
+        ).order_by(VMDiskFact.id)
+        for row in db.session.execute(disk_query):
+            disks.setdefault(row.vm_id, []).append(row)
+
+        return fact_rows, nics, disks
+
+    def _extract_vm(self, platform, vm_data):
+        """Extract (fact_data, nics_data, disks_data) for a VM payload"""
+        if platform == self.PLATFORM_NUTANIX:
+            return (
+                self._extract_nutanix_facts(vm_data),
+                self._extract_nutanix_nics(vm_data),
+                self._extract_nutanix_disks(vm_data)
+            )
+        return (
+            self._extract_vmware_facts(vm_data),
+            self._extract_vmware_nics(vm_data),
+            self._extract_vmware_disks(vm_data)
+        )
+
     def _extract_nutanix_facts(self, vm_data):
         """Extract fact data from Nutanix VM"""
         cpu = vm_data.get('cpu', {})
@@ -330,10 +782,12 @@ class SyncService:
             }
             
             for ip in nic.get('ip_addresses', []):
-                nic_data['ip_addresses'].append({
-                    'ip_address': ip.get('ip'),
-                    'ip_type': ip.get('type')
-                })
+                ip_address = normalize_ip(ip.get('ip'))
+                if ip_address:  # Skip values that are not addresses (inet column)
+                    nic_data['ip_addresses'].append({
+                        'ip_address': ip_address,
+                        'ip_type': ip.get('type')
+                    })
             
             nics.append(nic_data)
         
@@ -356,10 +810,12 @@ class SyncService:
             }
             
             for ip in nic.get('ip_addresses', []):
-                nic_data['ip_addresses'].append({
-                    'ip_address': ip.get('ip'),
-                    'ip_type': ip.get('type')
-                })
+                ip_address = normalize_ip(ip.get('ip'))
+                if ip_address:  # Skip values that are not addresses (inet column)
+                    nic_data['ip_addresses'].append({
+                        'ip_address': ip_address,
+                        'ip_type': ip.get('type')
+                    })
             
             nics.append(nic_data)
         
@@ -405,9 +861,21 @@ class SyncService:
             })
         return disks
     
-    def _update_fact(self, vm_id, fact_data, raw_data):
+    def _payload_hash(self, vm_data):
+        """
+        Stable fingerprint of a VM payload.
+        
+        Keys are sorted so field order in the API response does not matter.
+        Bump FINGERPRINT_VERSION when extraction logic changes so every VM
+        is rewritten once.
+        """
+        canonical = json.dumps(vm_data, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(f"{self.FINGERPRINT_VERSION}:{canonical}".encode()).hexdigest()
+    
+    def _update_fact(self, vm_id, fact_data, raw_data, payload_hash=None, fact=None):
         """Update or create VM fact record"""
-        fact = VMFact.query.get(vm_id)
+        if fact is None:
+            fact = VMFact.query.get(vm_id)
         
         if not fact:
             fact = VMFact(vm_id=vm_id)
@@ -417,21 +885,189 @@ class SyncService:
             setattr(fact, key, value)
         
         fact.raw = raw_data
+        fact.payload_hash = payload_hash
         fact.fact_updated_at = datetime.now(timezone.utc)
+        self._count_rows('fact_upsert', 1)
     
-    def _update_nics(self, vm_id, nics_data):
-        """Update NIC records for a VM"""
-        # 1. Capture existing valid IPs (non-169.254) to preserve them if sync returns only APIPA
-        existing_ips = {} # mac_address -> [list of ip dictionaries]
+    def _new_child_plan(self):
+        """Empty set of pending NIC/IP/disk writes for _apply_child_plan"""
+        return {
+            'nic_inserts': [],  # (nic_row, ip_dicts)
+            'nic_updates': [],
+            'nic_deletes': [],
+            'ip_inserts': [],
+            'ip_updates': [],
+            'ip_deletes': [],   # (nic_id, ip_address)
+            'disk_inserts': [],
+            'disk_updates': [],
+            'disk_deletes': []
+        }
+    
+    def _match_children(self, old_rows, old_keys, new_items, new_keys):
+        """
+        Pair existing child rows with incoming items by key.
         
-        current_nics = VMNicFact.query.filter_by(vm_id=vm_id).all()
-        for nic in current_nics:
+        Repeated keys are matched in order of occurrence, and items without
+        a key are matched by their position among the other unkeyed items.
+        
+        Returns:
+            (list of (old_row or None, new_item), list of unmatched old rows)
+        """
+        def occurrences(keys):
+            counts = {}
+            result = []
+            for key in keys:
+                key = str(key) if key is not None and key != '' else None
+                result.append((key, counts.get(key, 0)))
+                counts[key] = counts.get(key, 0) + 1
+            return result
+        
+        old_by_key = dict(zip(occurrences(old_keys), old_rows))
+        pairs = [
+            (old_by_key.pop(key, None), item)
+            for key, item in zip(occurrences(new_keys), new_items)
+        ]
+        return pairs, list(old_by_key.values())
+    
+    def _changed_columns(self, old_row, columns):
+        """Return True if any column value differs from the stored row"""
+        for key, new in columns.items():
+            old = getattr(old_row, key)
+            if old is None or new is None:
+                if old is not new:
+                    return True
+            elif isinstance(old, Decimal):
+                if old != Decimal(str(new)).quantize(old):
+                    return True
+            elif isinstance(old, str):
+                if old != str(new):
+                    return True
+            elif old != new:
+                return True
+        return False
+    
+    def _plan_nics(self, plan, vm_id, old_nics, nics_data):
+        """
+        Diff one VM's NICs and IPs into plan.
+        
+        NICs are keyed by MAC address, falling back to nic_uuid. Matched
+        NICs are updated in place only when a column changed, and their IPs
+        are diffed by address; unchanged NICs and IPs produce no writes.
+        """
+        # Capture existing valid IPs (non-169.254) to preserve them if sync returns only APIPA
+        existing_ips = self._collect_valid_ips(old_nics)
+        
+        pairs, removed = self._match_children(
+            old_nics, [nic.mac_address or nic.nic_uuid for nic in old_nics],
+            nics_data, [nic.get('mac_address') or nic.get('nic_uuid') for nic in nics_data]
+        )
+        
+        for old_nic, nic_data in pairs:
+            columns = self._nic_columns(nic_data)
+            ips = self._resolve_nic_ips(nic_data, existing_ips)
+            
+            if old_nic is None:
+                columns['vm_id'] = vm_id
+                plan['nic_inserts'].append((columns, ips))
+                continue
+            
+            if self._changed_columns(old_nic, columns):
+                plan['nic_updates'].append(dict(columns, id=old_nic.id))
+            
+            current = {ip.ip_address: ip.ip_type for ip in old_nic.ip_addresses}
+            for ip_data in ips:
+                ip_address = ip_data.get('ip_address')
+                row = {'nic_id': old_nic.id, 'ip_address': ip_address, 'ip_type': ip_data.get('ip_type')}
+                if ip_address not in current:
+                    plan['ip_inserts'].append(row)
+                elif current.pop(ip_address) != row['ip_type']:
+                    plan['ip_updates'].append(row)
+            plan['ip_deletes'].extend((old_nic.id, ip_address) for ip_address in current)
+        
+        # Child IPs go with their NICs via ON DELETE CASCADE
+        plan['nic_deletes'].extend(nic.id for nic in removed)
+    
+    def _plan_disks(self, plan, vm_id, old_disks, disks_data):
+        """
+        Diff one VM's disks into plan.
+        
+        Disks are keyed by disk_uuid, falling back to disk_key.
+        """
+        pairs, removed = self._match_children(
+            old_disks, [disk.disk_uuid or disk.disk_key for disk in old_disks],
+            disks_data, [disk.get('disk_uuid') or disk.get('disk_key') for disk in disks_data]
+        )
+        
+        for old_disk, disk_data in pairs:
+            columns = self._disk_columns(disk_data)
+            if old_disk is None:
+                columns['vm_id'] = vm_id
+                plan['disk_inserts'].append(columns)
+            elif self._changed_columns(old_disk, columns):
+                plan['disk_updates'].append(dict(columns, id=old_disk.id))
+        
+        plan['disk_deletes'].extend(disk.id for disk in removed)
+    
+    def _apply_child_plan(self, plan):
+        """Execute the targeted deletes, updates and inserts collected in plan"""
+        for key, rows in plan.items():
+            self._count_rows(key, len(rows))
+        
+        if plan['nic_deletes']:
+            db.session.execute(
+                db.delete(VMNicFact).where(VMNicFact.id.in_(plan['nic_deletes']))
+                .execution_options(synchronize_session=False)
+            )
+        if plan['ip_deletes']:
+            db.session.execute(
+                db.delete(VMNicIpFact).where(
+                    tuple_(VMNicIpFact.nic_id, VMNicIpFact.ip_address).in_(plan['ip_deletes'])
+                ).execution_options(synchronize_session=False)
+            )
+        if plan['disk_deletes']:
+            db.session.execute(
+                db.delete(VMDiskFact).where(VMDiskFact.id.in_(plan['disk_deletes']))
+                .execution_options(synchronize_session=False)
+            )
+        
+        # Bulk UPDATE by primary key
+        for model, key in ((VMNicFact, 'nic_updates'), (VMNicIpFact, 'ip_updates'), (VMDiskFact, 'disk_updates')):
+            if plan[key]:
+                db.session.execute(
+                    db.update(model).execution_options(synchronize_session=False),
+                    plan[key]
+                )
+        
+        ip_rows = list(plan['ip_inserts'])
+        if plan['nic_inserts']:
+            nic_ids = db.session.execute(
+                db.insert(VMNicFact).returning(VMNicFact.id, sort_by_parameter_order=True),
+                [nic_row for nic_row, _ in plan['nic_inserts']]
+            ).scalars().all()
+            
+            for nic_id, (_, ips) in zip(nic_ids, plan['nic_inserts']):
+                for ip_data in ips:
+                    ip_rows.append({
+                        'nic_id': nic_id,
+                        'ip_address': ip_data.get('ip_address'),
+                        'ip_type': ip_data.get('ip_type')
+                    })
+        if ip_rows:
+            db.session.execute(db.insert(VMNicIpFact), ip_rows)
+        
+        if plan['disk_inserts']:
+            db.session.execute(db.insert(VMDiskFact), plan['disk_inserts'])
+    
+    def _collect_valid_ips(self, nics):
+        """Map MAC address -> list of non-APIPA IP dicts for existing NICs"""
+        existing_ips = {}  # mac_address -> [list of ip dictionaries]
+        for nic in nics:
             if not nic.mac_address:
                 continue
                 
             valid_ips = []
             for ip in nic.ip_addresses:
-                if ip.ip_address and not ip.ip_address.startswith('169.254'):
+                if ip.ip_address and not is_apipa(ip.ip_address):
                     valid_ips.append({
                         'ip_address': ip.ip_address,
                         'ip_type': ip.ip_type
@@ -439,90 +1075,66 @@ class SyncService:
             
             if valid_ips:
                 existing_ips[nic.mac_address] = valid_ips
-
-        # Delete existing NICs (cascade deletes IPs)
-        VMNicFact.query.filter_by(vm_id=vm_id).delete()
-        db.session.flush()  # Ensure deletes are processed first
-        
-        # Create new NICs
-        for nic_data in nics_data:
-            nic = VMNicFact(
-                vm_id=vm_id,
-                nic_uuid=nic_data.get('nic_uuid'),
-                label=nic_data.get('label'),
-                mac_address=nic_data.get('mac_address'),
-                nic_type=nic_data.get('nic_type'),
-                network_name=nic_data.get('network_name'),
-                vlan_mode=nic_data.get('vlan_mode'),
-                is_connected=nic_data.get('is_connected'),
-                state=nic_data.get('state')
-            )
-            db.session.add(nic)
-            db.session.flush()
-            
-            # Add IPs - deduplicate by IP address (same IP can have multiple types)
-            new_ips_to_add = []
-            seen_ips = set()
-            incoming_has_valid_ip = False
-            
-            # Check incoming IPs
-            for ip_data in nic_data.get('ip_addresses', []):
-                ip_addr = ip_data.get('ip_address')
-                if ip_addr:
-                    if not ip_addr.startswith('169.254'):
-                        incoming_has_valid_ip = True
-                    
-                    if ip_addr not in seen_ips:
-                        seen_ips.add(ip_addr)
-                        new_ips_to_add.append(ip_data)
-            
-            # Logic: If incoming has no valid IPs (only APIPA or none), attempt to restore old valid IPs
-            if not incoming_has_valid_ip and nic.mac_address in existing_ips:
-                # Restore previous valid IPs
-                # First clear any 169.254 addresses we might have queued up to replace them with the good ones
-                # OR we can keep 169.254 as secondary, but let's just restore the good state to avoid confusion
-                new_ips_to_add = existing_ips[nic.mac_address]
-            
-            # Commit IPs
-            for ip_data in new_ips_to_add:
-                 # Re-check seen_ips for the restored ones if we mixed them (in this logic we replaced, but good to be safe)
-                 # Since we replaced the list, we can just add them.
-                 # Wait, if we replaced the list, we might have duplicates if we iterate blindly?
-                 # No, existing_ips list was already deduplicated/sanitized when reading.
-                 
-                 # If we are restoring, we should make sure we don't violate unique constraints if logic was complex.
-                 # Here: we either use the NEW list (which was deduped) OR the OLD list (which matches schema).
-                 
-                 ip = VMNicIpFact(
-                    nic_id=nic.id,
-                    ip_address=ip_data.get('ip_address'),
-                    ip_type=ip_data.get('ip_type')
-                )
-                 db.session.add(ip)
+        return existing_ips
     
-    def _update_disks(self, vm_id, disks_data):
-        """Update disk records for a VM"""
-        # Delete existing disks
-        VMDiskFact.query.filter_by(vm_id=vm_id).delete()
-        
-        # Create new disks
-        for disk_data in disks_data:
-            disk = VMDiskFact(
-                vm_id=vm_id,
-                disk_uuid=disk_data.get('disk_uuid'),
-                disk_key=disk_data.get('disk_key'),
-                disk_label=disk_data.get('disk_label'),
-                device_type=disk_data.get('device_type'),
-                adapter_type=disk_data.get('adapter_type'),
-                size_gb=disk_data.get('size_gb'),
-                backing_type=disk_data.get('backing_type'),
-                backing_path=disk_data.get('backing_path'),
-                storage_name=disk_data.get('storage_name'),
-                is_image=disk_data.get('is_image'),
-                scsi_bus=disk_data.get('scsi_bus'),
-                scsi_unit=disk_data.get('scsi_unit')
-            )
-            db.session.add(disk)
+    def _resolve_nic_ips(self, nic_data, existing_ips):
+        """
+        Return the IP dicts to store for an incoming NIC.
+        
+        Deduplicates by IP address (same IP can have multiple types). If the
+        incoming NIC has no valid IPs (only APIPA or none), the previous valid
+        IPs for the same MAC are restored instead.
+        """
+        new_ips_to_add = []
+        seen_ips = set()
+        incoming_has_valid_ip = False
+        
+        for ip_data in nic_data.get('ip_addresses', []):
+            ip_addr = ip_data.get('ip_address')
+            if ip_addr:
+                if not is_apipa(ip_addr):
+                    incoming_has_valid_ip = True
+                
+                if ip_addr not in seen_ips:
+                    seen_ips.add(ip_addr)
+                    new_ips_to_add.append(ip_data)
+        
+        mac_address = nic_data.get('mac_address')
+        if not incoming_has_valid_ip and mac_address in existing_ips:
+            # Restore the good state rather than keeping 169.254 as secondary
+            new_ips_to_add = existing_ips[mac_address]
+        
+        return new_ips_to_add
+    
+    def _nic_columns(self, nic_data):
+        """Map extracted NIC data to VMNicFact column values"""
+        return {
+            'nic_uuid': nic_data.get('nic_uuid'),
+            'label': nic_data.get('label'),
+            'mac_address': nic_data.get('mac_address'),
+            'nic_type': nic_data.get('nic_type'),
+            'network_name': nic_data.get('network_name'),
+            'vlan_mode': nic_data.get('vlan_mode'),
+            'is_connected': nic_data.get('is_connected'),
+            'state': nic_data.get('state')
+        }
+    
+    def _disk_columns(self, disk_data):
+        """Map extracted disk data to VMDiskFact column values"""
+        return {
+            'disk_uuid': disk_data.get('disk_uuid'),
+            'disk_key': disk_data.get('disk_key'),
+            'disk_label': disk_data.get('disk_label'),
+            'device_type': disk_data.get('device_type'),
+            'adapter_type': disk_data.get('adapter_type'),
+            'size_gb': disk_data.get('size_gb'),
+            'backing_type': disk_data.get('backing_type'),
+            'backing_path': disk_data.get('backing_path'),
+            'storage_name': disk_data.get('storage_name'),
+            'is_image': disk_data.get('is_image'),
+            'scsi_bus': disk_data.get('scsi_bus'),
+            'scsi_unit': disk_data.get('scsi_unit')
+        }
     
     def _soft_delete_missing(self, platform, sync_run_id, seen_vm_ids):
         """Soft delete VMs not seen in this sync"""
@@ -551,7 +1163,8 @@ class SyncService:
         sync_run = VMSyncRun(
             platform=f"hosts_{platform}" if platform else 'hosts',
             status='RUNNING',
-            started_at=datetime.now(timezone.utc)
+            started_at=datetime.now(timezone.utc),
+            job_id=self.job_id
         )
         db.session.add(sync_run)
         db.session.commit()
@@ -563,6 +1176,7 @@ class SyncService:
         
         total_synced = 0
         error_details = []
+        api_fetches = []
         
         # Sync VMware hosts
         if not platform or platform == 'vmware':
@@ -571,25 +1185,28 @@ class SyncService:
                 if not apis:
                     results['vmware']['errors'].append("No active API configuration found for 'vmware_host'")
                     
-                for api in apis:
+                fetcher = ApiFetcher('vmware_host', timeout=60)
+                for api, fetch in fetcher.fetch_all(apis):
+                    api_fetches.append(ApiFetcher.timing(api, fetch))
                     try:
-                        headers = api.headers or {}
-                        response = requests.request(
-                            method=api.method,
-                            url=api.url,
-                            headers=headers,
-                            json=api.payload,
-                            timeout=60
-                        )
-                        
-                        if response.status_code == 200:
-                            hosts_data = response.json()
-                            for host_data in hosts_data:
-                                self._upsert_host('vmware', host_data)
-                            results['vmware']['synced'] += len(hosts_data)
-                            total_synced += len(hosts_data)
+                        if fetch['status_code'] == 200 and fetch['body']:
+                            # Hosts are written while the body is parsed; the savepoint
+                            # drops them all if the body turns out truncated or malformed
+                            with db.session.begin_nested(), fetch['body'] as body:
+                                stream = BodyStream(body, self._stream_chunk_size())
+                                host_count = 0
+                                for host_data in iter_items(stream, 'item'):
+                                    self._upsert_host('vmware', host_data)
+                                    host_count += 1
+                            results['vmware']['synced'] += host_count
+                            api_fetches[-1]['rows'] = host_count
+                            total_synced += host_count
+                        elif fetch['status_code'] is None:
+                            raise Exception(fetch['error'])
                         else:
-                            msg = f"API {api.name} returned {response.status_code}"
+                            if fetch['body']:
+                                fetch['body'].close()
+                            msg = f"API {api.name} returned {fetch['status_code']}"
                             results['vmware']['errors'].append(msg)
                             error_details.append(msg)
                     except Exception as e:
@@ -608,25 +1225,28 @@ class SyncService:
                 if not apis:
                     results['nutanix']['errors'].append("No active API configuration found for 'nutanix_host'")
                     
-                for api in apis:
+                fetcher = ApiFetcher('nutanix_host', timeout=60)
+                for api, fetch in fetcher.fetch_all(apis):
+                    api_fetches.append(ApiFetcher.timing(api, fetch))
                     try:
-                        headers = api.headers or {}
-                        response = requests.request(
-                            method=api.method,
-                            url=api.url,
-                            headers=headers,
-                            json=api.payload,
-                            timeout=60
-                        )
-                        
-                        if response.status_code == 200:
-                            hosts_data = response.json()
-                            for host_data in hosts_data:
-                                self._upsert_host('nutanix', host_data)
-                            results['nutanix']['synced'] += len(hosts_data)
-                            total_synced += len(hosts_data)
+                        if fetch['status_code'] == 200 and fetch['body']:
+                            # Hosts are written while the body is parsed; the savepoint
+                            # drops them all if the body turns out truncated or malformed
+                            with db.session.begin_nested(), fetch['body'] as body:
+                                stream = BodyStream(body, self._stream_chunk_size())
+                                host_count = 0
+                                for host_data in iter_items(stream, 'item'):
+                                    self._upsert_host('nutanix', host_data)
+                                    host_count += 1
+                            results['nutanix']['synced'] += host_count
+                            api_fetches[-1]['rows'] = host_count
+                            total_synced += host_count
+                        elif fetch['status_code'] is None:
+                            raise Exception(fetch['error'])
                         else:
-                            msg = f"API {api.name} returned {response.status_code}"
+                            if fetch['body']:
+                                fetch['body'].close()
+                            msg = f"API {api.name} returned {fetch['status_code']}"
                             results['nutanix']['errors'].append(msg)
                             error_details.append(msg)
                     except Exception as e:
@@ -644,10 +1264,10 @@ class SyncService:
         
         if error_details:
              sync_run.status = 'FAILED' if total_synced == 0 else 'WARNING'
-             sync_run.details = {'errors': error_details, 'results': results}
+             sync_run.details = {'errors': error_details, 'results': results, 'api_fetches': api_fetches}
         else:
              sync_run.status = 'SUCCESS'
-             sync_run.details = {'results': results}
+             sync_run.details = {'results': results, 'api_fetches': api_fetches}
              
         db.session.commit()
         return results
@@ -702,13 +1322,15 @@ class SyncService:
         sync_run = VMSyncRun(
             platform=f"{platform}_networks",
             status='RUNNING',
-            started_at=datetime.now(timezone.utc)
+            started_at=datetime.now(timezone.utc),
+            job_id=self.job_id
         )
         db.session.add(sync_run)
         db.session.commit()
         
         count = 0
         errors = []
+        api_fetches = []
         
         resource_type = f"{platform}_network"
         
@@ -717,90 +1339,91 @@ class SyncService:
             if not apis:
                 errors.append(f"No active API configuration found for {resource_type}")
 
-            for api in apis:
+            fetcher = ApiFetcher(resource_type, timeout=60)
+            for api, fetch in fetcher.fetch_all(apis):
+                api_fetches.append(ApiFetcher.timing(api, fetch))
+                count_before = count
                 try:
-                    headers = api.headers or {}
-                    response = requests.request(
-                        method=api.method,
-                        url=api.url,
-                        headers=headers,
-                        json=api.payload,
-                        timeout=60
-                    )
-                    response.raise_for_status()
-                    data = response.json()
+                    if fetch['error']:
+                        raise Exception(fetch['error'])
                     
-                    if platform == 'vmware':
-                        # Parse VMware response
-                        networks = []
-                        if isinstance(data, list):
-                            for item in data:
-                                if 'vm-network' in item:
-                                    networks = item['vm-network']
-                                    break
+                    # Networks are written while the body is parsed; the savepoint
+                    # drops them all if the body turns out truncated or malformed
+                    with db.session.begin_nested():
+                        stream = BodyStream(fetch['body'], self._stream_chunk_size())
+                        
+                        if platform == 'vmware':
+                            # Parse VMware response: [{"vm-network": [...]}]
+                            networks = iter_items(stream, 'item.vm-network.item')
                                     
-                        for net in networks:
-                            network_id = net.get('network')
-                            name = net.get('name')
+                            for net in networks:
+                                network_id = net.get('network')
+                                name = net.get('name')
                             
-                            if not network_id or not name:
-                                continue
+                                if not network_id or not name:
+                                    continue
                             
-                            existing = Network.query.filter_by(platform='vmware', network_id=network_id).first()
-                            if existing:
-                                existing.name = name
-                                existing.last_sync_at = datetime.now(timezone.utc)
-                            else:
-                                new_net = Network(
-                                    platform='vmware',
-                                    network_id=network_id,
-                                    name=name
-                                )
-                                db.session.add(new_net)
+                                existing = Network.query.filter_by(platform='vmware', network_id=network_id).first()
+                                if existing:
+                                    existing.name = name
+                                    existing.last_sync_at = datetime.now(timezone.utc)
+                                else:
+                                    new_net = Network(
+                                        platform='vmware',
+                                        network_id=network_id,
+                                        name=name
+                                    )
+                                    db.session.add(new_net)
                             
-                            # Also update legacy VMwareNetwork table
-                            legacy = VMwareNetwork.query.filter_by(network_id=network_id).first()
-                            if legacy:
-                                legacy.name = name
-                                legacy.last_sync_at = datetime.now(timezone.utc)
-                            else:
-                                legacy = VMwareNetwork(network_id=network_id, name=name)
-                                db.session.add(legacy)
+                                # Also update legacy VMwareNetwork table
+                                legacy = VMwareNetwork.query.filter_by(network_id=network_id).first()
+                                if legacy:
+                                    legacy.name = name
+                                    legacy.last_sync_at = datetime.now(timezone.utc)
+                                else:
+                                    legacy = VMwareNetwork(network_id=network_id, name=name)
+                                    db.session.add(legacy)
                             
-                            count += 1
+                                count += 1
                             
-                    elif platform == 'nutanix':
-                        # Parse Nutanix response
-                        networks = data if isinstance(data, list) else []
+                        elif platform == 'nutanix':
+                            # Parse Nutanix response
+                            networks = iter_items(stream, 'item')
                         
-                        for net in networks:
-                            name = net.get('name')
-                            vlan_id = net.get('vlan_id')
+                            for net in networks:
+                                name = net.get('name')
+                                vlan_id = net.get('vlan_id')
                             
-                            if not name:
-                                continue
+                                if not name:
+                                    continue
                             
-                            # Use name as network_id for Nutanix since we don't have UUID
-                            network_id = name
+                                # Use name as network_id for Nutanix since we don't have UUID
+                                network_id = name
                             
-                            existing = Network.query.filter_by(platform='nutanix', network_id=network_id).first()
-                            if existing:
-                                existing.name = name
-                                if vlan_id is not None:
-                                    existing.vlan_id = vlan_id
-                                existing.last_sync_at = datetime.now(timezone.utc)
-                            else:
-                                new_net = Network(
-                                    platform='nutanix',
-                                    network_id=network_id,
-                                    name=name,
-                                    vlan_id=vlan_id
-                                )
-                                db.session.add(new_net)
-                            count += 1
+                                existing = Network.query.filter_by(platform='nutanix', network_id=network_id).first()
+                                if existing:
+                                    existing.name = name
+                                    if vlan_id is not None:
+                                        existing.vlan_id = vlan_id
+                                    existing.last_sync_at = datetime.now(timezone.utc)
+                                else:
+                                    new_net = Network(
+                                        platform='nutanix',
+                                        network_id=network_id,
+                                        name=name,
+                                        vlan_id=vlan_id
+                                    )
+                                    db.session.add(new_net)
+                                count += 1
+                    
+                    api_fetches[-1]['rows'] = count - count_before
                             
                 except Exception as e:
+                    count = count_before
                     errors.append(f"API {api.name} failed: {str(e)}")
+                finally:
+                    if fetch['body']:
+                        fetch['body'].close()
             
             # Update sync run status
             sync_run.finished_at = datetime.now(timezone.utc)
@@ -808,9 +1431,10 @@ class SyncService:
             
             if errors:
                  sync_run.status = 'FAILED' if count == 0 else 'WARNING'
-                 sync_run.details = {'errors': errors}
+                 sync_run.details = {'errors': errors, 'api_fetches': api_fetches}
             else:
                  sync_run.status = 'SUCCESS'
+                 sync_run.details = {'api_fetches': api_fetches}
             
             db.session.commit()
             return {'synced': count, 'errors': errors}
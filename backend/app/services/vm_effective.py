@@ -0,0 +1,145 @@
+"""
+Effective VM Read Model
+
+Keeps vm_effective, one flat row per VM with manual overrides applied, in
+step with the tables it is derived from. Refreshes are set-based upserts
+run in the caller's transaction, so a sync or an edit and the read model
+commit together.
+
+The rules mirror VM._build_effective_dict():
+- power state, cluster, hostname, OS type and OS family come from the
+  facts, replaced by the manual value where the override flag is set
+  (VMs without facts have none of them)
+- the IP is the primary manual IP, else the first manual IP, else the first
+  non-APIPA NIC IP, else the first NIC IP (NICs by id, then addresses in
+  order, as VM.to_effective_dict() reads them)
+
+search_text is the lower-cased search document behind the inventory search
+box: name, UUID, hostname, every manual and NIC IP, tags and owner names.
+init_db adds a pg_trgm GIN index on it when the extension is available.
+
+Every refresh touches the 'inventory' DataVersion counter, so cached
+summaries and list ETags move once the transaction commits.
+"""
+from sqlalchemy import text
+from app import db
+from app.models.vm import VMManual
+from app.services.data_version import DataVersion
+
+_COLUMNS = (
+    'platform', 'vm_uuid', 'vm_name', 'is_deleted', 'power_state', 'cluster_name', 'hostname',
+    'os_type', 'os_family', 'host_identifier', 'total_vcpus', 'memory_mb', 'total_disk_gb',
+    'ip_address', 'environment', 'division_id', 'division_name', 'business_owner_id',
+    'business_owner_name', 'technical_owner_id', 'technical_owner_name', 'tag_values',
+    'has_public_ip', 'has_dns_record', 'search_text', 'refreshed_at'
+)
+
+_REFRESH_SQL = f"""
+INSERT INTO vm_effective (vm_id, {', '.join(_COLUMNS)})
+SELECT
+    v.id, v.platform, v.vm_uuid, v.vm_name, v.is_deleted,
+    CASE WHEN f.vm_id IS NULL THEN NULL
+         WHEN m.override_power_state THEN m.manual_power_state ELSE f.power_state END,
+    CASE WHEN f.vm_id IS NULL THEN NULL
+         WHEN m.override_cluster THEN m.manual_cluster_name ELSE f.cluster_name END,
+    eff.hostname,
+    CASE WHEN f.vm_id IS NULL THEN NULL
+         WHEN m.override_os_type THEN m.manual_os_type ELSE f.os_type END,
+    CASE WHEN f.vm_id IS NULL THEN NULL
+         WHEN m.override_os_family THEN m.manual_os_family ELSE f.os_family END,
+    f.host_identifier, f.total_vcpus, f.memory_mb, f.total_disk_gb,
+    COALESCE(
+        (SELECT mi.ip_address FROM vm_ip_manual mi
+         WHERE mi.vm_id = v.id
+         ORDER BY mi.is_primary DESC, mi.id LIMIT 1),
+        (SELECT ni.ip_address FROM vm_nic_fact n JOIN vm_nic_ip_fact ni ON ni.nic_id = n.id
+         WHERE n.vm_id = v.id
+         ORDER BY ni.ip_address <<= inet '169.254.0.0/16', n.id, ni.ip_address LIMIT 1)
+    ),
+    m.environment, m.division_id, d.name,
+    m.business_owner_id, bo.full_name, m.technical_owner_id, tech.full_name,
+    eff.tag_values,
+    COALESCE(pn.is_active, false),
+    EXISTS (SELECT 1 FROM vm_dns_record dr WHERE dr.vm_id = v.id AND dr.is_active),
+    lower(concat_ws(' ',
+        v.vm_name, v.vm_uuid, eff.hostname, bo.full_name, tech.full_name,
+        NULLIF(array_to_string(eff.tag_values, ' '), ''),
+        (SELECT string_agg(host(ips.ip_address), ' ') FROM (
+            SELECT mi.ip_address FROM vm_ip_manual mi WHERE mi.vm_id = v.id
+            UNION
+            SELECT ni.ip_address FROM vm_nic_fact n JOIN vm_nic_ip_fact ni ON ni.nic_id = n.id
+            WHERE n.vm_id = v.id
+        ) ips)
+    )),
+    clock_timestamp()
+FROM vm v
+LEFT JOIN vm_fact f ON f.vm_id = v.id
+LEFT JOIN vm_manual m ON m.vm_id = v.id
+LEFT JOIN divisions d ON d.id = m.division_id
+LEFT JOIN owners bo ON bo.id = m.business_owner_id
+LEFT JOIN owners tech ON tech.id = m.technical_owner_id
+LEFT JOIN vm_public_network pn ON pn.vm_id = v.id
+CROSS JOIN LATERAL (
+    SELECT
+        CASE WHEN f.vm_id IS NULL THEN NULL
+             WHEN m.override_hostname THEN m.manual_hostname ELSE f.hostname END AS hostname,
+        ARRAY(SELECT DISTINCT lower(t.tag_value) FROM vm_tag t WHERE t.vm_id = v.id) AS tag_values
+) eff
+WHERE {{where}}
+ON CONFLICT (vm_id) DO UPDATE SET
+    {', '.join(f'{column} = EXCLUDED.{column}' for column in _COLUMNS)}
+"""
+
+
+class EffectiveInventory:
+    """Refresh vm_effective rows"""
+
+    @staticmethod
+    def refresh(vm_ids=None):
+        """
+        Recompute the rows of the given VMs, or of every VM if vm_ids is None.
+
+        Returns:
+            Number of rows written
+        """
+        db.session.flush()  # The SQL below reads pending ORM changes
+        if vm_ids is None:
+            DataVersion.touch('inventory')
+            return db.session.execute(text(_REFRESH_SQL.format(where='true'))).rowcount
+
+        vm_ids = sorted(set(vm_ids))
+        if not vm_ids:
+            return 0
+        DataVersion.touch('inventory')
+        return db.session.execute(
+            text(_REFRESH_SQL.format(where='v.id = ANY(:vm_ids)')), {'vm_ids': vm_ids}
+        ).rowcount
+
+    @staticmethod
+    def refresh_deleted_flags(platform):
+        """Copy is_deleted for a platform's VMs (soft deletes and restores)"""
+        DataVersion.touch('inventory')
+        return db.session.execute(text("""
+            UPDATE vm_effective e
+            SET is_deleted = v.is_deleted, refreshed_at = clock_timestamp()
+            FROM vm v
+            WHERE v.id = e.vm_id
+              AND v.platform = :platform
+              AND e.is_deleted IS DISTINCT FROM v.is_deleted
+        """), {'platform': platform}).rowcount
+
+    @staticmethod
+    def refresh_owner(owner_id):
+        """Refresh VMs owned by an owner, e.g. after a rename"""
+        vm_ids = [row.vm_id for row in db.session.query(VMManual.vm_id).filter(
+            db.or_(VMManual.business_owner_id == owner_id, VMManual.technical_owner_id == owner_id)
+        )]
+        return EffectiveInventory.refresh(vm_ids)
+
+    @staticmethod
+    def refresh_division(division_id):
+        """Refresh VMs assigned to a division, e.g. after a rename"""
+        vm_ids = [row.vm_id for row in db.session.query(VMManual.vm_id).filter(
+            VMManual.division_id == division_id
+        )]
+        return EffectiveInventory.refresh(vm_ids)
@@ -1,12 +1,112 @@
+"""
+Audit logging
+
+log_action() hands entries to a per-process background writer, which
+inserts them in batches through its own connection. Requests no longer pay
+for an audit commit, and a failed audit write can never roll back the
+caller's session. Set AUDIT_LOG_MODE=sync to write each entry immediately
+(still in its own transaction), e.g. for tests.
+"""
+import atexit
+import os
+import queue
+import threading
 from datetime import datetime, timezone
-from flask import request, g
+from flask import request, g, current_app, has_request_context
 from app import db
 from app.models.audit import AuditLog
 
+
+class AuditWriter:
+    """Bounded queue of audit entries drained by a background thread"""
+
+    def __init__(self, app):
+        self.app = app
+        self.pid = os.getpid()
+        self.batch_size = app.config.get('AUDIT_BATCH_SIZE', 200)
+        self.flush_interval = app.config.get('AUDIT_FLUSH_INTERVAL', 1.0)
+        self.queue = queue.Queue(maxsize=app.config.get('AUDIT_QUEUE_SIZE', 10000))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, entry):
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            # Writer is falling behind; keep the entry at the cost of latency
+            write_entries(self.app, [entry])
+
+    def _next_batch(self, timeout):
+        try:
+            batch = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch(self.flush_interval)
+            if batch:
+                write_entries(self.app, batch)
+        self.flush()
+
+    def flush(self):
+        """Write everything queued so far from the calling thread"""
+        while True:
+            batch = self._next_batch(timeout=0)
+            if not batch:
+                return
+            write_entries(self.app, batch)
+
+    def close(self, timeout=5.0):
+        """Stop the writer thread after it drains the queue (runs at exit)"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        self.flush()
+
+
+def write_entries(app, entries):
+    """Insert audit entries in one transaction of their own"""
+    try:
+        with app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(db.insert(AuditLog), entries)
+    except Exception as e:
+        print(f"[Audit] Failed to write {len(entries)} audit log entries: {e}")
+
+
+_writer_lock = threading.Lock()
+
+
+def get_writer(app):
+    """This process's writer for app, restarted after a fork"""
+    with _writer_lock:
+        writer = app.extensions.get('audit_writer')
+        if writer is None or writer.pid != os.getpid():
+            writer = AuditWriter(app)
+            app.extensions['audit_writer'] = writer
+        return writer
+
+
+def flush_audit_log():
+    """Write out pending audit entries for the current app"""
+    writer = current_app.extensions.get('audit_writer')
+    if writer is not None and writer.pid == os.getpid():
+        writer.flush()
+
+
 def log_action(action, resource_type, resource_id=None, details=None, user=None):
     """
     Log an audit action
-    
+
     Args:
         action (str): Action name (e.g., LOGIN, UPDATE)
         resource_type (str): Type of resource affected (e.g., USER, VM)
@@ -25,24 +125,27 @@ def log_action(action, resource_type, resource_id=None, details=None, user=None)
         else:
             user_id = None
             username = 'System/Guest'
-            
+
         # Get IP
-        ip_address = request.remote_addr if request else None
-            
-        log = AuditLog(
-            user_id=user_id,
-            username=username,
-            action=action,
-            resource_type=resource_type,
-            resource_id=str(resource_id) if resource_id else None,
-            details=details,
-            ip_address=ip_address,
-            created_at=datetime.now(timezone.utc)
-        )
-        
-        db.session.add(log)
-        db.session.commit()
+        ip_address = request.remote_addr if has_request_context() else None
+
+        entry = {
+            'user_id': user_id,
+            'username': username,
+            'action': action,
+            'resource_type': resource_type,
+            'resource_id': str(resource_id) if resource_id else None,
+            'details': details,
+            'ip_address': ip_address,
+            'created_at': datetime.now(timezone.utc)
+        }
+
+        app = current_app._get_current_object()
+        if app.config.get('AUDIT_LOG_MODE', 'async') == 'sync':
+            write_entries(app, [entry])
+            return
+
+        get_writer(app).submit(entry)
     except Exception as e:
         # Don't fail the request if logging fails, but maybe log to stderr
         print(f"Failed to write audit log: {e}")
-        db.session.rollback()
@@ -0,0 +1,70 @@
+"""
+Response compression
+
+Compresses JSON and text responses of at least COMPRESS_MIN_SIZE bytes with
+the best encoding the client accepts: brotli (when the brotli package is
+installed) or gzip. Streamed responses such as exports, file downloads and
+bodies that are already encoded are passed through. Set
+RESPONSE_COMPRESSION=false when a proxy in front compresses instead.
+"""
+import gzip
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # Optional dependency: gzip only
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/')
+
+
+def _choose_encoding():
+    accept = request.accept_encodings
+    gzip_quality = accept.quality('gzip')
+    brotli_quality = accept.quality('br') if brotli else 0
+    if brotli_quality and brotli_quality >= gzip_quality:
+        return 'br'
+    if gzip_quality:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """after_request hook: encode the body if it is worth it"""
+    config = current_app.config
+    if (
+        not config.get('RESPONSE_COMPRESSION', True)
+        or response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or 'Content-Encoding' in response.headers
+        or not (response.mimetype or '').startswith(COMPRESSIBLE_MIMETYPES)
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+    encoding = _choose_encoding()
+    if not encoding:
+        return response
+
+    if encoding == 'br':
+        body = brotli.compress(data, quality=config.get('COMPRESS_BROTLI_QUALITY', 4))
+    else:
+        body = gzip.compress(data, compresslevel=config.get('COMPRESS_GZIP_LEVEL', 6), mtime=0)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+
+    # The encoded bytes differ from the identity body the strong ETag names
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Register compress_response() on the app"""
+    app.after_request(compress_response)
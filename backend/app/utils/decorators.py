@@ -1,9 +1,11 @@
 from functools import wraps
-from flask import request, jsonify, current_app, g
+from flask import request, jsonify, current_app, g, make_response
 import hashlib
 from datetime import datetime
 from app import db
 from app.models.user import User, UserSession
+from app.services.data_version import DataVersion
+from app.utils.session_cache import session_cache
 
 
 def get_token_from_request():
@@ -28,10 +30,19 @@ def login_required(f):
             return jsonify({'error': 'Authentication required'}), 401
         
         token_hash = hash_token(token)
-        session = UserSession.query.filter_by(token_hash=token_hash, is_valid=True).first()
+        app = current_app._get_current_object()
         
+        session, user = session_cache.get(token_hash, app)
         if not session:
-            return jsonify({'error': 'Invalid or expired session'}), 401
+            generation = session_cache.generation()
+            session = UserSession.query.filter_by(token_hash=token_hash, is_valid=True).first()
+            
+            if not session:
+                return jsonify({'error': 'Invalid or expired session'}), 401
+            
+            user = session.user
+            if user:
+                session_cache.put(token_hash, session, user, app, generation)
         
         # Check session expiration
         inactive_timeout = current_app.config['SESSION_INACTIVE_TIMEOUT']
@@ -43,13 +54,11 @@ def login_required(f):
             return jsonify({'error': 'Session expired'}), 401
         
         # Get user
-        user = session.user
         if not user or not user.is_active:
             return jsonify({'error': 'User not found or inactive'}), 401
         
-        # Update last activity
-        session.update_activity()
-        db.session.commit()
+        # Update last activity (written through at most once a minute)
+        session_cache.touch(token_hash, session, app)
         
         # Store user in g for access in route
         g.current_user = user
@@ -81,3 +90,33 @@ def password_reset_not_required(f):
             }), 403
         return f(*args, **kwargs)
     return decorated
+
+
+def conditional_get(*sources):
+    """
+    Decorator for read endpoints that answers If-None-Match with 304 Not Modified.
+
+    The strong ETag hashes the request URL with the DataVersion of the given
+    sources (view arguments are passed as bind values, e.g. vm_id), so an
+    unchanged resource costs one version query and no body. Place it below
+    login_required.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            version = DataVersion.of(*sources, **kwargs)
+            etag = hashlib.sha256(repr((
+                request.path, sorted(request.args.items(multi=True)), version
+            )).encode()).hexdigest()[:32]
+
+            if request.if_none_match.contains_weak(etag):  # Proxies that compress weaken ETags
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'  # Always revalidate
+            return response
+        return decorated
+    return decorator
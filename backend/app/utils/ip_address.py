@@ -0,0 +1,53 @@
+"""
+IP address helpers
+
+IP columns are Postgres inet. Addresses are normalised here to the text
+form Postgres returns for them (host(inet)), so values read back from the
+database compare equal to freshly extracted ones during sync diffs.
+"""
+import ipaddress
+
+APIPA_NETWORK = ipaddress.ip_network('169.254.0.0/16')  # Link-local addresses assigned without DHCP
+
+
+def parse_ip(value):
+    """
+    Parse an address, ignoring any prefix length ("10.0.0.5/24") or IPv6
+    zone ("fe80::1%eth0").
+
+    Returns:
+        IPv4Address / IPv6Address, or None if value is not an address
+    """
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return ipaddress.ip_interface(value.strip().split('%', 1)[0]).ip
+    except ValueError:
+        return None
+
+
+def normalize_ip(value):
+    """Canonical text of an address (as Postgres prints it), or None if invalid"""
+    address = parse_ip(value)
+    if address is None:
+        return None
+    if address.version == 6 and address.ipv4_mapped:
+        return f'::ffff:{address.ipv4_mapped}'
+    return str(address)
+
+
+def is_apipa(value):
+    """Whether value is an IPv4 link-local (169.254.0.0/16) address"""
+    address = parse_ip(value)
+    return address is not None and address in APIPA_NETWORK
+
+
+def parse_network(value):
+    """
+    Parse a subnet like "10.20.0.0/16" (host bits are allowed) or a single
+    address.
+
+    Raises:
+        ValueError: if value is not a network
+    """
+    return ipaddress.ip_network(value.strip(), strict=False)
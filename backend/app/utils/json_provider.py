@@ -0,0 +1,75 @@
+"""
+JSON serialization
+
+create_app() installs the provider named by JSON_ENCODER as app.json, so
+jsonify(), returned dicts and request.get_json() all go through it:
+
+- orjson: OrjsonProvider, which encodes straight to bytes in C and handles
+  datetimes, dates, UUIDs and dataclasses natively
+- stdlib: StdlibProvider, Flask's json-module provider
+
+Both write datetimes as ISO 8601 (what the to_dict() methods produce) and
+Decimals as strings (Flask's behaviour), and keep Flask's key sorting and
+debug indentation, so the choice of encoder does not change responses.
+orjson is optional; without it the stdlib provider is used.
+"""
+from datetime import date, time
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional dependency
+    orjson = None
+
+
+def _default(value):
+    """Types neither encoder handles the same way natively"""
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)  # Decimal, UUID, dataclasses, __html__
+
+
+class StdlibProvider(DefaultJSONProvider):
+    """Flask's json-module provider, with ISO 8601 dates"""
+
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """orjson-backed provider"""
+
+    def _encode(self, obj, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self._encode(obj, indent=bool(kwargs.get('indent'))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self._encode(obj, indent) + b'\n', mimetype=self.mimetype)
+
+
+PROVIDERS = {
+    'orjson': OrjsonProvider,
+    'stdlib': StdlibProvider,
+}
+
+
+def init_json_provider(app):
+    """Install the JSON_ENCODER provider as app.json"""
+    name = app.config.get('JSON_ENCODER', 'orjson')
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown JSON_ENCODER '{name}'. Use one of: {', '.join(PROVIDERS)}")
+    if name == 'orjson' and orjson is None:
+        print("[JSON] orjson is not installed, using the stdlib encoder")
+        name = 'stdlib'
+    app.json = PROVIDERS[name](app)
@@ -0,0 +1,66 @@
+"""
+Streaming JSON helpers for sync responses
+
+Reads downloaded API bodies in chunks and yields items from a JSON array
+one at a time, so large inventories never exist in memory as one parsed
+tree.
+"""
+import ijson
+
+
+class BodyStream:
+    """Chunked, peekable reader over a response body file"""
+
+    def __init__(self, fileobj, chunk_size=65536):
+        self._chunks = iter(lambda: fileobj.read(chunk_size), b'')
+        self._buffer = b''
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self.bytes_read += len(chunk)
+            self._buffer += chunk
+
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def peek_char(self):
+        """Return the first non-whitespace byte without consuming it"""
+        while True:
+            stripped = self._buffer.lstrip()
+            if stripped:
+                self._buffer = stripped
+                return stripped[:1]
+            self._buffer = b''
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return b''
+            self.bytes_read += len(chunk)
+            self._buffer = chunk
+
+
+def iter_items(stream, list_prefix, dict_prefix=None):
+    """
+    Yield items from a streamed JSON body.
+
+    Args:
+        stream: BodyStream for the body
+        list_prefix: ijson prefix to use when the body is a JSON array
+        dict_prefix: ijson prefix to use when the body is a JSON object
+            (None means objects yield nothing)
+    """
+    first = stream.peek_char()
+    if first == b'[':
+        prefix = list_prefix
+    elif first == b'{' and dict_prefix:
+        prefix = dict_prefix
+    else:
+        return
+
+    yield from ijson.items(stream, prefix, use_float=True)
@@ -0,0 +1,190 @@
+"""
+List pagination
+
+paginate() serves two styles from the same query:
+
+- offset: ?page=N&per_page=M, with total and pages (the original behaviour)
+- keyset: ?cursor=<token>&per_page=M, where the token comes from the
+  previous response's next_cursor (an empty cursor starts at the first
+  page). Rows are found by seeking past the last row's sort value and id,
+  so every page costs the same as the first. The total is only counted
+  when include_total=true, and counts are cached per process for
+  PAGINATION_COUNT_CACHE_TTL seconds.
+
+Both styles order by the sort column and then the id, so pages are stable
+when sort values repeat. Responses always carry next_cursor, so an offset
+client can switch to cursors at any page.
+"""
+import base64
+import json
+import math
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+from flask import request, current_app
+from sqlalchemy import tuple_
+
+
+class CursorError(ValueError):
+    """Cursor token that is malformed or belongs to a different sort"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+        raise CursorError('Invalid cursor')
+    return value
+
+
+def encode_cursor(sort, value, row_id):
+    """Opaque token for the position after (value, row_id) in a sort"""
+    payload = json.dumps({'s': sort, 'v': _encode_value(value), 'id': row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, sort):
+    """
+    Returns:
+        (value, row_id) of the last row of the previous page
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        value, row_id = _decode_value(data['v']), data['id']
+        cursor_sort = data['s']
+    except CursorError:
+        raise
+    except Exception:
+        raise CursorError('Invalid cursor')
+    if cursor_sort != sort:
+        raise CursorError('Cursor does not match the requested sort order')
+    return value, row_id
+
+
+class _CountCache:
+    """Per-process TTL cache of filtered row counts"""
+
+    def __init__(self, max_entries=1000):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def put(self, key, count, ttl):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (time.monotonic() + ttl, count)
+
+
+_count_cache = _CountCache()
+
+
+def _count(query, cached):
+    query = query.order_by(None)
+    ttl = current_app.config.get('PAGINATION_COUNT_CACHE_TTL', 60)
+    if not cached or not ttl:
+        return query.count()
+
+    compiled = query.statement.compile()
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    count = _count_cache.get(key)
+    if count is None:
+        count = query.count()
+        _count_cache.put(key, count, ttl)
+    return count
+
+
+def _order(column, id_column, descending, nullable):
+    if descending:
+        order = [column.desc().nulls_last() if nullable else column.desc(), id_column.desc()]
+    else:
+        order = [column.asc().nulls_last() if nullable else column.asc(), id_column.asc()]
+    return order
+
+
+def _after(column, id_column, value, row_id, descending, nullable):
+    """Filter for rows after (value, row_id) in the order built by _order()"""
+    if value is None:
+        # Already in the trailing NULLs: only ids remain to seek on
+        return column.is_(None) & (id_column < row_id if descending else id_column > row_id)
+
+    position = tuple_(column, id_column)
+    after = position < tuple_(value, row_id) if descending else position > tuple_(value, row_id)
+    if nullable:
+        after = after | column.is_(None)
+    return after
+
+
+def paginate(query, column, id_column, sort='default', descending=False, nullable=None, default_per_page=50):
+    """
+    Page a query by its sort column, offset or keyset style (see module docstring).
+
+    Args:
+        query: Filtered Query, without ORDER BY
+        column: Sort column
+        id_column: Unique tie-breaker (the primary key)
+        sort: Name of the sort, recorded in cursors so they are not reused
+            with a different one
+        descending: Sort direction (applies to the id as well)
+        nullable: Whether the sort column can hold NULLs (sorted last);
+            taken from the column definition if None
+        default_per_page: per_page when none is requested
+
+    Returns:
+        (items, meta) where meta holds per_page and next_cursor, plus
+        total, page and pages for offset requests
+
+    Raises:
+        CursorError: for an invalid cursor argument
+    """
+    per_page = request.args.get('per_page', default_per_page, type=int)
+    if per_page is None or per_page < 1:
+        per_page = default_per_page
+    if nullable is None:
+        nullable = getattr(getattr(column, 'expression', column), 'nullable', True)
+
+    rows = query.add_columns(column, id_column).order_by(*_order(column, id_column, descending, nullable))
+    cursor = request.args.get('cursor')
+    meta = {'per_page': per_page}
+
+    if cursor is not None:
+        if cursor:
+            value, row_id = decode_cursor(cursor, sort)
+            rows = rows.filter(_after(column, id_column, value, row_id, descending, nullable))
+        page_rows = rows.limit(per_page + 1).all()
+        has_more = len(page_rows) > per_page
+        page_rows = page_rows[:per_page]
+        if request.args.get('include_total', 'false').lower() == 'true':
+            meta['total'] = _count(query, cached=True)
+    else:
+        page = request.args.get('page', 1, type=int)
+        if page is None or page < 1:
+            page = 1
+        total = _count(query, cached=False)
+        page_rows = rows.limit(per_page).offset((page - 1) * per_page).all()
+        has_more = page * per_page < total
+        meta.update({'total': total, 'page': page, 'pages': math.ceil(total / per_page) if total else 0})
+
+    meta['has_more'] = has_more
+    meta['next_cursor'] = (
+        encode_cursor(sort, page_rows[-1][-2], page_rows[-1][-1]) if has_more and page_rows else None
+    )
+    return [row[0] for row in page_rows], meta
@@ -0,0 +1,74 @@
+"""
+Phase timing helpers for sync instrumentation
+
+Accumulates wall-clock and CPU time per named phase, so a sync run can
+report where its time went.
+"""
+import time
+from contextlib import contextmanager
+
+_DONE = object()
+
+
+class PhaseTimer:
+    """Accumulated wall and thread CPU time per phase"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+
+    def add(self, name, wall=0.0, cpu=0.0, calls=1):
+        phase = self.phases.setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'calls': 0})
+        phase['wall'] += wall
+        phase['cpu'] += cpu
+        phase['calls'] += calls
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block. Phases should not be nested."""
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add(
+                name,
+                wall=time.perf_counter() - wall_start,
+                cpu=time.thread_time() - cpu_start
+            )
+
+    def iterate(self, name, iterable):
+        """
+        Yield from iterable, timing only the time spent producing items.
+
+        Used for lazy sources such as streaming parsers, whose work happens
+        inside next() rather than in one block.
+        """
+        iterator = iter(iterable)
+        while True:
+            wall_start = time.perf_counter()
+            cpu_start = time.thread_time()
+            item = next(iterator, _DONE)
+            self.add(
+                name,
+                wall=time.perf_counter() - wall_start,
+                cpu=time.thread_time() - cpu_start,
+                calls=0 if item is _DONE else 1
+            )
+            if item is _DONE:
+                return
+            yield item
+
+    def to_dict(self):
+        """Summary for VMSyncRun.details['timings']"""
+        return {
+            'total_wall_seconds': round(time.perf_counter() - self.started, 3),
+            'phases': {
+                name: {
+                    'wall_seconds': round(phase['wall'], 3),
+                    'cpu_seconds': round(phase['cpu'], 3),
+                    'calls': phase['calls']
+                }
+                for name, phase in self.phases.items()
+            }
+        }
@@ -0,0 +1,242 @@
+"""
+Session validation cache
+
+login_required looks sessions up here before going to the database. Entries
+hold column snapshots of a UserSession and its User, keyed by token hash,
+and are re-attached to the request's db.session with merge(load=False), so
+a cache hit costs no queries. last_activity is written behind: at most once
+per SESSION_ACTIVITY_WRITE_SECONDS per session.
+
+Any committed change to a User or UserSession (logout, session revoke,
+deactivation, password or role change, user deletion) evicts the affected
+entries in this process and, through Postgres NOTIFY, in every other
+process. The cache is only used while this process is listening for those
+notifications, and entries expire after SESSION_CACHE_TTL regardless.
+"""
+import json
+import select
+import threading
+import time
+from datetime import datetime, timezone
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app import db
+from app.models.user import User, UserSession
+
+NOTIFY_CHANNEL = 'vmi_session_cache'
+
+
+def _columns(obj):
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(type(obj)).column_attrs}
+
+
+def _detached(model, values):
+    obj = model(**values)
+    make_transient_to_detached(obj)
+    return obj
+
+
+class _Entry:
+    def __init__(self, session, user, ttl):
+        self.session_values = _columns(session)
+        self.user_values = _columns(user)
+        self.persisted_activity = session.last_activity
+        self.expires = time.monotonic() + ttl
+
+    @property
+    def session_id(self):
+        return self.session_values['id']
+
+    @property
+    def user_id(self):
+        return self.user_values['id']
+
+
+class SessionCache:
+    """Per-process TTL cache of validated sessions"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._generation = 0  # Bumped by every eviction
+        self.listening = False
+
+    def generation(self):
+        """Pass to put(), so a lookup that raced an eviction is not cached"""
+        return self._generation
+
+    def get(self, token_hash, app):
+        """
+        Cached (UserSession, User) attached to db.session, or (None, None).
+        """
+        if not self.listening or not app.config.get('SESSION_CACHE_TTL', 30):
+            return None, None
+
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry and entry.expires < time.monotonic():
+                del self._entries[token_hash]
+                entry = None
+        if not entry:
+            return None, None
+
+        user = db.session.merge(_detached(User, entry.user_values), load=False)
+        session = db.session.merge(_detached(UserSession, entry.session_values), load=False)
+        return session, user
+
+    def put(self, token_hash, session, user, app, generation):
+        ttl = app.config.get('SESSION_CACHE_TTL', 30)
+        if not self.listening or not ttl:
+            return
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            if len(self._entries) >= app.config.get('SESSION_CACHE_SIZE', 10000):
+                self._entries.clear()
+            self._entries[token_hash] = _Entry(session, user, ttl)
+
+    def touch(self, token_hash, session, app):
+        """
+        Record activity on a session.
+
+        The database is only written when the stored last_activity is older
+        than SESSION_ACTIVITY_WRITE_SECONDS. The write uses its own
+        connection, so the request's session (and its loaded objects) is
+        left alone.
+        """
+        now = datetime.now(timezone.utc)
+        threshold = app.config.get('SESSION_ACTIVITY_WRITE_SECONDS', 60)
+
+        with self._lock:
+            entry = self._entries.get(token_hash)
+        persisted = entry.persisted_activity if entry else session.last_activity
+        if persisted and persisted.tzinfo is None:
+            persisted = persisted.replace(tzinfo=timezone.utc)
+
+        if entry:
+            entry.session_values['last_activity'] = now
+
+        if persisted and (now - persisted).total_seconds() < threshold:
+            return
+
+        with db.engine.begin() as conn:
+            conn.execute(
+                db.update(UserSession.__table__)
+                .where(UserSession.__table__.c.id == session.id)
+                .values(last_activity=now)
+            )
+        if entry:
+            entry.persisted_activity = now
+
+    def evict(self, user_ids=(), session_ids=()):
+        user_ids, session_ids = set(user_ids), set(session_ids)
+        with self._lock:
+            self._generation += 1
+            for token_hash, entry in list(self._entries.items()):
+                if entry.user_id in user_ids or entry.session_id in session_ids:
+                    del self._entries[token_hash]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+session_cache = SessionCache()
+
+
+# Invalidation: collect changed users/sessions while flushing, act on commit
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault('session_cache_evict', {'users': set(), 'sessions': set()})
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            pending['users'].add(obj.id)
+        elif isinstance(obj, UserSession) and obj.id is not None:
+            pending['sessions'].add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _evict_committed(session):
+    pending = session.info.pop('session_cache_evict', None)
+    if not pending or not (pending['users'] or pending['sessions']):
+        return
+
+    session_cache.evict(pending['users'], pending['sessions'])
+    payload = json.dumps({'users': sorted(pending['users']), 'sessions': sorted(pending['sessions'])})
+    if len(payload) > 7000:
+        payload = 'all'
+
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {'channel': NOTIFY_CHANNEL, 'payload': payload})
+    except Exception as e:
+        print(f"[SessionCache] Failed to notify other processes: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('session_cache_evict', None)
+
+
+# Listener thread: applies evictions from other processes
+
+_listener = None
+
+
+def _handle_notification(payload):
+    if payload == 'all':
+        session_cache.clear()
+        return
+    data = json.loads(payload)
+    session_cache.evict(data.get('users', ()), data.get('sessions', ()))
+
+
+def _listen(app):
+    """Hold a LISTEN connection; the cache is disabled while it is down"""
+    while True:
+        raw = None
+        try:
+            with app.app_context():
+                raw = db.engine.raw_connection()
+                conn = raw.driver_connection
+                raw.detach()  # Never hand a LISTENing connection back to the pool
+            conn.autocommit = True
+            conn.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+
+            # Anything cached before now may have missed a notification
+            session_cache.clear()
+            session_cache.listening = True
+
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    conn.cursor().execute("SELECT 1")  # Detect a dead connection
+                conn.poll()
+                while conn.notifies:
+                    _handle_notification(conn.notifies.pop(0).payload)
+        except Exception as e:
+            print(f"[SessionCache] Invalidation listener error: {e}")
+        finally:
+            session_cache.listening = False
+            session_cache.clear()
+            if raw is not None:
+                try:
+                    raw.close()
+                except Exception:
+                    pass
+        time.sleep(5)
+
+
+def start_invalidation_listener(app):
+    """Start this process's cache invalidation listener"""
+    global _listener
+
+    if not app.config.get('SESSION_CACHE_TTL', 30):
+        return
+    if _listener and _listener.is_alive():
+        return
+
+    _listener = threading.Thread(target=_listen, args=(app,), name='session-cache-listener', daemon=True)
+    _listener.start()
@@ -0,0 +1,30 @@
+"""
+Rebuild the hourly change rollup from vm_change_history
+
+Usage:
+    python backfill_change_rollup.py            # rebuild everything
+    python backfill_change_rollup.py --days 30  # rebuild the last 30 days only
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timezone, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.services.change_rollup import ChangeRollup
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, help='Only rebuild this many recent days')
+    args = parser.parse_args()
+    
+    since = datetime.now(timezone.utc) - timedelta(days=args.days) if args.days else None
+    
+    app = create_app(os.getenv('FLASK_CONFIG', 'default'))
+    with app.app_context():
+        written = ChangeRollup.rebuild(since=since)
+    print(f"[ChangeRollup] Wrote {written} rollup rows")
@@ -0,0 +1,135 @@
+"""
+Benchmark JSON encoding and response compression
+
+Builds a VM list page (rows shaped like GET /api/vms items) and measures,
+for each JSON encoder, how many responses per second can be encoded, and
+for each compression encoding, the response size and encode time. No
+database is needed.
+
+Usage:
+    python benchmark_json.py                      # 200-row page
+    python benchmark_json.py --rows 1000 --seconds 3
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.utils import compression
+from app.utils.json_provider import PROVIDERS, orjson
+
+
+def build_page(rows):
+    """A list_vms-style response with typical values"""
+    now = datetime.now(timezone.utc)
+    vms = []
+    for i in range(rows):
+        vms.append({
+            'id': i + 1,
+            'vm_name': f'app-server-{i:05d}',
+            'platform': 'vmware' if i % 3 else 'nutanix',
+            'power_state': 'poweredOn' if i % 7 else 'poweredOff',
+            'memory_gb': 16.0,
+            'total_disk_gb': 250.5,
+            'total_vcpus': 8,
+            'ip_address': f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}',
+            'os_type': 'Red Hat Enterprise Linux 9 (64-bit)',
+            'os_family': 'linux',
+            'environment': 'production',
+            'cluster_name': f'cluster-{i % 8}',
+            'host': None,
+            'host_identifier': f'172.16.0.{i % 40}',
+            'host_hostname': f'esxi-{i % 40:02d}.example.net',
+            'hypervisor_type': 'ESXi',
+            'hostname': f'app-server-{i:05d}.example.net',
+            'tags': ['prod', 'backup-daily', f'team-{i % 12}'],
+            'has_public_ip': i % 11 == 0,
+            'has_dns_record': i % 5 == 0,
+            'vm_uuid': str(uuid.UUID(int=i)),
+            'inventory_key': f'vmware:vm-{i}',
+            'bios_uuid': str(uuid.UUID(int=i + 10 ** 9)),
+            'is_deleted': False,
+            'first_seen_at': (now - timedelta(days=400)).isoformat(),
+            'last_seen_at': now.isoformat(),
+            'total_disks': 3,
+            'total_nics': 2,
+            'creation_date': (now - timedelta(days=500)).isoformat(),
+            'last_update_date': (now - timedelta(hours=i % 48)).isoformat(),
+            'fact_updated_at': now.isoformat(),
+            'business_owner_id': i % 30,
+            'technical_owner_id': i % 25,
+            'division_id': i % 6,
+            'division_name': f'Division {i % 6}',
+            'department': 'Infrastructure',
+            'project_name': f'Project {i % 17}',
+            'notes': 'Managed by the platform team. Patch window: Sunday 02:00-04:00.',
+            'business_owner': f'Owner {i % 30}',
+            'business_owner_email': f'owner{i % 30}@example.net',
+            'technical_owner': f'Engineer {i % 25}',
+            'technical_owner_email': f'engineer{i % 25}@example.net',
+        })
+    return {'vms': vms, 'total': rows * 50, 'page': 1, 'pages': 50, 'per_page': rows,
+            'has_more': True, 'next_cursor': 'eyJzIjoidm1fbmFtZTphc2MiLCJ2IjoieCIsImlkIjoxfQ'}
+
+
+def measure(fn, seconds):
+    """Calls per second of fn over roughly `seconds`"""
+    fn()  # Warm up
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return calls / elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200, help='VMs on the page')
+    parser.add_argument('--seconds', type=float, default=2.0, help='Time spent on each measurement')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_CONFIG', 'production'))
+    page = build_page(args.rows)
+
+    print(f"[Benchmark] {args.rows}-row VM page")
+    print(f"{'encoder':<10}{'responses/s':>14}{'ms/response':>14}{'bytes':>12}")
+    baseline = None
+    bodies = {}
+    for name in ('stdlib', 'orjson'):  # Before and after
+        if name == 'orjson' and orjson is None:
+            print(f"{name:<10}{'not installed':>14}")
+            continue
+        provider = PROVIDERS[name](app)
+        with app.app_context():
+            rate = measure(lambda: provider.response(page), args.seconds)
+            bodies[name] = provider.response(page).get_data()
+        baseline = baseline or rate
+        print(f"{name:<10}{rate:>14.0f}{1000 / rate:>14.2f}{len(bodies[name]):>12}"
+              + (f"   {rate / baseline:.1f}x" if rate != baseline else ''))
+    if len(set(bodies.values())) > 1:
+        print("[Benchmark] WARNING: encoders produced different output")
+    body = bodies.get('orjson', bodies['stdlib'])
+
+    encoders = {
+        'identity': lambda data: data,
+        'gzip': lambda data: gzip.compress(data, compresslevel=app.config['COMPRESS_GZIP_LEVEL'], mtime=0),
+    }
+    if compression.brotli:
+        encoders['br'] = lambda data: compression.brotli.compress(data, quality=app.config['COMPRESS_BROTLI_QUALITY'])
+
+    print(f"\n{'encoding':<10}{'bytes':>14}{'ratio':>14}{'ms/response':>12}")
+    for name, encode in encoders.items():
+        size = len(encode(body))
+        rate = measure(lambda: encode(body), args.seconds)
+        print(f"{name:<10}{size:>14}{len(body) / size:>14.1f}{1000 / rate:>12.2f}")
+    if not compression.brotli:
+        print("br        (brotli is not installed)")
@@ -45,6 +45,169 @@ def init_db():
             print("  (Password reset required on first login)")
         else:
             print("Admin user already exists.")
+        
+        apply_schema_updates()
+        migrate_ip_columns()
+        maintain_partitions()
+        backfill_change_rollup()
+        refresh_effective_inventory()
+
+
+# Idempotent DDL for columns/indexes added after a table was first created
+# (db.create_all() only creates missing tables)
+SCHEMA_UPDATES = [
+    "ALTER TABLE vm_fact ADD COLUMN IF NOT EXISTS payload_hash VARCHAR(64)",
+    "ALTER TABLE vm_sync_run ADD COLUMN IF NOT EXISTS job_id BIGINT REFERENCES sync_job(id) ON DELETE SET NULL",
+    "ALTER TABLE vm_sync_run ADD COLUMN IF NOT EXISTS progress JSON",
+    "CREATE INDEX IF NOT EXISTS ix_audit_logs_created_at_id ON audit_logs (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_vm_sync_run_started_at_id ON vm_sync_run (started_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_vm_sync_run_finished_at ON vm_sync_run (finished_at)",
+    "CREATE INDEX IF NOT EXISTS ix_vm_change_history_changed_at_id ON vm_change_history (changed_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_vm_change_history_vm_id_changed_at_id ON vm_change_history (vm_id, changed_at, id)",
+    "DROP INDEX IF EXISTS ix_vm_change_history_changed_at",
+    "DROP INDEX IF EXISTS ix_vm_change_history_vm_id_changed_at",
+    "ALTER TABLE vm_effective ADD COLUMN IF NOT EXISTS search_text TEXT",
+    # VM search; without pg_trgm the search falls back to scanning vm_effective
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_vm_effective_search_text_trgm ON vm_effective USING gin (search_text gin_trgm_ops)",
+    # os_type filters with ILIKE '%...%', which a lower(os_type) btree cannot serve
+    "DROP INDEX IF EXISTS ix_vm_effective_os_type_lower",
+    "CREATE INDEX IF NOT EXISTS ix_vm_effective_os_type_trgm ON vm_effective USING gin (os_type gin_trgm_ops)",
+    # The inventory version is now derived from vm_effective; drop the old counter row
+    "DELETE FROM site_settings WHERE key = 'inventory_version'",
+]
+
+
+def apply_schema_updates():
+    """Apply schema updates to existing databases"""
+    from sqlalchemy import text
+    
+    for statement in SCHEMA_UPDATES:
+        try:
+            db.session.execute(text(statement))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Schema update warning ({statement[:60]}...): {e}")
+
+
+
+# (table, key columns identifying a row's address) for IP columns stored as inet
+IP_COLUMNS = [
+    ('vm_nic_ip_fact', ('nic_id',)),
+    ('vm_ip_manual', ('vm_id',)),
+]
+
+
+def _ip_column_type(table):
+    from sqlalchemy import text
+    
+    return db.session.execute(text(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_name = :table AND column_name = 'ip_address'"
+    ), {'table': table}).scalar()
+
+
+def migrate_ip_columns():
+    """
+    Convert VARCHAR IP columns to inet.
+    
+    Values are reduced to the bare address (prefix lengths and IPv6 zones
+    dropped). Rows that still are not addresses, or that become duplicates,
+    are moved to <table>_invalid_ips for review instead of being lost.
+    """
+    from sqlalchemy import text
+    
+    try:
+        db.session.execute(text("""
+            CREATE OR REPLACE FUNCTION pg_temp.vmi_to_inet(value text) RETURNS inet
+            LANGUAGE plpgsql IMMUTABLE AS $$
+            BEGIN
+                RETURN host(split_part(btrim(value), '%', 1)::inet)::inet;
+            EXCEPTION WHEN others THEN
+                RETURN NULL;
+            END $$
+        """))
+        
+        for table, keys in IP_COLUMNS:
+            if _ip_column_type(table) != 'character varying':
+                continue
+            
+            partition = ', '.join(keys)
+            invalid = f"{table}_invalid_ips"
+            db.session.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {invalid} AS SELECT * FROM {table} WITH NO DATA"
+            ))
+            moved = db.session.execute(text(f"""
+                WITH ranked AS (
+                    SELECT ctid AS row_ctid, pg_temp.vmi_to_inet(ip_address) AS address,
+                           row_number() OVER (
+                               PARTITION BY {partition}, pg_temp.vmi_to_inet(ip_address) ORDER BY ctid
+                           ) AS position
+                    FROM {table}
+                ), removed AS (
+                    DELETE FROM {table}
+                    WHERE ctid IN (SELECT row_ctid FROM ranked WHERE address IS NULL OR position > 1)
+                    RETURNING *
+                )
+                INSERT INTO {invalid} SELECT * FROM removed
+            """)).rowcount
+            if not moved:
+                db.session.execute(text(f"DROP TABLE {invalid}"))
+            db.session.execute(text(
+                f"ALTER TABLE {table} ALTER COLUMN ip_address TYPE inet USING pg_temp.vmi_to_inet(ip_address)"
+            ))
+            db.session.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_ip_address ON {table} USING gist (ip_address inet_ops)"
+            ))
+            print(f"Converted {table}.ip_address to inet ({moved} invalid or duplicate rows moved to {invalid})")
+        
+        # Derived, so simply emptied; init_db refreshes it afterwards
+        if _ip_column_type('vm_effective') == 'character varying':
+            db.session.execute(text("ALTER TABLE vm_effective ALTER COLUMN ip_address TYPE inet USING NULL"))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"IP column migration warning: {e}")
+
+
+def maintain_partitions():
+    """Create upcoming change history partitions (converting the table if needed)"""
+    from app.services.change_partitions import ChangeHistoryPartitions
+    
+    try:
+        ChangeHistoryPartitions.maintain()
+    except Exception as e:
+        print(f"Partition maintenance warning: {e}")
+
+
+
+def backfill_change_rollup():
+    """Build the change rollup on first start after it was introduced"""
+    from app.models.sync import VMChangeHistory, VMChangeRollup
+    from app.services.change_rollup import ChangeRollup
+    
+    try:
+        if VMChangeRollup.query.first() is None and VMChangeHistory.query.first() is not None:
+            print("Backfilling change rollup...")
+            ChangeRollup.rebuild()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Change rollup backfill warning: {e}")
+
+
+
+def refresh_effective_inventory():
+    """Rebuild every vm_effective row (fills the table on first start)"""
+    from app.services.vm_effective import EffectiveInventory
+    
+    try:
+        refreshed = EffectiveInventory.refresh()
+        db.session.commit()
+        print(f"Refreshed {refreshed} effective inventory rows.")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Effective inventory refresh warning: {e}")
 
 
 if __name__ == '__main__':
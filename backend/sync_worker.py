@@ -0,0 +1,22 @@
+"""
+Standalone sync job worker
+
+Runs queued sync jobs outside the web server (the sync_worker service in
+docker-compose.yml). Queued jobs wait until a worker picks them up; for
+local development without one, set SYNC_JOB_WORKER=thread to run a worker
+thread inside the web process instead.
+"""
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.services.job_queue import run_worker
+
+
+if __name__ == '__main__':
+    app = create_app(os.getenv('FLASK_CONFIG', 'default'))
+    print("[SyncWorker] Waiting for jobs...")
+    run_worker(app)
@@ -0,0 +1,33 @@
+"""conditional_get ETags"""
+from app.models.vm import VM
+from conftest import run_sync, vm_payload
+
+
+def _vm_ids(app):
+    with app.app_context():
+        run_sync('vmware', {'http://api.test/vmware/vms': [vm_payload(i) for i in range(2)]})
+        return [vm.id for vm in VM.query.order_by(VM.id)]
+
+
+def test_vm_detail_etag_follows_that_vm_only(app, client):
+    first, second = _vm_ids(app)
+    etag = client.get(f'/api/vms/{first}').headers['ETag']
+    list_etag = client.get('/api/vms').headers['ETag']
+
+    client.post(f'/api/vms/{second}/tags', json={'tag_value': 'other'})
+    assert client.get(f'/api/vms/{first}', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/vms').headers['ETag'] != list_etag
+
+    client.post(f'/api/vms/{first}/tags', json={'tag_value': 'mine'})
+    response = client.get(f'/api/vms/{first}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert [tag['tag_value'] for tag in response.get_json()['vm']['tags']] == ['mine']
+
+
+def test_vm_detail_etag_moves_when_a_sync_sees_the_vm(app, client):
+    first, _ = _vm_ids(app)
+    etag = client.get(f'/api/vms/{first}').headers['ETag']
+
+    with app.app_context():
+        run_sync('vmware', {'http://api.test/vmware/vms': [vm_payload(i) for i in range(2)]})
+    assert client.get(f'/api/vms/{first}', headers={'If-None-Match': etag}).status_code == 200  # last_seen_at
@@ -0,0 +1,84 @@
+"""InventorySummary cache versioning"""
+import threading
+
+from app import db
+from app.models.settings import SiteSettings
+from app.models.vm import VM, VMTag
+from app.services.inventory_summary import InventorySummary
+from app.services.vm_effective import EffectiveInventory
+from conftest import run_sync, vm_payload
+
+
+def test_version_follows_read_model_writes(app):
+    with app.app_context():
+        run_sync('vmware', {'http://api.test/vmware/vms': [vm_payload(i) for i in range(3)]})
+        synced = InventorySummary.version()
+        assert InventorySummary.version() == synced
+
+        vm = VM.query.first()
+        db.session.add(VMTag(vm_id=vm.id, tag_value='prod'))
+        EffectiveInventory.refresh([vm.id])
+        db.session.commit()
+        tagged = InventorySummary.version()
+        assert tagged != synced
+        assert InventorySummary.get()['tags'] == ['prod']
+
+        vm.is_deleted = True
+        db.session.flush()
+        EffectiveInventory.refresh_deleted_flags('vmware')
+        db.session.commit()
+        assert InventorySummary.version() != tagged
+        assert InventorySummary.get()['total_vms'] == 2
+
+
+def test_writes_do_not_touch_site_settings(app):
+    with app.app_context():
+        run_sync('vmware', {'http://api.test/vmware/vms': [vm_payload(i) for i in range(3)]})
+        EffectiveInventory.refresh()
+        db.session.commit()
+        assert SiteSettings.query.count() == 0
+
+
+def test_out_of_order_commits_move_the_version(app):
+    """A refresh that commits after a later one still invalidates the cache"""
+    with app.app_context():
+        run_sync('vmware', {'http://api.test/vmware/vms': [vm_payload(i) for i in range(2)]})
+        first_id, second_id = [vm.id for vm in VM.query.order_by(VM.id)]
+        db.session.remove()
+
+    refreshed, release = threading.Event(), threading.Event()
+    errors = []
+
+    def slow_edit():
+        try:
+            with app.app_context():
+                db.session.add(VMTag(vm_id=first_id, tag_value='slow'))
+                EffectiveInventory.refresh([first_id])
+                refreshed.set()
+                release.wait(10)
+                db.session.commit()
+                db.session.remove()
+        except Exception as e:
+            errors.append(e)
+            refreshed.set()
+
+    thread = threading.Thread(target=slow_edit)
+    thread.start()
+    try:
+        assert refreshed.wait(10)
+        with app.app_context():
+            db.session.add(VMTag(vm_id=second_id, tag_value='fast'))
+            EffectiveInventory.refresh([second_id])
+            db.session.commit()
+
+            assert InventorySummary.get()['tags'] == ['fast']  # Cached without the slow edit
+            cached = InventorySummary.version()
+            db.session.remove()
+    finally:
+        release.set()
+        thread.join()
+    assert not errors
+
+    with app.app_context():
+        assert InventorySummary.version() != cached
+        assert InventorySummary.get()['tags'] == ['fast', 'slow']
@@ -0,0 +1,36 @@
+"""SyncJobQueue.enqueue"""
+import threading
+
+from app import db
+from app.models.sync import SyncJob
+from app.services.job_queue import SyncJobQueue
+
+
+def test_concurrent_enqueue_creates_one_job(app):
+    requests = 8
+    barrier = threading.Barrier(requests)
+    job_ids = []
+
+    def enqueue():
+        with app.app_context():
+            barrier.wait()  # Line the requests up so their duplicate checks overlap
+            job, created = SyncJobQueue.enqueue(SyncJob.TYPE_HOSTS, {'platform': 'vmware'})
+            job_ids.append(job.id)
+            db.session.remove()
+
+    threads = [threading.Thread(target=enqueue) for _ in range(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        assert SyncJob.query.count() == 1
+    assert len(set(job_ids)) == 1
+
+
+def test_different_params_are_separate_jobs(app):
+    with app.app_context():
+        vmware, _ = SyncJobQueue.enqueue(SyncJob.TYPE_HOSTS, {'platform': 'vmware'})
+        nutanix, created = SyncJobQueue.enqueue(SyncJob.TYPE_HOSTS, {'platform': 'nutanix'})
+        assert created and nutanix.id != vmware.id
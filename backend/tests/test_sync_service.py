@@ -0,0 +1,133 @@
+"""SyncService.sync_platform"""
+import json
+
+from app import db
+from app.models.host import Host
+from app.models.network import Network, VMwareNetwork
+from app.models.system_api import SystemApi
+from app.models.sync import VMChangeHistory
+from app.models.vm import VM, VMFact
+from app.services.sync_service import SyncService
+from conftest import FakeResponse, run_sync, serve, vm_payload
+
+FIRST_API = 'http://api.test/vmware/vms'
+SECOND_API = 'http://api.test/vmware/vms-2'
+
+
+def _truncated(payload):
+    """The first 70% of the payload's JSON"""
+    body = json.dumps(payload).encode()
+    return body[:int(len(body) * 0.7)]
+
+
+def _memory_by_name():
+    return dict(db.session.execute(
+        db.select(VM.vm_name, VMFact.memory_mb).join(VMFact, VMFact.vm_id == VM.id)
+    ).all())
+
+
+def _changed_vm_names(sync_run_id):
+    return {name for name, in db.session.execute(
+        db.select(VM.vm_name).join(VMChangeHistory, VMChangeHistory.vm_id == VM.id)
+        .where(VMChangeHistory.sync_run_id == sync_run_id).distinct()
+    )}
+
+
+def _sync_with_broken_second_api(app, second_body):
+    """
+    Sync VMs 0-9 from two APIs, then resync with more memory everywhere
+    while the second API (VMs 5-9) returns `second_body(payload)`.
+    """
+    app.config['SYNC_BATCH_SIZE'] = 2  # Several chunks are written before the body breaks
+    db.session.add(SystemApi(name='vmware-vms-2', url=SECOND_API, method='POST', resource_type='vmware_vm'))
+    db.session.commit()
+
+    run_sync('vmware', {
+        FIRST_API: [vm_payload(i) for i in range(5)],
+        SECOND_API: [vm_payload(i) for i in range(5, 10)],
+    })
+    result = run_sync('vmware', {
+        FIRST_API: [vm_payload(i, memory_mb=8192) for i in range(5)],
+        SECOND_API: second_body([vm_payload(i, memory_mb=8192) for i in range(5, 10)]),
+    })
+    db.session.expire_all()
+    return result
+
+
+def test_truncated_body_is_not_half_applied(app):
+    """A body that breaks partway leaves the state a failed download would"""
+    with app.app_context():
+        result = _sync_with_broken_second_api(app, _truncated)
+
+        memory = _memory_by_name()
+        assert all(memory[f'vm-{i:03d}'] == 8192 for i in range(5))
+        # Chunks parsed before the break were rolled back with their API
+        assert all(memory[f'vm-{i:03d}'] == 4096 for i in range(5, 10))
+        assert _changed_vm_names(result['sync_run_id']) == {f'vm-{i:03d}' for i in range(5)}
+
+
+def test_truncated_body_matches_failed_download(app):
+    """Compare against an API that fails outright (baseline behaviour)"""
+    def state(body):
+        with app.app_context():
+            result = _sync_with_broken_second_api(app, body)
+            return (
+                _memory_by_name(),
+                dict(db.session.execute(db.select(VM.vm_name, VM.is_deleted)).all()),
+                _changed_vm_names(result['sync_run_id']),
+            )
+
+    truncated_state = state(_truncated)
+    with app.app_context():
+        db.session.execute(db.text('TRUNCATE vm, vm_sync_run CASCADE'))
+        db.session.execute(db.text("DELETE FROM system_api WHERE url = :url"), {'url': SECOND_API})
+        db.session.commit()
+    failed_state = state(lambda payload: FakeResponse(b'', status_code=500))
+
+    assert truncated_state == failed_state
+
+
+def _add_apis(resource_type, *urls):
+    for n, url in enumerate(urls):
+        db.session.add(SystemApi(name=f'{resource_type}-{n}', url=url, method='POST', resource_type=resource_type))
+    db.session.commit()
+
+
+def _hosts(first, last, hostname):
+    return [{'host_id': f'host-{i}', 'hostname': f'{hostname}-{i}', 'hypervisor_ip': f'10.0.0.{i}'}
+            for i in range(first, last)]
+
+
+def test_truncated_host_body_is_not_half_applied(app):
+    with app.app_context():
+        _add_apis('vmware_host', 'http://api.test/hosts-1', 'http://api.test/hosts-2')
+        with serve({'http://api.test/hosts-1': _hosts(0, 5, 'old'), 'http://api.test/hosts-2': _hosts(5, 10, 'old')}):
+            SyncService().sync_hosts('vmware')
+        with serve({'http://api.test/hosts-1': _hosts(0, 5, 'new'),
+                    'http://api.test/hosts-2': _truncated(_hosts(5, 10, 'new'))}):
+            results = SyncService().sync_hosts('vmware')
+        db.session.expire_all()
+
+        assert results['vmware']['synced'] == 5
+        names = dict(db.session.execute(db.select(Host.host_id, Host.hostname)).all())
+        assert names == {f'host-{i}': f'new-{i}' if i < 5 else f'old-{i}' for i in range(10)}
+
+
+def test_truncated_network_body_is_not_half_applied(app):
+    def networks(first, last, name):
+        return [{'vm-network': [{'network': f'net-{i}', 'name': f'{name}-{i}'} for i in range(first, last)]}]
+
+    with app.app_context():
+        _add_apis('vmware_network', 'http://api.test/networks-1', 'http://api.test/networks-2')
+        with serve({'http://api.test/networks-1': networks(0, 5, 'old'),
+                    'http://api.test/networks-2': networks(5, 10, 'old')}):
+            SyncService().sync_networks('vmware')
+        with serve({'http://api.test/networks-1': networks(0, 5, 'new'),
+                    'http://api.test/networks-2': _truncated(networks(5, 10, 'new'))}):
+            result = SyncService().sync_networks('vmware')
+        db.session.expire_all()
+
+        assert result['synced'] == 5
+        expected = {f'net-{i}': f'new-{i}' if i < 5 else f'old-{i}' for i in range(10)}
+        assert dict(db.session.execute(db.select(Network.network_id, Network.name)).all()) == expected
+        assert dict(db.session.execute(db.select(VMwareNetwork.network_id, VMwareNetwork.name)).all()) == expected
@@ -0,0 +1,92 @@
+"""VM.load_effective_dicts (batched list page loading)"""
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models.division import Division
+from app.models.dns_record import VMDNSRecord
+from app.models.owner import Owner
+from app.models.public_network import VMPublicNetwork
+from app.models.vm import VM, VMEffective, VMManual, VMTag, VMIpManual
+from app.services.vm_effective import EffectiveInventory
+from conftest import run_sync, vm_payload
+
+
+@pytest.fixture
+def inventory(app):
+    """60 VMs with a mix of manual data, tags, IPs, public networks and DNS records"""
+    with app.app_context():
+        # Multi-IP NICs report their addresses out of order, APIPA first
+        run_sync('vmware', {'http://api.test/vmware/vms': [
+            vm_payload(i, ips=[f'169.254.0.{i + 1}', f'10.9.0.{i + 1}', f'10.1.0.{i + 1}'] if i % 3 else [f'169.254.1.{i + 1}'])
+            for i in range(60)
+        ]})
+
+        division = Division(name='Platform', department='Infrastructure')
+        business, technical = Owner(full_name='Biz Owner', email='biz@test'), Owner(full_name='Tech Owner', email='tech@test')
+        db.session.add_all([division, business, technical])
+        db.session.flush()
+
+        for n, vm in enumerate(VM.query.order_by(VM.id)):
+            if n % 2:
+                db.session.add(VMManual(
+                    vm_id=vm.id, division_id=division.id, business_owner_id=business.id,
+                    technical_owner_id=technical.id if n % 4 == 1 else None, environment='prod',
+                    override_os_family=True, manual_os_family='linux',
+                    override_power_state=n % 5 == 0, manual_power_state='off'
+                ))
+            if n % 3 == 0:
+                db.session.add_all([VMTag(vm_id=vm.id, tag_value='a'), VMTag(vm_id=vm.id, tag_value='b')])
+            if n % 7 == 0:
+                db.session.add(VMIpManual(vm_id=vm.id, ip_address=f'192.168.0.{n + 1}', is_primary=n % 14 == 0))
+            if n % 5 == 0:
+                db.session.add(VMPublicNetwork(vm_id=vm.id, snat_ip='203.0.113.1', is_active=True))
+            if n % 4 == 0:
+                db.session.add_all([
+                    VMDNSRecord(vm_id=vm.id, internal_dns=f'a{n}.test', is_active=n % 8 == 0),
+                    VMDNSRecord(vm_id=vm.id, internal_dns=f'b{n}.test', is_active=True),
+                ])
+        EffectiveInventory.refresh()
+        db.session.commit()
+    return app
+
+
+def _statements_for_page(app, size):
+    """Statements run by load_effective_dicts for a page of `size` VMs"""
+    with app.app_context():
+        vms = VM.query.order_by(VM.vm_name).limit(size).all()
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            dicts = VM.load_effective_dicts(vms)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        db.session.remove()
+
+    assert len(dicts) == size
+    return len(statements)
+
+
+def test_query_count_is_independent_of_page_size(inventory):
+    assert _statements_for_page(inventory, 1) == _statements_for_page(inventory, 50)
+
+
+def test_matches_to_effective_dict(inventory):
+    with inventory.app_context():
+        expected = [vm.to_effective_dict() for vm in VM.query.order_by(VM.vm_name)]
+        db.session.remove()
+
+        vms = VM.query.order_by(VM.vm_name).all()
+        assert VM.load_effective_dicts(vms) == expected
+
+
+def test_ip_matches_read_model(inventory):
+    """The IP picked in Python is the one vm_effective picked in SQL"""
+    with inventory.app_context():
+        vms = VM.query.order_by(VM.vm_name).all()
+        expected = dict(db.session.execute(db.select(VMEffective.vm_id, VMEffective.ip_address)).all())
+        assert {vm.id: data['ip_address'] for vm, data in zip(vms, VM.load_effective_dicts(vms))} == expected
@@ -24,6 +24,7 @@ export default function SyncManagement() {
         nutanixNetworks: false,
         hosts: false
     });
+    const [progress, setProgress] = useState({});
     const [networkSummary, setNetworkSummary] = useState({});
     const [hostSummary, setHostSummary] = useState({});
     const [headerActions, setHeaderActions] = useState(null);
@@ -55,24 +56,47 @@ export default function SyncManagement() {
         }
     };
 
+    // Sync endpoints return 202 with a job id; poll until the job finishes
+    const waitForJob = async (response, key) => {
+        const jobId = response?.data?.job_id;
+        if (!jobId) return;
+
+        while (true) {
+            await new Promise((resolve) => setTimeout(resolve, 2000));
+            const { data } = await syncApi.getJob(jobId);
+            const job = data.job;
+            setProgress((prev) => ({ ...prev, [key]: job.percent }));
+
+            if (job.status !== 'QUEUED' && job.status !== 'RUNNING') {
+                setProgress((prev) => ({ ...prev, [key]: null }));
+                if (job.status === 'FAILED') {
+                    throw new Error(job.error || 'Sync job failed');
+                }
+                return job;
+            }
+        }
+    };
+
+    const progressLabel = (key) => (progress[key] != null ? ` ${progress[key]}%` : '');
+
     const handleSync = async (platform) => {
         setSyncing({ ...syncing, [platform]: true });
 
         try {
             if (platform === 'nutanix') {
-                await syncApi.nutanix();
+                await waitForJob(await syncApi.nutanix(), platform);
             } else if (platform === 'vmware') {
-                await syncApi.vmware();
+                await waitForJob(await syncApi.vmware(), platform);
             } else if (platform === 'vmwareNetworks') {
                 await networksApi.syncVmware();
             } else if (platform === 'nutanixNetworks') {
                 await networksApi.syncNutanix();
             } else if (platform === 'hosts') {
-                await hostsApi.sync();
+                await waitForJob(await hostsApi.sync(), platform);
             } else if (platform === 'vmwareHosts') {
-                await hostsApi.sync('vmware');
+                await waitForJob(await hostsApi.sync('vmware'), platform);
             } else if (platform === 'nutanixHosts') {
-                await hostsApi.sync('nutanix');
+                await waitForJob(await hostsApi.sync('nutanix'), platform);
             }
             await loadData();
         } catch (error) {
@@ -87,7 +111,7 @@ export default function SyncManagement() {
         setSyncing({ nutanix: true, vmware: true, networks: false });
 
         try {
-            await syncApi.all();
+            await waitForJob(await syncApi.all(), 'all');
             await loadData();
         } catch (error) {
             console.error('Sync all failed:', error);
@@ -127,7 +151,7 @@ export default function SyncManagement() {
                     disabled={syncing.nutanix || syncing.vmware}
                 >
                     {(syncing.nutanix || syncing.vmware) ? (
-                        <><span className="loading-spinner" /> Syncing All...</>
+                        <><span className="loading-spinner" /> Syncing All...{progressLabel('all')}</>
                     ) : (
                         <><RefreshCw size={18} /> Sync All</>
                     )}
@@ -159,7 +183,7 @@ export default function SyncManagement() {
                                 title="Sync VMware VMs"
                             >
                                 {syncing.vmware ? (
-                                    <><span className="loading-spinner" /> VMware</>
+                                    <><span className="loading-spinner" /> VMware{progressLabel('vmware')}</>
                                 ) : (
                                     <><Play size={14} /> VMware</>
                                 )}
@@ -171,7 +195,7 @@ export default function SyncManagement() {
                                 title="Sync Nutanix VMs"
                             >
                                 {syncing.nutanix ? (
-                                    <><span className="loading-spinner" /> Nutanix</>
+                                    <><span className="loading-spinner" /> Nutanix{progressLabel('nutanix')}</>
                                 ) : (
                                     <><Play size={14} /> Nutanix</>
                                 )}
@@ -268,7 +292,7 @@ export default function SyncManagement() {
                                 title="Sync VMware Hosts"
                             >
                                 {syncing.vmwareHosts ? (
-                                    <><span className="loading-spinner" /> VMware</>
+                                    <><span className="loading-spinner" /> VMware{progressLabel('vmwareHosts')}</>
                                 ) : (
                                     <><Play size={14} /> VMware</>
                                 )}
@@ -280,7 +304,7 @@ export default function SyncManagement() {
                                 title="Sync Nutanix Hosts"
                             >
                                 {syncing.nutanixHosts ? (
-                                    <><span className="loading-spinner" /> Nutanix</>
+                                    <><span className="loading-spinner" /> Nutanix{progressLabel('nutanixHosts')}</>
                                 ) : (
                                     <><Play size={14} /> Nutanix</>
                                 )}
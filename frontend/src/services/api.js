@@ -19,20 +19,59 @@ const api = axios.create({
     },
 });
 
+// Conditional GET: remember the ETag and body of each JSON GET, send
+// If-None-Match on the next request for the same URL and answer a
+// 304 Not Modified from the remembered body
+const ETAG_CACHE_SIZE = 200;
+const etagCache = new Map();
+
+const etagKey = (config) => api.getUri(config);
+
+const rememberResponse = (key, etag, data) => {
+    etagCache.delete(key);
+    etagCache.set(key, { etag, data });
+    if (etagCache.size > ETAG_CACHE_SIZE) {
+        etagCache.delete(etagCache.keys().next().value);  // Oldest entry
+    }
+};
+
 // Request interceptor to add auth token
 api.interceptors.request.use((config) => {
     const token = localStorage.getItem('token');
     if (token) {
         config.headers.Authorization = `Bearer ${token}`;
     }
+    if (config.method === 'get' && !config.responseType) {
+        const cached = etagCache.get(etagKey(config));
+        if (cached) {
+            config.headers['If-None-Match'] = cached.etag;
+        }
+        config.validateStatus = (status) => (status >= 200 && status < 300) || status === 304;
+    }
     return config;
 });
 
-// Response interceptor to handle auth errors
+// Response interceptor to serve 304s from the ETag cache and handle auth errors
 api.interceptors.response.use(
-    (response) => response,
+    (response) => {
+        const { config } = response;
+        if (config.method !== 'get' || config.responseType) {
+            return response;
+        }
+        const key = etagKey(config);
+        if (response.status === 304) {
+            const cached = etagCache.get(key);
+            if (cached) {
+                return { ...response, status: 200, data: cached.data };
+            }
+        } else if (response.headers.etag) {
+            rememberResponse(key, response.headers.etag, response.data);
+        }
+        return response;
+    },
     (error) => {
         if (error.response?.status === 401) {
+            etagCache.clear();
             localStorage.removeItem('token');
             localStorage.removeItem('user');
             window.location.href = '/login';
@@ -107,7 +146,10 @@ export const syncApi = {
     all: () => api.post('/sync/all'),
     getRuns: (params) => api.get('/sync/runs', { params }),
     getRun: (id) => api.get(`/sync/runs/${id}`),
+    getRunTrends: (params) => api.get('/sync/runs/trends', { params }),
     getStatus: () => api.get('/sync/status'),
+    getJob: (id) => api.get(`/sync/jobs/${id}`),
+    getJobs: (params) => api.get('/sync/jobs', { params }),
 
     getNetworks: () => api.get('/sync/networks'),
 };
@@ -116,6 +158,7 @@ export const syncApi = {
 export const changesApi = {
     list: (params) => api.get('/changes', { params }),
     getSummary: () => api.get('/changes/summary'),
+    getTrend: (params) => api.get('/changes/trend', { params }),
     getVmChanges: (vmId, params) => api.get(`/changes/vm/${vmId}`, { params }),
     getTypes: () => api.get('/changes/types'),
 };